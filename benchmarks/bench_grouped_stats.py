@@ -0,0 +1,47 @@
+"""Time per-(symbol, account) stats across process counts.
+
+Compares looping the compute_* functions over groupby slices on one core
+with compute_grouped_stats, serially and in process pools of several sizes.
+Speedups need as many free cores as processes.
+
+    python -m benchmarks.bench_grouped_stats --rows 2000000 --processes 1 2 4 8
+"""
+import argparse
+import time
+
+import pandas as pd
+from src.grouped import GROUP_COLUMNS, available_cpus, compute_grouped_stats
+from src.metrics import compute_advanced_stats, compute_basic_stats, compute_daily_stats
+from src.synthetic import generate_trades
+
+def groupby_loop(trade_data: pd.DataFrame) -> None:
+    for _, group in trade_data.groupby(list(GROUP_COLUMNS)):
+        compute_basic_stats(group)
+        compute_advanced_stats(group)
+        compute_daily_stats(group)
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--accounts', type=int, default=8, help='Accounts to spread the trades over.')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, available_cpus()])
+    args = parser.parse_args(argv)
+
+    accounts = [f"Sim{number}" for number in range(1, args.accounts + 1)]
+    trade_data = generate_trades(args.rows, accounts=accounts)
+    print(f"{args.rows} trades, {trade_data.groupby(list(GROUP_COLUMNS)).ngroups} groups, "
+          f"{available_cpus()} cores available")
+
+    start = time.perf_counter()
+    groupby_loop(trade_data)
+    baseline = time.perf_counter() - start
+    print(f"{'groupby loop':>20}: {baseline:.3f}s")
+
+    for processes in sorted(set(args.processes)):
+        start = time.perf_counter()
+        compute_grouped_stats(trade_data, processes=processes)
+        elapsed = time.perf_counter() - start
+        print(f"{f'{processes} process(es)':>20}: {elapsed:.3f}s ({baseline / elapsed:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Count full-frame copies and time the dashboard's metric computations.
+
+Compares calling the compute_* functions one by one (each builds its own
+intermediates from the frame) with serving them all from one MetricsPipeline.
+
+    python -m benchmarks.bench_metrics_pipeline --rows 200000
+"""
+import argparse
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+from src.metrics import (MetricsPipeline, add_mfe_mae_columns, compute_advanced_stats, compute_basic_stats,
+                         compute_daily_stats, compute_multi_window_stats)
+from src.synthetic import generate_trades
+
+@contextmanager
+def count_frame_copies():
+    """Count DataFrame.copy calls (explicit copies and those made by .assign) in the block."""
+    counter = {'copies': 0}
+    original_copy = pd.DataFrame.copy
+
+    def counting_copy(self, *args, **kwargs):
+        counter['copies'] += 1
+        return original_copy(self, *args, **kwargs)
+
+    pd.DataFrame.copy = counting_copy
+    try:
+        yield counter
+    finally:
+        pd.DataFrame.copy = original_copy
+
+def function_per_metric(trade_data: pd.DataFrame) -> None:
+    trade_data = add_mfe_mae_columns(trade_data)
+    compute_basic_stats(trade_data)
+    compute_advanced_stats(trade_data)
+    compute_daily_stats(trade_data)
+    compute_multi_window_stats(trade_data)
+
+def shared_pipeline(trade_data: pd.DataFrame) -> None:
+    pipeline = MetricsPipeline(trade_data)
+    pipeline.basic_stats()
+    pipeline.advanced_stats()
+    pipeline.daily_stats()
+    pipeline.multi_window_stats()
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    trade_data = generate_trades(args.rows)
+    print(f"{args.rows} trades")
+    for name, flow in (('function per metric', function_per_metric), ('shared pipeline', shared_pipeline)):
+        with count_frame_copies() as counter:
+            start = time.perf_counter()
+            flow(trade_data)
+            elapsed = time.perf_counter() - start
+        print(f"{name:>20}: {counter['copies']} full-frame copies, {elapsed:.3f}s")
+
+if __name__ == "__main__":
+    main()
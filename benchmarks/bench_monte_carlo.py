@@ -0,0 +1,44 @@
+"""Time Monte Carlo equity-curve simulation and its peak memory.
+
+Runs simulate_equity_curves over a synthetic PnL sequence for every
+resampling method and process count, and reports the peak memory traced in
+this process (tracemalloc, so it runs on every platform). With one process
+that is the simulation itself, which stays near memory_mb however many
+paths are simulated; pool workers split memory_mb between them, and their
+memory is not traced here.
+
+    python -m benchmarks.bench_monte_carlo --paths 10000 --trades 100000 --processes 1 4
+"""
+import argparse
+import time
+import tracemalloc
+
+from src.grouped import available_cpus
+from src.montecarlo import METHODS, simulate_equity_curves
+from src.synthetic import generate_trades
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--paths', type=int, default=10_000)
+    parser.add_argument('--trades', type=int, default=100_000)
+    parser.add_argument('--memory-mb', type=int, default=256, help='Working memory budget, shared by the pool workers.')
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=list(METHODS))
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, available_cpus()])
+    args = parser.parse_args(argv)
+
+    profit_loss = generate_trades(args.trades)['profit_loss']
+    print(f"{args.paths} paths x {args.trades} trades, {args.memory_mb} MB budget, "
+          f"{available_cpus()} cores available")
+
+    for method in args.methods:
+        for processes in sorted(set(args.processes)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            simulate_equity_curves(profit_loss, args.paths, method, memory_mb=args.memory_mb, processes=processes)
+            elapsed = time.perf_counter() - start
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            print(f"{method:>12}, {processes} process(es): {elapsed:.1f}s, peak traced {peak_mb:.0f} MB")
+
+if __name__ == "__main__":
+    main()
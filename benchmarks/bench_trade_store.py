@@ -0,0 +1,69 @@
+"""Time basic and daily stats from the SQLite trade store against the CSV path.
+
+Writes a synthetic processed CSV in parts, migrates it into a TradeStore,
+then times each query both ways: loading the CSV into pandas and running
+the compute_* functions, and summing in SQLite with only result rows
+returned. Queries run over all trades and over a filtered slice (one
+symbol and account, the last year). Each step prints the peak memory
+traced while it ran (tracemalloc, so it runs on every platform); that
+covers the frames and arrays pandas builds, not SQLite's page cache.
+
+    python -m benchmarks.bench_trade_store --rows 10000000
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+from src.data_loader import read_trade_csv
+from src.filters import filtered_pipeline
+from src.metrics import MetricsPipeline
+from src.store import migrate_csv
+from src.synthetic import generate_trades
+
+PART_ROWS = 1_000_000
+
+def timed(label: str, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    print(f"{label:>32}: {elapsed:8.3f}s, peak traced {peak_mb:7.1f} MB")
+    return result
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--dir', type=Path, default=None, help='Directory for the CSV and store (default: a temporary one).')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        csv_path = Path(directory) / 'trades.csv'
+        for part, start in enumerate(range(0, args.rows, PART_ROWS)):
+            trades = generate_trades(min(PART_ROWS, args.rows - start), seed=part)
+            trades.to_csv(csv_path, mode='a', header=not part, index=False)
+        last_entry = trades['entry_datetime'].max()
+        filters = {'symbols': ('MES',), 'accounts': ('Sim1',), 'start': last_entry - pd.Timedelta(days=365)}
+        del trades
+
+        store = timed("migrate CSV to store", lambda: migrate_csv(csv_path, Path(directory) / 'trades.sqlite'))
+        print(f"{args.rows} trades: CSV {csv_path.stat().st_size / 2 ** 20:.0f} MB, "
+              f"store {store.path.stat().st_size / 2 ** 20:.0f} MB")
+
+        timed("store: basic stats", store.basic_stats)
+        timed("store: daily stats", store.daily_stats)
+        timed("store: filtered basic stats", lambda: store.basic_stats(**filters))
+        timed("store: filtered daily stats", lambda: store.daily_stats(**filters))
+
+        trade_data = timed("csv: load", lambda: read_trade_csv(csv_path))
+        timed("csv: basic stats", lambda: MetricsPipeline(trade_data).basic_stats())
+        timed("csv: daily stats", lambda: MetricsPipeline(trade_data).daily_stats())
+        timed("csv: filtered basic stats", lambda: filtered_pipeline(trade_data, **filters).basic_stats())
+        timed("csv: filtered daily stats", lambda: filtered_pipeline(trade_data, **filters).daily_stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Time the public metrics and preprocessing functions across trade-table sizes.
+
+Each function runs on seeded synthetic trades (src.synthetic) at every size;
+the best wall time of a few repeats and the peak traced memory are compared
+with benchmarks/baseline.json. The run fails (exit code 1) when a result is
+slower or larger than the baseline by more than the tolerance.
+
+    python -m benchmarks.run_benchmarks                      # 1k and 100k trades
+    python -m benchmarks.run_benchmarks --sizes 1000 100000 10000000
+    python -m benchmarks.run_benchmarks --update-baseline    # record this machine
+
+The stored timings come from the machine that recorded them. A fixed
+calibration workload is timed with them and again on every run, and baseline
+timings are scaled by the ratio, so a faster or slower machine compares
+relative timings. The scaling is approximate; for exact comparisons,
+record a baseline on your own machine first (--update-baseline, on a
+checkout without your changes) and compare against it.
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from src.data_loader import read_trade_csv
+from src.metrics import (add_mfe_mae_columns, compute_advanced_stats, compute_basic_stats, compute_daily_stats,
+                         compute_multi_window_stats, compute_rolling_stats)
+from src.preprocessing import compact_trades, iter_preprocessed_chunks, preprocess_raw_data
+from src.synthetic import generate_trades, write_trades_list
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+DEFAULT_SIZES = [1_000, 100_000]
+
+# Baseline entry holding the calibration time of the machine that recorded it
+CALIBRATION_KEY = '_calibration'
+
+# The chunked readers split every export into this many chunks
+NUM_CHUNKS = 10
+
+# Name -> callable taking the prepared inputs of one size
+BENCHMARKS = {
+    'preprocess_raw_data': lambda inputs: preprocess_raw_data(inputs['raw_path']),
+    'preprocess_raw_data[chunked]': lambda inputs: preprocess_raw_data(inputs['raw_path'], chunksize=inputs['chunksize']),
+    'iter_preprocessed_chunks': lambda inputs: sum(len(chunk) for chunk in iter_preprocessed_chunks(inputs['raw_path'],
+                                                                                                   inputs['chunksize'])),
+    'read_trade_csv': lambda inputs: read_trade_csv(inputs['csv_path']),
+    'add_mfe_mae_columns': lambda inputs: add_mfe_mae_columns(inputs['trades']),
+    'compute_basic_stats': lambda inputs: compute_basic_stats(inputs['trades']),
+    'compute_advanced_stats': lambda inputs: compute_advanced_stats(inputs['trades']),
+    'compute_daily_stats': lambda inputs: compute_daily_stats(inputs['trades']),
+    'compute_rolling_stats': lambda inputs: compute_rolling_stats(inputs['trades'].copy()),
+    'compute_multi_window_stats': lambda inputs: compute_multi_window_stats(inputs['trades']),
+    'compact_trades': lambda inputs: compact_trades(inputs['trades']),
+    'compute_basic_stats[compact]': lambda inputs: compute_basic_stats(inputs['compact_trades']),
+    'compute_daily_stats[compact]': lambda inputs: compute_daily_stats(inputs['compact_trades']),
+}
+
+def prepare_inputs(size: int, directory: Path) -> dict:
+    """Generate trades of one size and write them as processed CSV and raw export."""
+    trades = generate_trades(size, seed=size)
+    csv_path = directory / f"trades_{size}.csv"
+    raw_path = directory / f"TradesList_{size}.txt"
+    trades.to_csv(csv_path, index=False)
+    write_trades_list(trades, raw_path)
+    return {'trades': trades, 'compact_trades': compact_trades(trades), 'csv_path': csv_path, 'raw_path': raw_path,
+            'chunksize': max(1, size // NUM_CHUNKS)}
+
+def measure(benchmark, inputs: dict, repeat: int) -> dict:
+    """Best wall time over `repeat` runs and peak traced memory of one run."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        benchmark(inputs)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    benchmark(inputs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_mb': peak / 2**20}
+
+def calibrate(repeat: int = 5) -> float:
+    """Best time of a fixed sort and group-by workload, a measure of this machine's speed."""
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.random(1_000_000))
+    keys = rng.integers(0, 1000, len(values))
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        values.sort_values()
+        values.groupby(keys).sum()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def compare(results: dict, baseline: dict, tolerance: float, speed: float = 1.0) -> list:
+    """Describe every result that regressed beyond the tolerance.
+
+    Baseline timings are multiplied by `speed`, this machine's calibration
+    time over the baseline machine's.
+    """
+    regressions = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            reference = baseline.get(name, {}).get(size)
+            if reference is None:
+                continue
+            reference = {**reference, 'seconds': reference['seconds'] * speed}
+            for metric in ('seconds', 'peak_mb'):
+                # Ignore differences too small to measure reliably
+                floor = 0.005 if metric == 'seconds' else 1.0
+                limit = max(reference[metric] * (1 + tolerance), reference[metric] + floor)
+                if result[metric] > limit:
+                    regressions.append(f"{name} @ {size}: {metric} {result[metric]:.3f} > {reference[metric]:.3f}")
+    return regressions
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Run a subset of the benchmarks.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Allowed relative slowdown or memory growth (default: 0.5).')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store these results as the new baseline.')
+    args = parser.parse_args(argv)
+
+    calibration = calibrate()
+    print(f"{'calibration':>30}: {calibration:8.3f}s")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            inputs = prepare_inputs(size, Path(directory))
+            # Larger tables get a single timed run
+            repeat = args.repeat if size <= 100_000 else 1
+            for name in args.only or BENCHMARKS:
+                result = measure(BENCHMARKS[name], inputs, repeat)
+                results.setdefault(name, {})[str(size)] = result
+                print(f"{name:>30} {size:>10}: {result['seconds']:8.3f}s {result['peak_mb']:9.1f} MB")
+
+    if args.update_baseline:
+        baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        for name, sizes in results.items():
+            baseline.setdefault(name, {}).update(sizes)
+        baseline[CALIBRATION_KEY] = {'seconds': calibration}
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    if not BASELINE_PATH.exists():
+        print("No baseline stored; run with --update-baseline first")
+        return 0
+
+    baseline = json.loads(BASELINE_PATH.read_text())
+    speed = calibration / baseline[CALIBRATION_KEY]['seconds'] if CALIBRATION_KEY in baseline else 1.0
+    print(f"Baseline timings scaled by {speed:.2f} for this machine")
+    regressions = compare(results, baseline, args.tolerance, speed)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+from src.cache import memoize
+from src.metrics import MetricsPipeline, _basic_stats_from_sums, _shared_pipeline
+from src.profiling import profiled
+
+AGGREGATE_KEYS = ['date', 'symbol', 'Account']
+
+# Period codes accepted by rollup(); weeks start on Monday
+PERIOD_FREQUENCIES = ('D', 'W', 'M')
+
+class TradeAggregates:
+    """Additive sums of the basic stat terms per (day, symbol, account).
+
+    Every term (trade count, PnL, win/loss counts and sums, MFE/MAE sums) is
+    additive, so appending trades only adds their sums to the matching rows,
+    and any daily, weekly or monthly view, for all or some symbols and
+    accounts, is a merge of these rows rather than a pass over the trades.
+    """
+
+    def __init__(self, sums: pd.DataFrame = None):
+        self.sums = sums if sums is not None else _empty_sums()
+
+    @classmethod
+    def from_trades(cls, trade_data: pd.DataFrame) -> 'TradeAggregates':
+        aggregates = cls()
+        aggregates.add(MetricsPipeline(trade_data))
+        return aggregates
+
+    def update(self, new_trades: pd.DataFrame) -> None:
+        """Add appended trades to the aggregates."""
+        self.add(MetricsPipeline(new_trades))
+
+    @profiled()
+    def add(self, pipeline: MetricsPipeline) -> None:
+        """Add the trades a (possibly subset) pipeline covers, reusing its terms."""
+        if not len(pipeline.index):
+            return
+        keys = [pd.Series(pd.to_datetime(pipeline._column('date')), name='date'),
+                pd.Series(pipeline._column('symbol'), name='symbol'),
+                pd.Series(pipeline._column('Account'), name='Account')]
+        new_sums = pd.DataFrame(pipeline.basic_stat_terms).groupby(keys, dropna=False).sum()
+        if self.sums.empty:
+            self.sums = new_sums
+            return
+
+        # Add to the rows the trades touch; only unseen (day, symbol, account) rows are appended
+        positions = self.sums.index.get_indexer(new_sums.index)
+        found = positions >= 0
+        for column_number, column in enumerate(self.sums.columns):
+            self.sums.iloc[positions[found], column_number] += new_sums[column].to_numpy()[found]
+        if not found.all():
+            self.sums = pd.concat([self.sums, new_sums[~found]])
+
+    def rollup(self, freq: str = 'D', symbols=None, accounts=None) -> pd.DataFrame:
+        """Summed terms per period start (freq 'D', 'W' or 'M'), oldest first.
+
+        symbols and accounts restrict the merge to those values (None keeps
+        all). Trades without a date are left out, as in compute_daily_stats.
+        """
+        sums = self.sums
+        if symbols is not None:
+            sums = sums[sums.index.get_level_values('symbol').isin(symbols)]
+        if accounts is not None:
+            sums = sums[sums.index.get_level_values('Account').isin(accounts)]
+
+        dates = pd.DatetimeIndex(sums.index.get_level_values('date'))
+        periods = dates if freq == 'D' else dates.to_period(freq).start_time
+        return sums.groupby(periods.rename('date')).sum()
+
+    def period_stats(self, freq: str = 'D', symbols=None, accounts=None) -> pd.DataFrame:
+        """compute_basic_stats for every period, one row per period."""
+        sums = self.rollup(freq, symbols, accounts)
+        stats = _basic_stats_from_sums({key: values.to_numpy() for key, values in sums.items()})
+        return pd.DataFrame(stats, index=sums.index)
+
+    def period_summary(self, freq: str = 'D', symbols=None, accounts=None) -> dict:
+        """PnL and trade count per period, with their averages.
+
+        For freq 'D' these are the numbers compute_daily_stats returns.
+        """
+        sums = self.rollup(freq, symbols, accounts)
+        pnl = sums['total_profit_loss'].astype('float64').rename('profit_loss')
+        trades = sums['num_trades'].astype('int64').rename(None)
+
+        return {
+            'pnl': pnl,
+            'avg_pnl': pnl.mean(),
+            'avg_win': pnl[pnl > 0].mean(),
+            'avg_loss': pnl[pnl < 0].mean(),
+            'periods_traded': len(pnl),
+            'trades': trades,
+            'avg_trades': trades.mean() if not trades.empty else 0
+        }
+
+    def daily_stats(self) -> dict:
+        """compute_daily_stats over all aggregated trades."""
+        summary = self.period_summary('D')
+        dates = pd.Index(summary['pnl'].index.date, name='date')
+
+        return {
+            'daily_pnl': summary['pnl'].set_axis(dates),
+            'avg_day_pnl': summary['avg_pnl'],
+            'avg_win_day': summary['avg_win'],
+            'avg_loss_day': summary['avg_loss'],
+            'days_traded': summary['periods_traded'],
+            'trades_per_day': summary['trades'].set_axis(dates),
+            'avg_trades_per_day': summary['avg_trades']
+        }
+
+    def to_records(self) -> list:
+        """JSON-serializable rows: [iso date, symbol, account, *term sums]."""
+        records = []
+        for (date, symbol, account), values in zip(self.sums.index, self.sums.to_numpy(dtype=object)):
+            records.append([None if pd.isna(date) else date.date().isoformat(),
+                            None if pd.isna(symbol) else symbol,
+                            None if pd.isna(account) else account,
+                            *(value.item() if isinstance(value, np.generic) else value for value in values)])
+        return records
+
+    @classmethod
+    def from_records(cls, records: list) -> 'TradeAggregates':
+        if not records:
+            return cls()
+        sums = _empty_sums()
+        rows = pd.DataFrame(records, columns=AGGREGATE_KEYS + list(sums.columns))
+        rows['date'] = pd.to_datetime(rows['date'])
+        rows = rows.astype({column: dtype for column, dtype in sums.dtypes.items()})
+        return cls(rows.set_index(AGGREGATE_KEYS))
+
+def _empty_sums() -> pd.DataFrame:
+    terms = MetricsPipeline(pd.DataFrame({'profit_loss': pd.Series(dtype='float64'),
+                                          'trade_type': pd.Series(dtype=object),
+                                          'entry_price': pd.Series(dtype='float64'),
+                                          'price_range_high': pd.Series(dtype='float64'),
+                                          'price_range_low': pd.Series(dtype='float64')})).basic_stat_terms
+    index = pd.MultiIndex.from_arrays([pd.DatetimeIndex([]), pd.Index([], dtype=object), pd.Index([], dtype=object)],
+                                      names=AGGREGATE_KEYS)
+    return pd.DataFrame(terms, index=index)
+
+@memoize(maxsize=4)
+def cached_trade_aggregates(trade_data: pd.DataFrame) -> TradeAggregates:
+    """TradeAggregates of a whole frame, sharing the memoized metrics pipeline."""
+    aggregates = TradeAggregates()
+    aggregates.add(_shared_pipeline(trade_data))
+    return aggregates
@@ -0,0 +1,279 @@
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from src.config import PROCESSED_DATA_DIR
+from src.ingest import LIVE_STORE, IncrementalIngester
+
+# Rule thresholds; set one to None to turn the rule off
+DEFAULT_RULES = {
+    'daily_loss': 500.0,      # the day's PnL falls to -X dollars
+    'drawdown': 1000.0,       # cumulative PnL falls X dollars below its peak
+    'loss_streak': 5,         # X losing trades in a row
+    'win_rate_drop': 2.0,     # EWMA win rate X sigma below the expanding win rate
+    'expectancy_drop': 2.0,   # EWMA PnL X sigma below the expanding mean PnL
+    'pnl_milestone': 1000.0,  # cumulative PnL reaches a new multiple of X dollars
+    'trade_milestone': 1000,  # every X trades
+}
+EWMA_SPAN = 30
+
+# The sigma rules wait for this many trades, so the expanding estimates settle first
+MIN_TRADES = 30
+ALERT_COLUMNS = ['time', 'rule', 'value', 'threshold', 'trade_number', 'symbol', 'message']
+STATE_VERSION = 1
+
+class AlertMonitor:
+    """Fire anomaly and milestone alerts as trades arrive, one trade at a time.
+
+    The state is a fixed set of running numbers: EWMAs of PnL and win rate
+    (span EWMA_SPAN), the expanding mean, variance (Welford) and win rate,
+    cumulative PnL and its peak, the current losing streak and the current
+    day's PnL, so each trade costs O(1) however long the history is. Rules
+    (DEFAULT_RULES, overridden by `rules`) fire once per breach: the daily
+    loss once per day, the drawdown until a new equity peak, the sigma
+    rules until the EWMA recovers, each milestone once.
+
+    Alerts are appended as JSON lines to `<store>_alerts.jsonl` and put on
+    `alert_queue` (anything with a put() method) when given; the state is
+    saved to `<store>_alert_state.json`, so a restarted monitor carries on.
+    """
+
+    def __init__(self, store_file: str = LIVE_STORE, rules: dict = None, span: int = EWMA_SPAN,
+                 alert_queue=None):
+        stem = (PROCESSED_DATA_DIR / store_file).stem
+        self.log_path = PROCESSED_DATA_DIR / f"{stem}_alerts.jsonl"
+        self.state_path = PROCESSED_DATA_DIR / f"{stem}_alert_state.json"
+        self.rules = {**DEFAULT_RULES, **(rules or {})}
+        self.alpha = 2 / (span + 1)
+        self.alert_queue = alert_queue
+        self.state = self._load_state() or _empty_state()
+
+    def update(self, trades: pd.DataFrame, emit: bool = True) -> list:
+        """Feed trades in arrival order; returns the alerts they fired.
+
+        With emit=False the state is updated but nothing is logged or
+        queued, which is how history is replayed.
+        """
+        alerts = []
+        if trades.empty:
+            return alerts
+        days = pd.to_datetime(trades['date']).dt.strftime('%Y-%m-%d').tolist()
+        times = pd.to_datetime(trades['exit_datetime']).astype(str).tolist()
+        for values in zip(trades['profit_loss'].astype(float).tolist(), days, times, trades['symbol'].astype(str).tolist()):
+            alerts.extend(self.add_trade(*values))
+
+        if emit and alerts:
+            with open(self.log_path, 'a') as f:
+                f.writelines(json.dumps(alert) + '\n' for alert in alerts)
+            if self.alert_queue is not None:
+                for alert in alerts:
+                    self.alert_queue.put(alert)
+        self._save_state()
+        return alerts if emit else []
+
+    def follow(self, ingester: IncrementalIngester, new_trades: pd.DataFrame) -> list:
+        """Update from the trades an ingester poll returned; returns the alerts fired.
+
+        Alerts fire for the trades appended to what the monitor has already
+        seen, so a new monitor on an empty store alerts from the first
+        trade. If the monitor's row count disagrees with the store (a new
+        monitor on an existing store), the trades before the new ones are
+        replayed quietly first. A rebuilt store (the export was replaced)
+        is history, so it is replayed quietly and fires nothing.
+        """
+        trade_data = ingester.trade_data
+        if ingester.rebuilt:
+            self.reset()
+            self.update(trade_data, emit=False)
+            return []
+
+        seen = len(trade_data) - len(new_trades)
+        if self.state['rows'] != seen:
+            self.reset()
+            self.update(trade_data.iloc[:seen], emit=False)
+        return self.update(new_trades)
+
+    def add_trade(self, profit_loss: float, day: str, time: str, symbol: str = None) -> list:
+        """Fold one closed trade into the state and check the rules."""
+        state = self.state
+        state['rows'] += 1
+        if math.isnan(profit_loss):
+            return []
+
+        # Expanding mean and variance (Welford), win rate and the EWMAs
+        state['trades'] += 1
+        n = state['trades']
+        delta = profit_loss - state['mean_pnl']
+        state['mean_pnl'] += delta / n
+        state['m2_pnl'] += delta * (profit_loss - state['mean_pnl'])
+        is_win = profit_loss >= 0  # as in compute_basic_stats
+        state['wins'] += is_win
+        if n == 1:
+            state['ewma_pnl'], state['ewma_win_rate'] = profit_loss, float(is_win)
+        else:
+            state['ewma_pnl'] += self.alpha * (profit_loss - state['ewma_pnl'])
+            state['ewma_win_rate'] += self.alpha * (is_win - state['ewma_win_rate'])
+
+        # Equity curve, losing streak and the day's PnL
+        state['cumulative_pnl'] += profit_loss
+        if state['cumulative_pnl'] > state['peak_pnl']:
+            state['peak_pnl'] = state['cumulative_pnl']
+            state['drawdown_fired'] = False
+        state['loss_streak'] = 0 if is_win else state['loss_streak'] + 1
+        if day != state['day']:
+            state['day'], state['daily_pnl'] = day, 0.0
+        state['daily_pnl'] += profit_loss
+
+        alerts = []
+        def fire(rule, value, message):
+            alerts.append({'time': time, 'rule': rule, 'value': float(value), 'threshold': self.rules[rule],
+                           'trade_number': state['rows'], 'symbol': symbol, 'message': message})
+
+        limit = self.rules['daily_loss']
+        if limit is not None and state['daily_pnl'] <= -limit and state['daily_loss_day'] != day:
+            state['daily_loss_day'] = day
+            fire('daily_loss', state['daily_pnl'], f"Daily loss of ${-state['daily_pnl']:,.2f} on {day} exceeds ${limit:,.2f}")
+
+        limit = self.rules['drawdown']
+        drawdown = state['peak_pnl'] - state['cumulative_pnl']
+        if limit is not None and drawdown >= limit and not state['drawdown_fired']:
+            state['drawdown_fired'] = True
+            fire('drawdown', -drawdown, f"Drawdown of ${drawdown:,.2f} from the equity peak exceeds ${limit:,.2f}")
+
+        limit = self.rules['loss_streak']
+        if limit is not None and state['loss_streak'] == limit:
+            fire('loss_streak', state['loss_streak'], f"Losing streak of {limit} trades")
+
+        # The EWMA of n i.i.d. values has variance alpha / (2 - alpha) times theirs
+        ewma_scale = math.sqrt(self.alpha / (2 - self.alpha))
+        win_rate = state['wins'] / n
+        sigma = math.sqrt(win_rate * (1 - win_rate)) * ewma_scale
+        state['win_rate_fired'] = self._check_drop(
+            'win_rate_drop', state['win_rate_fired'], state['ewma_win_rate'], win_rate, sigma, fire,
+            f"Recent win rate {state['ewma_win_rate']:.1%} is below the overall {win_rate:.1%}")
+
+        sigma = math.sqrt(state['m2_pnl'] / (n - 1)) * ewma_scale if n > 1 else 0.0
+        state['expectancy_fired'] = self._check_drop(
+            'expectancy_drop', state['expectancy_fired'], state['ewma_pnl'], state['mean_pnl'], sigma, fire,
+            f"Recent expectancy ${state['ewma_pnl']:,.2f} is below the overall ${state['mean_pnl']:,.2f}")
+
+        step = self.rules['pnl_milestone']
+        if step is not None and state['cumulative_pnl'] >= (state['pnl_milestone'] + 1) * step:
+            state['pnl_milestone'] = math.floor(state['cumulative_pnl'] / step)
+            fire('pnl_milestone', state['cumulative_pnl'], f"Cumulative PnL reached ${state['pnl_milestone'] * step:,.2f}")
+
+        step = self.rules['trade_milestone']
+        if step is not None and n % step == 0:
+            fire('trade_milestone', n, f"{n:,} trades")
+        return alerts
+
+    def snapshot(self) -> dict:
+        """Current running values the rules look at."""
+        state = self.state
+        n = state['trades']
+        return {
+            'trades': n,
+            'win_rate': state['wins'] / n if n else np.nan,
+            'ewma_win_rate': state['ewma_win_rate'] if n else np.nan,
+            'mean_pnl': state['mean_pnl'] if n else np.nan,
+            'ewma_pnl': state['ewma_pnl'] if n else np.nan,
+            'cumulative_pnl': state['cumulative_pnl'],
+            'drawdown': state['cumulative_pnl'] - state['peak_pnl'] if n else 0.0,
+            'loss_streak': state['loss_streak'],
+            'day': state['day'],
+            'daily_pnl': state['daily_pnl'],
+        }
+
+    def reset(self) -> None:
+        self.state = _empty_state()
+
+    def _check_drop(self, rule: str, fired: bool, recent: float, overall: float, sigma: float, fire, message: str) -> bool:
+        """Fire when `recent` is more than the rule's sigmas below `overall`; returns the new latch."""
+        k = self.rules[rule]
+        if k is None or self.state['trades'] < MIN_TRADES or sigma == 0:
+            return fired
+        below = recent < overall - k * sigma
+        if below and not fired:
+            fire(rule, (recent - overall) / sigma, f"{message} by {(overall - recent) / sigma:.1f} sigma")
+        return below
+
+    def _load_state(self) -> dict:
+        try:
+            state = json.loads(self.state_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+        return state if state.get('version') == STATE_VERSION else {}
+
+    def _save_state(self) -> None:
+        self.state_path.write_text(json.dumps(self.state))
+
+def _empty_state() -> dict:
+    return {
+        'version': STATE_VERSION,
+        'rows': 0,
+        'trades': 0,
+        'wins': 0,
+        'mean_pnl': 0.0,
+        'm2_pnl': 0.0,
+        'ewma_pnl': 0.0,
+        'ewma_win_rate': 0.0,
+        'cumulative_pnl': 0.0,
+        'peak_pnl': 0.0,
+        'loss_streak': 0,
+        'day': None,
+        'daily_pnl': 0.0,
+        'daily_loss_day': None,
+        'drawdown_fired': False,
+        'win_rate_fired': False,
+        'expectancy_fired': False,
+        'pnl_milestone': 0,
+    }
+
+def read_alerts(store_file: str = LIVE_STORE, last: int = None) -> pd.DataFrame:
+    """Alerts logged for a store, oldest first (only the `last` ones if given)."""
+    log_path = PROCESSED_DATA_DIR / f"{(PROCESSED_DATA_DIR / store_file).stem}_alerts.jsonl"
+    try:
+        lines = log_path.read_text().splitlines()
+    except FileNotFoundError:
+        lines = []
+    if last is not None:
+        lines = lines[-last:] if last else []
+    return pd.DataFrame([json.loads(line) for line in lines], columns=ALERT_COLUMNS)
+
+def watch(raw_file: str = "TradesList.txt", store_file: str = LIVE_STORE, interval: float = 5.0,
+          rules: dict = None, polls: int = None) -> None:
+    """Poll the export every `interval` seconds and print the alerts new trades fire.
+
+    Runs until interrupted, or for `polls` polls.
+    """
+    ingester = IncrementalIngester(raw_file, store_file)
+    monitor = AlertMonitor(store_file, rules)
+    count = 0
+    while polls is None or count < polls:
+        for alert in monitor.follow(ingester, ingester.poll()):
+            print(f"{alert['time']}  {alert['rule']}: {alert['message']}", flush=True)
+        count += 1
+        if polls is None or count < polls:
+            time.sleep(interval)
+
+def main(argv: list = None) -> None:
+    """Command line entry point to watch a live export without the dashboard.
+    """
+    parser = argparse.ArgumentParser(prog='python -m src.alerts',
+                                     description='Watch a TradesList export and print performance alerts.')
+    parser.add_argument('--raw-file', default="TradesList.txt", help='Export in the raw data directory.')
+    parser.add_argument('--store-file', default=LIVE_STORE, help='Processed store in the processed data directory.')
+    parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls.')
+    parser.add_argument('--rules', type=json.loads, default=None,
+                        help='JSON object overriding rule thresholds, e.g. \'{"daily_loss": 300, "trade_milestone": null}\'.')
+    args = parser.parse_args(argv)
+    try:
+        watch(args.raw_file, args.store_file, args.interval, args.rules)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
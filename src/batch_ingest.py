@@ -0,0 +1,106 @@
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from src.config import PROCESSED_DATA_DIR, RAW_DATA_DIR
+from src.data_loader import read_trade_csv
+from src.grouped import available_cpus
+from src.ingest import _empty_trades
+from src.preprocessing import iter_preprocessed_chunks
+from src.profiling import profiled
+
+# Trades with equal values in these columns are the same trade exported twice
+DEDUP_COLUMNS = ['symbol', 'entry_datetime', 'exit_datetime', 'quantity']
+REPORT_COLUMNS = ['file', 'rows', 'trades', 'skipped', 'duplicates', 'added', 'parse_sec']
+
+# Batches go to their own store, never the processed trades.csv or the live session's store
+UPLOAD_STORE = "trades_uploaded.csv"
+
+@profiled()
+def ingest_files(files, store_file: str = UPLOAD_STORE, processes: int = None) -> pd.DataFrame:
+    """Parse many TradesList exports concurrently and merge them into one processed store.
+
+    `files` are file names (relative to RAW_DATA_DIR), paths, or (name,
+    bytes) pairs such as uploaded files. Each export is parsed in a process
+    pool worker into trades sorted by entry time. Trades already in the
+    store, or in an earlier file of the batch, are dropped by looking up a
+    64-bit hash of their DEDUP_COLUMNS in a hash index; the rest are merged
+    with the store's trades in entry order (a stable sort of the sorted
+    runs) and the store is rewritten once.
+
+    Returns one report row per file: raw rows, parsed trades, skipped rows
+    (e.g. the 'Total:' footer), duplicates, trades added and parse time.
+    """
+    sources = [_source(file) for file in files]
+    processes = min(processes or available_cpus(), len(sources))
+    parsed = None
+    if processes > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                parsed = list(pool.map(_parse_export, sources))
+        except (OSError, BrokenProcessPool):
+            pass
+    if parsed is None:
+        parsed = [_parse_export(source) for source in sources]
+
+    store_path = PROCESSED_DATA_DIR / store_file
+    store = read_trade_csv(store_path) if store_path.exists() else _empty_trades()
+    seen = set(trade_hashes(store).tolist())
+
+    report = []
+    new_trades = []
+    for (name, trades, rows, seconds) in parsed:
+        hashes = trade_hashes(trades)
+        # A trade is new if neither the store nor an earlier file (or row) had it
+        is_new = ~pd.Series(hashes).duplicated().to_numpy()
+        is_new &= np.array([value not in seen for value in hashes.tolist()], dtype=bool)
+        seen.update(hashes[is_new].tolist())
+        new_trades.append(trades[is_new])
+        report.append([name, rows, len(trades), rows - len(trades), len(trades) - np.count_nonzero(is_new),
+                       np.count_nonzero(is_new), seconds])
+
+    added = [trades for trades in new_trades if not trades.empty]
+    if added:
+        trade_data = pd.concat([store, *added], ignore_index=True) if not store.empty else pd.concat(added, ignore_index=True)
+        trade_data.sort_values(by='entry_datetime', kind='stable', inplace=True)
+        trade_data.reset_index(drop=True, inplace=True)
+        trade_data.to_csv(store_path, index=False)
+    return pd.DataFrame(report, columns=REPORT_COLUMNS)
+
+def trade_hashes(trade_data: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of every trade's DEDUP_COLUMNS, equal for the same trade read from a store or an export."""
+    keys = pd.DataFrame({
+        'symbol': trade_data['symbol'].astype(str),
+        'entry_datetime': pd.to_datetime(trade_data['entry_datetime']).astype('datetime64[ns]'),
+        'exit_datetime': pd.to_datetime(trade_data['exit_datetime']).astype('datetime64[ns]'),
+        'quantity': trade_data['quantity'].astype('float64'),
+    })
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+def _source(file) -> tuple:
+    if isinstance(file, tuple):
+        return file
+    path = RAW_DATA_DIR / file if isinstance(file, str) else Path(file)
+    return path.name, path
+
+def _parse_export(source: tuple) -> tuple:
+    """Worker: parse one export into trades sorted by entry time.
+
+    Returns (name, trades, raw rows, seconds).
+    """
+    start = time.perf_counter()
+    name, data = source
+    if isinstance(data, Path):
+        data = data.read_bytes()
+    chunks = list(iter_preprocessed_chunks(io.BytesIO(data), chunksize=None))
+    trades = pd.concat(chunks, ignore_index=True) if chunks else _empty_trades()
+    trades.sort_values(by='entry_datetime', kind='stable', inplace=True)
+    trades.reset_index(drop=True, inplace=True)
+
+    # Non-blank lines below the header
+    rows = sum(1 for line in data.splitlines()[1:] if line.strip())
+    return name, trades, rows, time.perf_counter() - start
@@ -0,0 +1,240 @@
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+from src.config import CACHE_DIR
+
+CACHE_VERSION = 1
+HASH_CHUNK_SIZE = 1 << 20
+PREFETCH_WORKERS = 2
+
+# Process umask, read once at import (reading it means setting it), for the mode of cache files
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+_prefetch_pool = None
+_prefetch_lock = threading.Lock()
+
+def file_fingerprint(path: Path) -> dict:
+    """Fingerprint a source file by size, modification time and content hash.
+    """
+    stat = path.stat()
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'content_hash': _content_hash(path),
+    }
+
+def _content_hash(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _cache_paths(path: Path) -> tuple:
+    """Cache entry files of a source, keyed on its resolved path so same-named files in other folders do not collide."""
+    key = f"{path.name}.{hashlib.blake2b(str(Path(path).resolve()).encode(), digest_size=8).hexdigest()}"
+    return CACHE_DIR / f"{key}.parquet", CACHE_DIR / f"{key}.json"
+
+def _read_meta(meta_path: Path) -> dict:
+    try:
+        return json.loads(meta_path.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _is_fresh(path: Path, meta: dict) -> bool:
+    """Check a cache entry against the source file.
+
+    Size and mtime are checked first; the content hash is only computed when
+    the mtime moved, so a touched but unchanged file still hits the cache.
+    """
+    if meta.get('version') != CACHE_VERSION:
+        return False
+
+    stat = path.stat()
+    if stat.st_size != meta.get('size'):
+        return False
+    if stat.st_mtime_ns == meta.get('mtime_ns'):
+        return True
+    return _content_hash(path) == meta.get('content_hash')
+
+def _write_atomic(target: Path, write: Callable[[Path], None]) -> None:
+    """Write to a uniquely named staging file and move it into place, so concurrent writers never share one.
+
+    Staging files are created private (0600); the entry gets the mode a
+    plain open() would give it under the process umask.
+    """
+    with tempfile.NamedTemporaryFile(dir=target.parent, prefix=f"{target.name}.", suffix='.tmp', delete=False) as tmp:
+        tmp_path = Path(tmp.name)
+    try:
+        write(tmp_path)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, target)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+def load_cached(path: Path, reader: Callable[[Path], pd.DataFrame]) -> pd.DataFrame:
+    """Load a typed DataFrame for a source file from the columnar cache.
+
+    On a miss (no entry, or the source changed) the frame is rebuilt with
+    `reader` and written back as Parquet together with the source fingerprint.
+    """
+    path = Path(path)
+    data_path, meta_path = _cache_paths(path)
+    meta = _read_meta(meta_path)
+
+    if data_path.exists() and _is_fresh(path, meta):
+        mtime_ns = path.stat().st_mtime_ns
+        if mtime_ns != meta['mtime_ns']:
+            # Same content under a new mtime: remember it to skip the hash next time
+            meta['mtime_ns'] = mtime_ns
+            _write_atomic(meta_path, lambda p: p.write_text(json.dumps(meta)))
+        return pd.read_parquet(data_path)
+
+    return refresh_cache(path, reader)
+
+def refresh_cache(path: Path, reader: Callable[[Path], pd.DataFrame]) -> pd.DataFrame:
+    """Rebuild the cache entry for a source file and return the fresh frame.
+    """
+    path = Path(path)
+    data_path, meta_path = _cache_paths(path)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    meta = {'version': CACHE_VERSION, 'source': str(path), **file_fingerprint(path)}
+    data = reader(path)
+
+    _write_atomic(data_path, lambda p: data.to_parquet(p, index=False))
+    _write_atomic(meta_path, lambda p: p.write_text(json.dumps(meta)))
+    return data
+
+def clear_cache() -> int:
+    """Remove every cache entry and return the number of files deleted.
+    """
+    removed = 0
+    if CACHE_DIR.exists():
+        for cache_file in CACHE_DIR.iterdir():
+            if cache_file.suffix in ('.parquet', '.json', '.tmp'):
+                cache_file.unlink()
+                removed += 1
+    return removed
+
+# In-memory result cache
+
+_frame_fingerprints = {}  # id(frame) -> (weak references to its axes and arrays, fingerprint)
+
+def data_fingerprint(value) -> object:
+    """Hashable fingerprint of a function argument, used as a memoize key.
+
+    DataFrames and Series are fingerprinted by content. The digest is
+    remembered per object together with weak references to its axes and
+    column arrays, so passing the same frame again costs nothing, while
+    assigning, adding, dropping or renaming a column, or replacing the index
+    (inplace sort_values/reset_index included) makes it hash again. Values
+    written into the existing arrays (.loc/.iloc/.values assignment) are not
+    detected: frames must not be modified that way once passed. Other
+    arguments must be hashable or lists, tuples or dicts of hashable values.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        key = id(value)
+        axes = [value.index, value.columns] if isinstance(value, pd.DataFrame) else [value.index]
+        parts = [*axes, *value._mgr.arrays]
+        remembered = _frame_fingerprints.get(key)
+        if remembered is None or len(remembered[0]) != len(parts) or any(
+                ref() is not part for ref, part in zip(remembered[0], parts)):
+            if remembered is None:
+                weakref.finalize(value, _frame_fingerprints.pop, key, None)
+            remembered = _frame_fingerprints[key] = ([weakref.ref(part) for part in parts], _content_fingerprint(value))
+        return remembered[1]
+    if isinstance(value, (list, tuple)):
+        return tuple(data_fingerprint(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, data_fingerprint(item)) for key, item in value.items()))
+    if isinstance(value, Path):
+        return str(value)
+    hash(value)  # Raises TypeError for unhashable arguments
+    return value
+
+def _content_fingerprint(data) -> tuple:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    columns = data.dtypes.items() if isinstance(data, pd.DataFrame) else [(data.name, data.dtype)]
+    return type(data).__name__, digest.hexdigest(), tuple((str(name), str(dtype)) for name, dtype in columns)
+
+def memoize(maxsize: int = 16) -> Callable:
+    """Decorator caching results by the fingerprint of the arguments.
+
+    Keeps at most `maxsize` results and evicts the least recently used.
+    Concurrent calls with the same arguments compute the result once.
+    Cached results are shared between callers and must not be modified;
+    frames passed in follow the contract of data_fingerprint.
+    Works in any process, with or without Streamlit.
+    """
+    def decorator(func: Callable) -> Callable:
+        results = OrderedDict()
+        pending = {}  # key -> Event set when the call computing it returns
+        lock = threading.Lock()
+        stats = {'hits': 0, 'misses': 0}
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (data_fingerprint(args), data_fingerprint(kwargs))
+            while True:
+                with lock:
+                    if key in results:
+                        results.move_to_end(key)
+                        stats['hits'] += 1
+                        return results[key]
+                    computing = pending.get(key)
+                    if computing is None:
+                        stats['misses'] += 1
+                        computing = pending[key] = threading.Event()
+                        break
+                # Another thread (e.g. a prefetch) is computing it: wait instead of repeating the work
+                computing.wait()
+
+            try:
+                result = func(*args, **kwargs)
+                with lock:
+                    results[key] = result
+                    results.move_to_end(key)
+                    while len(results) > maxsize:
+                        results.popitem(last=False)
+            finally:
+                with lock:
+                    del pending[key]
+                computing.set()
+            return result
+
+        def cache_clear() -> None:
+            with lock:
+                results.clear()
+                stats.update(hits=0, misses=0)
+
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_info = lambda: {**stats, 'size': len(results), 'maxsize': maxsize}
+        return wrapper
+
+    return decorator
+
+def prefetch(func: Callable, *args, **kwargs) -> Future:
+    """Start a memoized call in a background thread.
+
+    A later call with the same arguments then hits the cache, or waits for
+    the running computation instead of starting another one.
+    """
+    global _prefetch_pool
+    with _prefetch_lock:
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='prefetch')
+    return _prefetch_pool.submit(func, *args, **kwargs)
@@ -3,4 +3,14 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
-PROCESSED_DATA_DIR = DATA_DIR / "processed"
\ No newline at end of file
+PROCESSED_DATA_DIR = DATA_DIR / "processed"
+CACHE_DIR = DATA_DIR / "cache"
+
+# Futures contract specifications: price increment, dollar value per tick and
+# round-turn commission per contract
+CONTRACT_SPECS = {
+    'MNQ': {'tick_size': 0.25, 'tick_value': 0.50, 'commission': 1.60, 'exchange': 'CME'},
+    'MES': {'tick_size': 0.25, 'tick_value': 1.25, 'commission': 1.60, 'exchange': 'CME'},
+    'MCL': {'tick_size': 0.01, 'tick_value': 1.00, 'commission': 1.60, 'exchange': 'NYMEX'},
+    'MGC': {'tick_size': 0.10, 'tick_value': 1.00, 'commission': 1.60, 'exchange': 'COMEX'},
+}
@@ -1,9 +1,81 @@
+import argparse
+import time
+from pathlib import Path
+
 import pandas as pd
+from src.cache import clear_cache, load_cached, memoize, refresh_cache
 from src.config import PROCESSED_DATA_DIR
+from src.preprocessing import compact_trades
+from src.profiling import profiled
+
+DATETIME_COLUMNS = ['entry_datetime', 'exit_datetime']
+
+@profiled()
+def read_trade_csv(path: Path) -> pd.DataFrame:
+    """Read a processed trades CSV with explicit datetime and date types.
+    """
+    return _parse_trade_columns(pd.read_csv(path))
+
+def iter_trade_csv(path: Path, chunksize: int = 500_000):
+    """Read a processed trades CSV in typed chunks of up to `chunksize` rows.
+    """
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        yield _parse_trade_columns(chunk)
+
+def _parse_trade_columns(trade_data: pd.DataFrame) -> pd.DataFrame:
+    for column in DATETIME_COLUMNS:
+        trade_data[column] = pd.to_datetime(trade_data[column], format='ISO8601')
+    trade_data['date'] = pd.to_datetime(trade_data['date'], format='%Y-%m-%d').dt.date
+    return trade_data
 
 # Load the trades data
-def load_trade_data(file_name: str = "trades.csv") -> pd.DataFrame:
-    """Load trade data from a CSV file.
+@profiled()
+def load_trade_data(file_name: str = "trades.csv", use_cache: bool = True, compact: bool = False) -> pd.DataFrame:
+    """Load trade data from a processed CSV file.
+
+    By default the typed frame is served from the columnar cache, which is
+    rebuilt from the CSV whenever the file's fingerprint changes. With
+    `compact`, the frame is converted with compact_trades.
     """
-    trade_data = pd.read_csv(PROCESSED_DATA_DIR / f"{file_name}")
-    return trade_data
\ No newline at end of file
+    path = PROCESSED_DATA_DIR / f"{file_name}"
+    trade_data = load_cached(path, read_trade_csv) if use_cache else read_trade_csv(path)
+    return compact_trades(trade_data) if compact else trade_data
+
+def cached_load_trade_data(file_name: str = "trades.csv", compact: bool = False) -> pd.DataFrame:
+    """Load trade data, returning the same frame while the file is unchanged.
+
+    Reruns that load an unchanged file get the identical object back, so
+    memoized metric functions recognize it without rehashing. The frame is
+    shared and must not be modified in place.
+    """
+    stat = (PROCESSED_DATA_DIR / f"{file_name}").stat()
+    return _load_trade_data_version(file_name, compact, stat.st_size, stat.st_mtime_ns)
+
+@memoize(maxsize=4)
+def _load_trade_data_version(file_name: str, compact: bool, size: int, mtime_ns: int) -> pd.DataFrame:
+    return load_trade_data(file_name, compact=compact)
+
+def main(argv: list = None) -> None:
+    """Command line entry point to warm or clear the processed trades cache.
+    """
+    parser = argparse.ArgumentParser(prog='python -m src.data_loader',
+                                     description='Manage the processed trades cache.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    warm_parser = subparsers.add_parser('warm', help='Rebuild the cache for processed CSV files.')
+    warm_parser.add_argument('files', nargs='*',
+                             help='File names in the processed data directory (default: all CSV files).')
+    subparsers.add_parser('clear', help='Delete all cache entries.')
+    args = parser.parse_args(argv)
+
+    if args.command == 'clear':
+        print(f"Removed {clear_cache()} cache files")
+        return
+
+    paths = [PROCESSED_DATA_DIR / name for name in args.files] or sorted(PROCESSED_DATA_DIR.glob('*.csv'))
+    for path in paths:
+        start = time.perf_counter()
+        trade_data = refresh_cache(path, read_trade_csv)
+        print(f"Cached {path.name}: {len(trade_data)} rows in {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    main()
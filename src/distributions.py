@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+from src.cache import memoize
+from src.metrics import MetricsPipeline, _shared_pipeline
+from src.profiling import profiled
+
+# Distributions kept per partition; mfe and mae are in price points, as in MetricsPipeline
+SKETCH_COLUMNS = ['profit_loss', 'mfe', 'mae', 'duration_sec']
+
+# Each (day, symbol) is split by account and side, so every dashboard filter selects whole partitions
+PARTITION_KEYS = ['date', 'symbol', 'Account', 'trade_type']
+
+# Every quantile is within this fraction of the value at its rank
+RELATIVE_ACCURACY = 0.01
+
+# Values smaller than this in magnitude share the zero bucket
+MIN_MAGNITUDE = 1e-6
+
+# Bucket rows are keyed by one int64: partition << 24 | column << 20 | (bucket + BUCKET_SHIFT)
+BUCKET_SHIFT = 1 << 19
+
+class DistributionSketches:
+    """Mergeable quantile sketches of PnL, MFE, MAE and duration per partition.
+
+    Each value is counted in a logarithmic bucket: bucket k holds magnitudes
+    in (gamma^(k-1), gamma^k], gamma = (1 + a) / (1 - a) for the relative
+    accuracy a, and is read back as 2 gamma^k / (gamma + 1), which is within
+    a of every value in it (the DDSketch scheme; negative values get
+    mirrored buckets). Bucket counts are additive, so the sketch of any set
+    of partitions is the sum of their counts: a filter is answered by
+    merging partitions, never by revisiting trades, and a partition holds
+    at most one row per occupied bucket however many trades it has. Exact
+    counts, sums, minima and maxima are kept alongside.
+
+    Bucket rows are kept sorted by their (partition, column, bucket) key, and
+    the summaries in one row per partition, so adding trades increments the
+    buckets and summaries they touch in place; only unseen buckets and
+    partitions are inserted.
+    """
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        # Shifts bucket indices so the smallest magnitude is bucket 1 and 0 is the zero bucket
+        self.offset = 1 - int(np.floor(np.log(MIN_MAGNITUDE) / np.log(self.gamma)))
+        self.partitions = pd.DataFrame({key: pd.Series(dtype='datetime64[ns]' if key == 'date' else object)
+                                        for key in PARTITION_KEYS})
+        self.partition_codes = {}  # partition key tuple -> row in self.partitions
+        self.bucket_keys = np.empty(0, dtype=np.int64)
+        self.bucket_counts = np.empty(0, dtype=np.int64)
+        # Exact summaries, one row per partition and one column per SKETCH_COLUMNS entry
+        self.value_counts = np.zeros((0, len(SKETCH_COLUMNS)), dtype=np.int64)
+        self.value_sums = np.zeros((0, len(SKETCH_COLUMNS)))
+        self.value_mins = np.zeros((0, len(SKETCH_COLUMNS)))
+        self.value_maxs = np.zeros((0, len(SKETCH_COLUMNS)))
+
+    @classmethod
+    def from_trades(cls, trade_data: pd.DataFrame, relative_accuracy: float = RELATIVE_ACCURACY) -> 'DistributionSketches':
+        sketches = cls(relative_accuracy)
+        sketches.add(MetricsPipeline(trade_data))
+        return sketches
+
+    def update(self, new_trades: pd.DataFrame) -> None:
+        """Add appended trades to the sketches."""
+        self.add(MetricsPipeline(new_trades))
+
+    @profiled()
+    def add(self, pipeline: MetricsPipeline) -> None:
+        """Add the trades a (possibly subset) pipeline covers, reusing its MFE/MAE."""
+        if not len(pipeline.index):
+            return
+        partition = self._partition_codes(pd.DataFrame({
+            'date': pd.to_datetime(pipeline._column('date')),
+            'symbol': pipeline._column('symbol').astype(object),
+            'Account': pipeline._column('Account').astype(object),
+            'trade_type': pipeline._column('trade_type').astype(object),
+        }))
+
+        new_keys = []
+        for column_code, column in enumerate(SKETCH_COLUMNS):
+            values = getattr(pipeline, column) if hasattr(MetricsPipeline, column) else pipeline._column(column, float)
+            valid = ~np.isnan(values)
+            values, rows = values[valid], partition[valid]
+            np.add.at(self.value_counts[:, column_code], rows, 1)
+            np.add.at(self.value_sums[:, column_code], rows, values)
+            np.minimum.at(self.value_mins[:, column_code], rows, values)
+            np.maximum.at(self.value_maxs[:, column_code], rows, values)
+            new_keys.append((rows << 24) | (column_code << 20) | (self.buckets(values).astype(np.int64) + BUCKET_SHIFT))
+
+        # Increment the buckets already kept, and insert the unseen ones in key order
+        keys, counts = np.unique(np.concatenate(new_keys), return_counts=True)
+        positions = np.searchsorted(self.bucket_keys, keys)
+        found = positions < len(self.bucket_keys)
+        found[found] = self.bucket_keys[positions[found]] == keys[found]
+        self.bucket_counts[positions[found]] += counts[found]
+        if not found.all():
+            self.bucket_keys = np.insert(self.bucket_keys, positions[~found], keys[~found])
+            self.bucket_counts = np.insert(self.bucket_counts, positions[~found], counts[~found])
+
+    def _partition_codes(self, keys: pd.DataFrame) -> np.ndarray:
+        """Partition code of every trade, numbering unseen partitions after the known ones."""
+        groups = keys.groupby(PARTITION_KEYS, dropna=False, sort=False).ngroup().to_numpy()
+        first = np.unique(groups, return_index=True)[1]
+        codes = np.empty(len(first), dtype=np.int64)
+        unseen = []
+        for group, key in enumerate(keys.iloc[first].itertuples(index=False, name=None)):
+            key = tuple(None if pd.isna(value) else value for value in key)
+            if key not in self.partition_codes:
+                self.partition_codes[key] = len(self.partition_codes)
+                unseen.append(group)
+            codes[group] = self.partition_codes[key]
+
+        if unseen:
+            self.partitions = pd.concat([self.partitions, keys.iloc[first[unseen]]], ignore_index=True)
+            grow = len(self.partitions) - len(self.value_counts)
+            self.value_counts = np.vstack([self.value_counts, np.zeros((grow, len(SKETCH_COLUMNS)), dtype=np.int64)])
+            self.value_sums = np.vstack([self.value_sums, np.zeros((grow, len(SKETCH_COLUMNS)))])
+            self.value_mins = np.vstack([self.value_mins, np.full((grow, len(SKETCH_COLUMNS)), np.inf)])
+            self.value_maxs = np.vstack([self.value_maxs, np.full((grow, len(SKETCH_COLUMNS)), -np.inf)])
+        return codes[groups]
+
+    def buckets(self, values: np.ndarray) -> np.ndarray:
+        """Signed bucket code of each value: 0 for near zero, negative for negative values."""
+        magnitude = np.abs(values)
+        index = np.zeros(len(values), dtype=np.int32)
+        nonzero = magnitude >= MIN_MAGNITUDE
+        index[nonzero] = np.ceil(np.log(magnitude[nonzero]) / np.log(self.gamma)) + self.offset
+        return np.sign(values).astype(np.int32) * index
+
+    def bucket_values(self, buckets: np.ndarray) -> np.ndarray:
+        """Value each bucket code is read back as."""
+        exponent = np.abs(buckets) - self.offset
+        return np.where(buckets == 0, 0.0, np.sign(buckets) * 2 * self.gamma ** exponent.astype(float) / (self.gamma + 1))
+
+    def merge(self, column: str, symbols=None, accounts=None, sides=None, start=None, end=None) -> tuple:
+        """Bucket codes (ascending) and counts of a column over the matching partitions, and its exact summary.
+
+        symbols, accounts and sides restrict the partitions to those values
+        (None keeps all); start and end select days, a partition being in
+        [start, end) when its date is.
+        """
+        selected = np.ones(len(self.partitions), dtype=bool)
+        for key, values in (('symbol', symbols), ('Account', accounts), ('trade_type', sides)):
+            if values is not None:
+                selected &= self.partitions[key].isin(values).to_numpy()
+        dates = pd.DatetimeIndex(self.partitions['date'])
+        if start is not None:
+            selected &= dates >= pd.Timestamp(start).floor('D')
+        if end is not None:
+            selected &= dates < pd.Timestamp(end)
+
+        column_code = SKETCH_COLUMNS.index(column)
+        keys = self.bucket_keys
+        rows = ((keys >> 20) & 0xF == column_code) & selected[keys >> 24]
+        buckets, inverse = np.unique((keys[rows] & 0xFFFFF) - BUCKET_SHIFT, return_inverse=True)
+        counts = np.bincount(inverse, weights=self.bucket_counts[rows], minlength=len(buckets)).astype(np.int64)
+
+        selected &= self.value_counts[:, column_code] > 0
+        count = int(self.value_counts[selected, column_code].sum())
+        summary = {
+            'count': count,
+            'mean': self.value_sums[selected, column_code].sum() / count if count else np.nan,
+            'min': self.value_mins[selected, column_code].min() if count else np.nan,
+            'max': self.value_maxs[selected, column_code].max() if count else np.nan,
+        }
+        return buckets.astype(np.int32), counts, summary
+
+    def quantiles(self, column: str, q, **filters) -> np.ndarray:
+        """Approximate numpy.quantile(values, q, method='lower') over the matching trades.
+
+        Each result is within the relative accuracy of the exact value;
+        q = 0 and 1 give the exact minimum and maximum. NaN if no trade
+        matches.
+        """
+        q = np.asarray(q, dtype=float)
+        buckets, counts, summary = self.merge(column, **filters)
+        if not summary['count']:
+            return np.full(q.shape, np.nan)
+
+        # The value at rank r lies in the first bucket whose cumulative count exceeds r
+        rank = np.floor(q * (summary['count'] - 1))
+        position = np.searchsorted(np.cumsum(counts), rank, side='right')
+        estimate = np.clip(self.bucket_values(buckets[position]), summary['min'], summary['max'])
+        return np.where(q <= 0, summary['min'], np.where(q >= 1, summary['max'], estimate))
+
+    def histogram(self, column: str, bins: int = 40, **filters) -> pd.DataFrame:
+        """Trade counts in `bins` equal-width bins between the column's minimum and maximum.
+
+        Built from the merged buckets, so a value within the relative
+        accuracy of a bin edge may be counted in the neighbouring bin.
+        """
+        buckets, counts, summary = self.merge(column, **filters)
+        if not summary['count']:
+            return pd.DataFrame({'left': [], 'right': [], 'count': []})
+        values = np.clip(self.bucket_values(buckets), summary['min'], summary['max'])
+        edges = np.linspace(summary['min'], summary['max'], bins + 1)
+        histogram, edges = np.histogram(values, bins=edges, weights=counts)
+        return pd.DataFrame({'left': edges[:-1], 'right': edges[1:], 'count': histogram.astype(np.int64)})
+
+    def summary(self, column: str, **filters) -> dict:
+        """Exact count, mean, minimum and maximum of a column over the matching trades."""
+        return self.merge(column, **filters)[2]
+
+    def nbytes(self) -> int:
+        """Memory held by the partition, bucket and summary tables."""
+        arrays = (self.bucket_keys, self.bucket_counts, self.value_counts, self.value_sums, self.value_mins, self.value_maxs)
+        return int(self.partitions.memory_usage(index=True, deep=True).sum() + sum(array.nbytes for array in arrays))
+
+@memoize(maxsize=4)
+def cached_distribution_sketches(trade_data: pd.DataFrame) -> DistributionSketches:
+    """DistributionSketches of a whole frame, sharing the memoized metrics pipeline."""
+    sketches = DistributionSketches()
+    sketches.add(_shared_pipeline(trade_data))
+    return sketches
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Streamlit does not report a chart's rendered width to the server, so chart
+# widths are taken as a fraction of a typical wide-layout page
+PAGE_WIDTH_PX = 1400
+
+# A bucket's minimum and maximum per pixel
+POINTS_PER_PIXEL = 2
+
+def chart_points(width_fraction: float = 1.0, page_width_px: int = PAGE_WIDTH_PX) -> int:
+    """Points per trace for a chart spanning `width_fraction` of the page."""
+    return max(int(page_width_px * width_fraction) * POINTS_PER_PIXEL, 2)
+
+# Points per trace for a full-width chart
+MAX_CHART_POINTS = chart_points()
+
+def minmax_indices(values: np.ndarray, max_points: int = MAX_CHART_POINTS, keep=()) -> np.ndarray:
+    """Sorted positions of the points to plot from `values`.
+
+    The first and last point and any positions in `keep` are kept, and the
+    rest of the budget is split into equal buckets whose minimum and
+    maximum are kept, so at most max_points positions are returned. Every
+    peak and trough a line chart can show at that resolution is therefore
+    plotted at its exact value. Series that already fit are returned whole.
+    """
+    values = np.asarray(values, dtype=float)
+    num_points = len(values)
+    if num_points <= max_points:
+        return np.arange(num_points)
+
+    # Pad to whole buckets; NaNs never win a bucket unless it is all NaN
+    keep = np.asarray(keep, dtype=np.int64)
+    bucket_size = -(-num_points // max((max_points - 2 - len(keep)) // 2, 1))
+    num_buckets = -(-num_points // bucket_size)
+    padded = np.full(num_buckets * bucket_size, np.nan)
+    padded[:num_points] = values
+    buckets = padded.reshape(num_buckets, bucket_size)
+    offsets = np.arange(num_buckets) * bucket_size
+
+    lows = np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1) + offsets
+    highs = np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1) + offsets
+
+    indices = np.concatenate([lows, highs, [0, num_points - 1], keep])
+    return np.unique(indices[indices < num_points])
+
+def drawdown_indices(cumulative_pnl: np.ndarray) -> tuple:
+    """Positions of the peak and the trough that bound the maximum drawdown.
+
+    Missing values are skipped, so a NaN never becomes the peak or the trough.
+    """
+    cumulative_pnl = np.asarray(cumulative_pnl, dtype=float)
+    if np.isnan(cumulative_pnl).all():
+        return ()
+    drawdown = cumulative_pnl - np.fmax.accumulate(cumulative_pnl)
+    trough = int(np.nanargmin(drawdown))
+    peak = int(np.nanargmax(cumulative_pnl[:trough + 1]))
+    return peak, trough
+
+def downsample_frame(frame: pd.DataFrame, max_points: int = MAX_CHART_POINTS, keep=()) -> pd.DataFrame:
+    """Rows of `frame` that keep the extremes of every column.
+
+    Columns plotted on a shared x axis (lines and their fill bands) stay
+    aligned, since all of them are sliced at the union of their positions.
+    The budget is split across columns, so each one gets its share.
+    """
+    if len(frame) <= max_points:
+        return frame
+    per_column = max(max_points // max(frame.shape[1], 1), 2)
+    indices = [minmax_indices(frame[column].to_numpy(dtype=float), per_column, keep) for column in frame]
+    return frame.iloc[np.unique(np.concatenate(indices))]
@@ -0,0 +1,232 @@
+import numpy as np
+import pandas as pd
+from src.cache import memoize
+from src.filters import filtered_pipeline
+from src.metrics import _shared_pipeline
+from src.profiling import profiled
+
+OUTCOMES = {1: 'win', -1: 'loss', 0: 'none'}
+STREAK_COLUMNS = ['group', 'start', 'end', 'length', 'outcome', 'profit_loss']
+DRAWDOWN_COLUMNS = ['peak', 'start', 'trough', 'recovery', 'depth', 'peak_time', 'trough_time', 'recovery_time']
+
+class StreakTracker:
+    """Win/loss streaks, run-length encoded, over a growing trade sequence.
+
+    A trade is a win when profit_loss >= 0 and a loss when it is negative
+    (as in compute_basic_stats); trades without a PnL form 'none' runs. With
+    `by` set to a trade column ('symbol', 'date', ...), streaks are tracked
+    separately within each value of it. update() encodes each appended chunk
+    with array operations and only joins its first run per group onto the
+    group's open streak, so streaming appends give the same runs as one
+    batch. Positions are trade numbers in the order trades were appended.
+    """
+
+    def __init__(self, by: str = None):
+        self.by = by
+        self.num_trades = 0
+        self.runs = _empty_frame(STREAK_COLUMNS)
+        self._open = {}  # group -> label of its last run in self.runs
+
+    def update(self, new_trades: pd.DataFrame) -> None:
+        profit_loss = new_trades['profit_loss'].to_numpy(dtype=float)
+        num_new = len(profit_loss)
+        if not num_new:
+            return
+        outcome = np.where(profit_loss >= 0, 1, np.where(profit_loss < 0, -1, 0)).astype(np.int8)
+        codes, groups = (pd.factorize(new_trades[self.by], use_na_sentinel=False) if self.by
+                         else (np.zeros(num_new, dtype=np.intp), pd.Index([None])))
+
+        # Group the chunk's trades (stably), then cut runs where group or outcome changes
+        order = np.argsort(codes, kind='stable')
+        codes, outcome, profit_loss = codes[order], outcome[order], profit_loss[order]
+        starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (outcome[1:] != outcome[:-1])])
+        ends = np.r_[starts[1:], num_new] - 1
+
+        runs = pd.DataFrame({
+            'group': groups[codes[starts]],
+            'start': order[starts] + self.num_trades,
+            'end': order[ends] + self.num_trades,
+            'length': ends - starts + 1,
+            'outcome': outcome[starts],
+            'profit_loss': np.add.reduceat(np.nan_to_num(profit_loss), starts),
+        })
+
+        # Join each group's first run onto its open streak when the outcome continues
+        first = np.flatnonzero(np.r_[True, codes[starts][1:] != codes[starts][:-1]])
+        joined = []
+        for position in first:
+            group = runs.at[position, 'group']
+            label = self._open.get(group)
+            if label is not None and self.runs.at[label, 'outcome'] == runs.at[position, 'outcome']:
+                self.runs.at[label, 'end'] = runs.at[position, 'end']
+                self.runs.at[label, 'length'] += runs.at[position, 'length']
+                self.runs.at[label, 'profit_loss'] += runs.at[position, 'profit_loss']
+                joined.append(position)
+        runs = runs.drop(index=joined)
+
+        runs.index = np.arange(len(self.runs), len(self.runs) + len(runs))
+        self.runs = pd.concat([self.runs, runs]) if not self.runs.empty else runs
+        for label, group in zip(runs.index, runs['group']):
+            self._open[group] = label
+        self.num_trades += num_new
+
+    @property
+    def streaks(self) -> pd.DataFrame:
+        """One row per streak in order of its first trade, outcome as 'win'/'loss'/'none'."""
+        streaks = self.runs.sort_values('start', kind='stable').reset_index(drop=True)
+        return streaks.assign(outcome=streaks['outcome'].map(OUTCOMES))
+
+class DrawdownTracker:
+    """Drawdown episodes of the cumulative PnL curve over a growing trade sequence.
+
+    An episode starts at the first trade whose cumulative PnL is below the
+    running peak, bottoms out at its trough and ends at the recovery, the
+    first trade back at or above the peak; open episodes have no recovery.
+    Times come from exit_datetime, when the PnL is realized. Between
+    updates only the running total, the peak and the open episode are kept.
+    """
+
+    def __init__(self):
+        self.num_trades = 0
+        self.cumulative_pnl = 0.0
+        self.peak_pnl = -np.inf
+        self.last_time = pd.NaT
+        self.episodes = _empty_frame(DRAWDOWN_COLUMNS)
+
+    def update(self, new_trades: pd.DataFrame) -> None:
+        profit_loss = new_trades['profit_loss'].to_numpy(dtype=float)
+        num_new = len(profit_loss)
+        if not num_new:
+            return
+        times = (pd.to_datetime(new_trades['exit_datetime']).to_numpy() if 'exit_datetime' in new_trades
+                 else np.full(num_new, np.datetime64('NaT', 'ns')))
+
+        cumulative_pnl = self.cumulative_pnl + np.cumsum(np.nan_to_num(profit_loss))
+        peaks = np.maximum.accumulate(np.maximum(cumulative_pnl, self.peak_pnl))
+        underwater = cumulative_pnl < peaks
+
+        # Underwater segments [starts, ends] of this chunk
+        edges = np.diff(np.r_[0, underwater.astype(np.int8), 0])
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+        # Trough of every segment: its minimum, first occurrence
+        bounds = np.column_stack([starts, ends + 1]).ravel()
+        minima = np.minimum.reduceat(cumulative_pnl, bounds[bounds < num_new])[::2] if len(starts) else np.array([])
+        positions = np.flatnonzero(underwater)
+        segment = (np.cumsum(edges[:-1] == 1) - 1)[positions]
+        at_minimum = cumulative_pnl[positions] == minima[segment]
+        troughs = positions[at_minimum][np.unique(segment[at_minimum], return_index=True)[1]]
+
+        recovered = ends + 1 < num_new
+        recoveries = np.where(recovered, ends + 1, -1)
+        peak_positions = starts - 1  # trade -1 of the chunk is the last one before it
+        previous_time = np.r_[self.last_time.to_datetime64() if not pd.isna(self.last_time) else np.datetime64('NaT', 'ns'), times]
+        episodes = pd.DataFrame({
+            'peak': peak_positions + self.num_trades,
+            'start': starts + self.num_trades,
+            'trough': troughs + self.num_trades,
+            'recovery': np.where(recovered, recoveries + self.num_trades, -1),
+            'depth': minima - peaks[starts],
+            'peak_time': previous_time[peak_positions + 1],
+            'trough_time': times[troughs],
+            'recovery_time': np.where(recovered, times[np.minimum(recoveries, num_new - 1)], np.datetime64('NaT', 'ns')),
+        })
+
+        # The open episode continues into (or recovers at) the start of this chunk
+        if not self.episodes.empty and self.episodes['recovery'].iat[-1] == -1:
+            label = self.episodes.index[-1]
+            if underwater[0]:
+                first = episodes.index[0]
+                if episodes.at[first, 'depth'] < self.episodes.at[label, 'depth']:
+                    for column in ('trough', 'depth', 'trough_time'):
+                        self.episodes.at[label, column] = episodes.at[first, column]
+                for column in ('recovery', 'recovery_time'):
+                    self.episodes.at[label, column] = episodes.at[first, column]
+                episodes = episodes.iloc[1:]
+            else:
+                self.episodes.at[label, 'recovery'] = self.num_trades
+                self.episodes.at[label, 'recovery_time'] = times[0]
+
+        episodes.index = np.arange(len(self.episodes), len(self.episodes) + len(episodes))
+        self.episodes = pd.concat([self.episodes, episodes]) if not self.episodes.empty else episodes
+        self.num_trades += num_new
+        self.cumulative_pnl = float(cumulative_pnl[-1])
+        self.peak_pnl = float(peaks[-1])
+        self.last_time = pd.Timestamp(times[-1])
+
+    @property
+    def drawdowns(self) -> pd.DataFrame:
+        """One row per episode with its length in trades and seconds (open ones up to the last trade)."""
+        episodes = self.episodes.reset_index(drop=True)
+        open_episode = episodes['recovery'] == -1
+        end = episodes['recovery'].where(~open_episode, self.num_trades - 1)
+        end_time = pd.to_datetime(episodes['recovery_time']).where(~open_episode, self.last_time)
+        return episodes.assign(
+            duration_trades=(end - episodes['peak']).astype('int64'),
+            duration_sec=(end_time - pd.to_datetime(episodes['peak_time'])).dt.total_seconds(),
+        )
+
+def _empty_frame(columns: list) -> pd.DataFrame:
+    return pd.DataFrame(columns=columns)
+
+@profiled()
+def compute_streaks(trade_data: pd.DataFrame, by: str = None) -> pd.DataFrame:
+    """Win/loss streaks of the trades, overall or within each value of `by`.
+    """
+    tracker = StreakTracker(by)
+    tracker.update(trade_data)
+    return tracker.streaks
+
+@profiled()
+def compute_drawdown_episodes(trade_data: pd.DataFrame) -> pd.DataFrame:
+    """Drawdown episodes of the cumulative PnL curve, see DrawdownTracker.
+    """
+    tracker = DrawdownTracker()
+    tracker.update(trade_data)
+    return tracker.drawdowns
+
+def streak_summary(streaks: pd.DataFrame) -> dict:
+    """Longest and mean win and loss streaks, and their length histograms."""
+    summary = {}
+    for outcome in ('win', 'loss'):
+        lengths = streaks.loc[streaks['outcome'] == outcome, 'length'].astype('int64')
+        summary[f'longest_{outcome}_streak'] = int(lengths.max()) if not lengths.empty else 0
+        summary[f'mean_{outcome}_streak'] = lengths.mean() if not lengths.empty else 0
+        summary[f'{outcome}_streak_histogram'] = lengths.value_counts().sort_index().rename_axis('length').rename('streaks')
+    return summary
+
+def drawdown_summary(drawdowns: pd.DataFrame) -> dict:
+    """Count, depth and duration distribution of the drawdown episodes."""
+    open_episode = drawdowns['recovery'] == -1
+    return {
+        'num_drawdowns': len(drawdowns),
+        'max_depth': drawdowns['depth'].min() if not drawdowns.empty else 0.0,
+        'mean_depth': drawdowns['depth'].mean() if not drawdowns.empty else 0.0,
+        'longest_trades': int(drawdowns['duration_trades'].max()) if not drawdowns.empty else 0,
+        'mean_trades': drawdowns['duration_trades'].mean() if not drawdowns.empty else 0,
+        'longest_sec': drawdowns['duration_sec'].max() if not drawdowns.empty else 0.0,
+        'current_depth': drawdowns.loc[open_episode, 'depth'].iat[-1] if open_episode.any() else 0.0,
+        'depth_histogram': np.histogram(drawdowns['depth'], bins=10) if not drawdowns.empty else None,
+    }
+
+@memoize()
+def cached_episode_stats(trade_data: pd.DataFrame, filters: dict = None, by: str = None) -> dict:
+    """Streaks, drawdown episodes and their summaries over the trades matching `filters`.
+
+    Only the columns the trackers read are gathered from the (filtered)
+    pipeline, so no filtered copy of the frame is made.
+    """
+    pipeline = filtered_pipeline(trade_data, **filters) if filters else _shared_pipeline(trade_data)
+    columns = {'profit_loss': pipeline.profit_loss, 'exit_datetime': pipeline._column('exit_datetime')}
+    if by:
+        columns[by] = pipeline._column(by)
+    trades = pd.DataFrame(columns)
+
+    streaks = compute_streaks(trades, by)
+    drawdowns = compute_drawdown_episodes(trades)
+    return {
+        'streaks': streaks,
+        'streak_summary': streak_summary(streaks),
+        'drawdowns': drawdowns,
+        'drawdown_summary': drawdown_summary(drawdowns),
+    }
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from src.aggregates import TradeAggregates
+from src.cache import memoize
+from src.metrics import MetricsPipeline, _shared_pipeline
+from src.profiling import profiled
+
+# select() keyword -> trade column it filters on
+FILTER_COLUMNS = {'symbols': 'symbol', 'accounts': 'Account', 'sides': 'trade_type'}
+
+class TradeIndex:
+    """Filter index over a trade frame, built once at load time.
+
+    Holds one row bitmap per symbol, account and side value, and the row
+    order of entry_datetime, so a date range is a binary search. select()
+    combines them into the sorted row positions of the matching trades
+    without touching the frame itself.
+    """
+
+    @profiled()
+    def __init__(self, trade_data: pd.DataFrame):
+        self.num_rows = len(trade_data)
+        self.bitmaps = {}
+        for column in FILTER_COLUMNS.values():
+            codes, values = pd.factorize(trade_data[column], sort=True)
+            self.bitmaps[column] = {value: codes == code for code, value in enumerate(values)}
+
+        entry_datetime = trade_data['entry_datetime'].to_numpy(dtype='datetime64[ns]')
+        self.num_dated = np.count_nonzero(~np.isnat(entry_datetime))
+        if self.num_dated == self.num_rows and np.all(entry_datetime[1:] >= entry_datetime[:-1]):
+            # Already in entry order (the processed store is), no permutation needed
+            self.entry_order = None
+            self.sorted_entry = entry_datetime
+        else:
+            # NaT sorts last, so the dated rows are entry_order[:num_dated]
+            self.entry_order = np.argsort(entry_datetime, kind='stable')
+            self.sorted_entry = entry_datetime[self.entry_order]
+
+    def values(self, column: str) -> list:
+        """Distinct values of a filter column, sorted."""
+        return list(self.bitmaps[column])
+
+    def select(self, symbols=None, accounts=None, sides=None, start=None, end=None) -> np.ndarray:
+        """Sorted row positions of the trades matching every given filter.
+
+        symbols, accounts and sides are collections of accepted values (None
+        accepts all); start and end bound entry_datetime as [start, end).
+        """
+        low, high = 0, self.num_rows
+        if start is not None or end is not None:
+            high = self.num_dated
+            if start is not None:
+                low = np.searchsorted(self.sorted_entry[:high], np.datetime64(pd.Timestamp(start)), side='left')
+            if end is not None:
+                high = np.searchsorted(self.sorted_entry[:high], np.datetime64(pd.Timestamp(end)), side='left')
+            high = max(low, high)
+
+        # Rows in the date range, as a slice when the frame is in entry order
+        rows = slice(low, high) if self.entry_order is None else np.sort(self.entry_order[low:high])
+
+        mask = None
+        for keyword, accepted in (('symbols', symbols), ('accounts', accounts), ('sides', sides)):
+            if accepted is None:
+                continue
+            bitmaps = self.bitmaps[FILTER_COLUMNS[keyword]]
+            column_mask = np.zeros(high - low, dtype=bool)
+            for value in accepted:
+                if value in bitmaps:
+                    column_mask |= bitmaps[value][rows]
+            mask = column_mask if mask is None else mask & column_mask
+
+        if self.entry_order is None:
+            positions = np.arange(low, high) if mask is None else np.flatnonzero(mask) + low
+        else:
+            positions = rows if mask is None else rows[mask]
+        return positions.astype(np.intp, copy=False)
+
+@memoize(maxsize=4)
+def cached_trade_index(trade_data: pd.DataFrame) -> TradeIndex:
+    return TradeIndex(trade_data)
+
+def filtered_pipeline(trade_data: pd.DataFrame, **filters) -> MetricsPipeline:
+    """MetricsPipeline over the trades matching `filters` (see TradeIndex.select).
+
+    Reuses the memoized filter index and whole-frame pipeline of trade_data,
+    so a filter change only gathers the selected rows of the per-trade arrays.
+    """
+    positions = cached_trade_index(trade_data).select(**filters)
+    return _shared_pipeline(trade_data).subset(positions)
+
+@memoize(maxsize=8)
+def cached_filtered_stats(trade_data: pd.DataFrame, filters: dict) -> dict:
+    """Basic and advanced stats over the filtered trades.
+
+    Memoized per filter combination, so reruns with unchanged filters only
+    re-render. The period aggregates and multi-window stats have their own
+    memoized functions, so views that do not show them never compute them.
+    """
+    pipeline = filtered_pipeline(trade_data, **filters)
+    return {
+        'basic_stats': pipeline.basic_stats(),
+        'advanced_stats': pipeline.advanced_stats(),
+    }
+
+@memoize(maxsize=8)
+def cached_filtered_aggregates(trade_data: pd.DataFrame, filters: dict) -> TradeAggregates:
+    """Per-(day, symbol, account) aggregates of the filtered trades."""
+    aggregates = TradeAggregates()
+    aggregates.add(filtered_pipeline(trade_data, **filters))
+    return aggregates
+
+@memoize(maxsize=8)
+def cached_filtered_multi_window_stats(trade_data: pd.DataFrame, filters: dict,
+                                       windows: tuple = (10, 30, 100, 500)) -> pd.DataFrame:
+    return filtered_pipeline(trade_data, **filters).multi_window_stats(windows)
@@ -0,0 +1,141 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from src.cache import memoize
+from src.metrics import MetricsPipeline
+from src.profiling import profiled
+
+GROUP_COLUMNS = ('symbol', 'Account')
+
+# Columns the grouped stats read, and the dtype they are shared as
+SHARED_COLUMNS = {
+    'profit_loss': 'float64',
+    'direction': 'int8',
+    'entry_price': 'float64',
+    'price_range_high': 'float64',
+    'price_range_low': 'float64',
+    'duration_sec': 'float64',
+    'date': 'datetime64[D]',
+}
+
+# Below this many trades the pool's startup costs more than it saves
+PARALLEL_MIN_TRADES = 200_000
+
+def available_cpus() -> int:
+    """CPUs this process may run on: its affinity set where the OS has one (Linux), else all of them."""
+    sched_getaffinity = getattr(os, 'sched_getaffinity', None)
+    return len(sched_getaffinity(0)) if sched_getaffinity else os.cpu_count() or 1
+
+@profiled()
+def compute_grouped_stats(trade_data: pd.DataFrame, by=GROUP_COLUMNS, processes: int = None) -> pd.DataFrame:
+    """Basic, advanced and daily stats for every group of trades, as one table.
+
+    The frame is partitioned once: the columns the stats need are gathered
+    in group order into shared memory, and each worker evaluates a range of
+    groups on views of those arrays, so no trade data is pickled. Trades
+    keep their order within a group, so each row equals running the
+    compute_* functions on that group's slice. Runs serially with
+    `processes=1`, on small tables, or when a pool cannot be started.
+    Returns one row per group, indexed by the `by` columns.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    processes = processes or available_cpus()
+    codes, groups = _group_codes(trade_data, by)
+
+    # Partition once: stable sort keeps trade order within each group
+    order = np.argsort(codes, kind='stable')
+    bounds = np.flatnonzero(np.r_[True, codes[order][1:] != codes[order][:-1], True])
+    if not len(order):
+        bounds = np.array([0])
+    arrays = _partitioned_columns(trade_data, order)
+
+    if processes > 1 and len(order) >= PARALLEL_MIN_TRADES and len(bounds) > 2:
+        try:
+            results = _evaluate_parallel(arrays, bounds, processes)
+        except (OSError, BrokenProcessPool):
+            results = _evaluate_groups(arrays, bounds, range(len(bounds) - 1))
+    else:
+        results = _evaluate_groups(arrays, bounds, range(len(bounds) - 1))
+
+    index = pd.MultiIndex.from_frame(groups) if len(by) > 1 else pd.Index(groups[by[0]])
+    return pd.DataFrame(results, index=index)
+
+def _group_codes(trade_data: pd.DataFrame, by: list) -> tuple:
+    """Integer code of each trade's group (in sorted key order), and the keys per code."""
+    keys = trade_data[by].reset_index(drop=True)
+    codes = keys.groupby(by, sort=True, dropna=False, observed=True).ngroup().to_numpy()
+    first = np.unique(codes, return_index=True)[1]
+    return codes, keys.iloc[first].reset_index(drop=True)
+
+def _partitioned_columns(trade_data: pd.DataFrame, order: np.ndarray) -> dict:
+    pipeline = MetricsPipeline(trade_data)
+    columns = {
+        'profit_loss': pipeline.profit_loss,
+        'direction': pipeline.direction,
+        'entry_price': trade_data['entry_price'].to_numpy(dtype=float),
+        'price_range_high': trade_data['price_range_high'].to_numpy(dtype=float),
+        'price_range_low': trade_data['price_range_low'].to_numpy(dtype=float),
+        'duration_sec': trade_data['duration_sec'].to_numpy(dtype=float),
+        'date': pd.to_datetime(trade_data['date']).to_numpy().astype('datetime64[D]'),
+    }
+    return {name: values[order].astype(SHARED_COLUMNS[name], copy=False) for name, values in columns.items()}
+
+def _evaluate_groups(arrays: dict, bounds: np.ndarray, groups) -> list:
+    """Stats for the groups (indices into bounds) over the partitioned arrays."""
+    results = []
+    for group in groups:
+        rows = slice(bounds[group], bounds[group + 1])
+        trade_data = pd.DataFrame({name: values[rows] for name, values in arrays.items()})
+        pipeline = MetricsPipeline(trade_data)
+        advanced = pipeline.advanced_stats()
+        del advanced['cumulative_pnl']
+        daily = pipeline.daily_stats()
+        results.append({
+            **pipeline.basic_stats(),
+            **advanced,
+            **{key: value for key, value in daily.items() if key not in ('daily_pnl', 'trades_per_day')},
+        })
+    return results
+
+def _evaluate_parallel(arrays: dict, bounds: np.ndarray, processes: int) -> list:
+    """Evaluate the groups in a process pool over shared-memory copies of the arrays."""
+    blocks = {}
+    try:
+        specs = {}
+        for name, values in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            blocks[name] = block
+            np.ndarray(values.shape, values.dtype, buffer=block.buf)[:] = values
+            specs[name] = (block.name, values.shape, values.dtype.str)
+
+        # Several tasks per worker, cut at group boundaries, to balance uneven groups
+        num_groups = len(bounds) - 1
+        targets = np.linspace(0, bounds[-1], processes * 4 + 1)[1:-1]
+        cuts = np.unique(np.r_[0, np.searchsorted(bounds[:-1], targets), num_groups])
+        tasks = [range(start, end) for start, end in zip(cuts[:-1], cuts[1:]) if end > start]
+
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunks = pool.map(_evaluate_shared, [specs] * len(tasks), [bounds] * len(tasks), tasks)
+            return [result for chunk in chunks for result in chunk]
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+def _evaluate_shared(specs: dict, bounds: np.ndarray, groups: range) -> list:
+    """Worker: attach to the shared arrays by name and evaluate a range of groups."""
+    blocks = {name: shared_memory.SharedMemory(name=block_name) for name, (block_name, _, _) in specs.items()}
+    try:
+        return _evaluate_groups({name: np.ndarray(shape, np.dtype(dtype), buffer=blocks[name].buf)
+                                 for name, (_, shape, dtype) in specs.items()}, bounds, groups)
+    finally:
+        for block in blocks.values():
+            block.close()
+
+@memoize(maxsize=4)
+def cached_grouped_stats(trade_data: pd.DataFrame, by=GROUP_COLUMNS) -> pd.DataFrame:
+    return compute_grouped_stats(trade_data, by)
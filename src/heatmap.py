@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from src.cache import memoize
+from src.filters import filtered_pipeline
+from src.metrics import MetricsPipeline, _basic_stats_from_sums, _shared_pipeline
+from src.profiling import profiled
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+MINUTES_PER_DAY = 24 * 60
+
+def _minutes(time_of_day: str) -> int:
+    hours, minutes = time_of_day.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def bucket_codes(entry_datetime: np.ndarray, bucket_minutes: int = 30,
+                 session_start: str = "00:00", session_end: str = "00:00") -> tuple:
+    """Cell code (weekday * buckets per session + intraday bucket) of every trade.
+
+    Buckets are counted from session_start. A session that ends at or before
+    it starts runs past midnight and belongs to the weekday it ends on, so
+    Sunday evening trades of a 18:00-17:00 session count as Monday. Trades
+    outside the session or without an entry time get code -1.
+    Returns (codes, number of buckets per session).
+    """
+    start = _minutes(session_start)
+    length = (_minutes(session_end) - start) % MINUTES_PER_DAY or MINUTES_PER_DAY
+    wraps = start + length > MINUTES_PER_DAY
+    num_buckets = -(-length // bucket_minutes)
+
+    # Whole minutes since the session start on 1970-01-01 (a Thursday)
+    entry_datetime = np.asarray(entry_datetime, dtype='datetime64[ns]')
+    minutes = entry_datetime.astype('datetime64[m]').astype(np.int64) - start
+    day, minute_in_session = np.divmod(minutes, MINUTES_PER_DAY)
+    weekday = (day + 3 + wraps) % 7
+
+    codes = weekday * num_buckets + minute_in_session // bucket_minutes
+    codes[(minute_in_session >= length) | np.isnat(entry_datetime)] = -1
+    return codes, num_buckets
+
+def bucket_labels(bucket_minutes: int = 30, session_start: str = "00:00", session_end: str = "00:00") -> list:
+    """Start time ('HH:MM') of every intraday bucket of the session."""
+    start = _minutes(session_start)
+    length = (_minutes(session_end) - start) % MINUTES_PER_DAY or MINUTES_PER_DAY
+    return [f"{(start + offset) % MINUTES_PER_DAY // 60:02d}:{(start + offset) % 60:02d}"
+            for offset in range(0, length, bucket_minutes)]
+
+@profiled()
+def time_of_day_stats(pipeline: MetricsPipeline, bucket_minutes: int = 30,
+                      session_start: str = "00:00", session_end: str = "00:00") -> dict:
+    """compute_basic_stats per weekday x intraday bucket cell of a pipeline's trades.
+
+    Each additive stat term is summed per cell with one np.bincount over the
+    cell codes, so the cost is linear in the number of trades. Returns a dict
+    of dense weekday x bucket DataFrames, one per basic stat; cells without
+    trades are NaN except for num_trades, which is 0.
+    """
+    codes, num_buckets = bucket_codes(pipeline._column('entry_datetime'), bucket_minutes, session_start, session_end)
+    in_session = codes >= 0
+    codes = codes[in_session]
+    num_cells = 7 * num_buckets
+
+    sums = {}
+    for key, values in pipeline.basic_stat_terms.items():
+        summed = np.bincount(codes, weights=values[in_session], minlength=num_cells)
+        sums[key] = np.rint(summed).astype(np.int64) if values.dtype.kind == 'i' else summed
+
+    empty = sums['num_trades'] == 0
+    labels = bucket_labels(bucket_minutes, session_start, session_end)
+    stats = {}
+    for key, values in _basic_stats_from_sums(sums).items():
+        if key != 'num_trades':
+            values = np.where(empty, np.nan, values)
+        stats[key] = pd.DataFrame(values.reshape(7, num_buckets), index=WEEKDAYS, columns=labels)
+    return stats
+
+def compute_time_of_day_stats(trade_data: pd.DataFrame, bucket_minutes: int = 30,
+                              session_start: str = "00:00", session_end: str = "00:00") -> dict:
+    """Basic stats per weekday x time-of-day bucket, see time_of_day_stats.
+    """
+    return time_of_day_stats(MetricsPipeline(trade_data), bucket_minutes, session_start, session_end)
+
+@memoize()
+def cached_time_of_day_stats(trade_data: pd.DataFrame, filters: dict = None, bucket_minutes: int = 30,
+                             session_start: str = "00:00", session_end: str = "00:00") -> dict:
+    """Memoized time_of_day_stats over the trades matching `filters` (all if None)."""
+    pipeline = filtered_pipeline(trade_data, **filters) if filters else _shared_pipeline(trade_data)
+    return time_of_day_stats(pipeline, bucket_minutes, session_start, session_end)
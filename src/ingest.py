@@ -0,0 +1,293 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+from src.aggregates import TradeAggregates
+from src.config import PROCESSED_DATA_DIR, RAW_DATA_DIR
+from src.data_loader import read_trade_csv
+from src.distributions import DistributionSketches
+from src.metrics import MetricsPipeline, _basic_stats_from_sums
+from src.preprocessing import PROCESSED_DTYPES, iter_preprocessed_chunks
+from src.profiling import profiled
+
+STATE_VERSION = 3
+
+# Live sessions keep their own store, so the processed trades.csv is never rewritten
+LIVE_STORE = "trades_live.csv"
+
+class IncrementalIngester:
+    """Tail a Sierra Chart TradesList export into a processed trades CSV.
+
+    The ingester remembers the byte offset just past the last trade row it
+    parsed, so each poll only reads rows Sierra Chart appended since. The
+    offset never moves past the 'Total:' footer, so both appending after the
+    footer and rewriting it below the new rows are picked up. Running sums,
+    per-(day, symbol, account) aggregates, the cumulative PnL curve's
+    extremes and the duration sums are kept in the state file and updated
+    from the new rows only, and the equity curve and distribution sketches
+    are extended in memory, so basic_stats(), advanced_stats(), the
+    aggregates and the sketches cost the same however long the session is.
+    """
+
+    def __init__(self, raw_file: str = "TradesList.txt", store_file: str = LIVE_STORE):
+        self.raw_path = RAW_DATA_DIR / raw_file
+        self.store_path = PROCESSED_DATA_DIR / store_file
+        self.state_path = PROCESSED_DATA_DIR / f"{self.store_path.stem}_ingest_state.json"
+        self.state = self._load_state()
+        self.rebuilt = False      # whether the last poll reprocessed the whole export
+        self._trade_data = None
+        self._aggregates = None   # TradeAggregates of the state's period records
+        self._sketches = None     # DistributionSketches of all ingested trades
+        self._period_rows = None  # (date, symbol, account) -> position in the period records
+        self._curve = None        # cumulative PnL, filled up to _curve_size
+        self._curve_size = 0
+
+    @property
+    def trade_data(self) -> pd.DataFrame:
+        """All processed trades, loaded once and extended in memory by poll().
+        """
+        if self._trade_data is None:
+            if not self.state or not self.store_path.exists():
+                self.poll()
+            if self._trade_data is None:
+                self._trade_data = read_trade_csv(self.store_path)
+        return self._trade_data
+
+    @profiled()
+    def poll(self) -> pd.DataFrame:
+        """Ingest the trades appended to the raw export since the last poll.
+
+        Returns the new trades (empty if there are none). If the export was
+        replaced, it is reprocessed whole, all of it is returned and
+        `rebuilt` is set until the next poll.
+        """
+        self.rebuilt = False
+        with open(self.raw_path, 'rb') as f:
+            header = f.readline()
+            size = f.seek(0, io.SEEK_END)
+
+            # A missing state, a new header or a shrunken file means the export was replaced;
+            # a missing store has lost the trades already ingested
+            if (not self.state or self.state['header'] != header.decode()
+                    or size < self.state['offset'] or not self.store_path.exists()):
+                return self._rebuild()
+
+            f.seek(self.state['offset'])
+            data = f.read()
+
+        consumed = _trade_rows_length(data)
+        if not consumed:
+            return _empty_trades()
+
+        new_trades = _parse_rows(header + data[:consumed])
+        self.state['offset'] += consumed
+        if new_trades.empty:
+            self._save_state()
+            return new_trades
+
+        if self.state['last_entry_datetime'] and new_trades['entry_datetime'].min() < pd.Timestamp(self.state['last_entry_datetime']):
+            # Trades arrived out of entry order: merge them into the sorted store
+            trade_data = pd.concat([self.trade_data, new_trades], ignore_index=True)
+            trade_data.sort_values(by='entry_datetime', kind='stable', inplace=True)
+            trade_data.reset_index(drop=True, inplace=True)
+            trade_data.to_csv(self.store_path, index=False)
+            self._set_trade_data(trade_data, reset_aggregates=True)
+        else:
+            new_trades.to_csv(self.store_path, mode='a', header=False, index=False)
+            if self._trade_data is not None:
+                self._trade_data = pd.concat([self._trade_data, new_trades], ignore_index=True)
+            self._update_aggregates(new_trades)
+            self.state['last_entry_datetime'] = str(new_trades['entry_datetime'].max())
+
+        self._save_state()
+        return new_trades
+
+    def basic_stats(self) -> dict:
+        """compute_basic_stats over all ingested trades, from the running sums.
+        """
+        sums = {key: np.asarray(value) for key, value in self.state['aggregates']['sums'].items()}
+        return {key: value.item() for key, value in _basic_stats_from_sums(sums).items()}
+
+    def advanced_stats(self) -> dict:
+        """compute_advanced_stats over all ingested trades, from the running state.
+        """
+        aggregates = self.state['aggregates']
+        total_profit_loss = aggregates['sums']['total_profit_loss']
+        max_drawdown = aggregates['max_drawdown']
+        durations = {name: total / count if count else np.nan for name, (total, count) in aggregates['durations'].items()}
+
+        return {
+            'cumulative_pnl': self.cumulative_pnl,
+            'max_win': aggregates['max_win'],
+            'max_loss': aggregates['max_loss'],
+            'max_drawdown': max_drawdown,
+            'relative_drawdown': abs(max_drawdown / total_profit_loss) if total_profit_loss > 0 else float('inf'),
+            'avg_duration': durations['all'],
+            'avg_duration_win': durations['win'],
+            'avg_duration_loss': durations['loss']
+        }
+
+    @property
+    def cumulative_pnl(self) -> pd.Series:
+        """Cumulative PnL after each ingested trade, as MetricsPipeline.cumulative_pnl."""
+        if self._curve is None:
+            curve = self.trade_data['profit_loss'].cumsum().to_numpy(dtype=float)
+            self._curve, self._curve_size = curve, len(curve)
+        return pd.Series(self._curve[:self._curve_size], name='profit_loss')
+
+    @property
+    def aggregates(self) -> TradeAggregates:
+        """Per-(day, symbol, account) sums over all ingested trades."""
+        if self._aggregates is None:
+            self._aggregates = TradeAggregates.from_records(self.state['aggregates']['periods'])
+        return self._aggregates
+
+    @property
+    def sketches(self) -> DistributionSketches:
+        """Distribution sketches of all ingested trades, built once and extended by poll()."""
+        if self._sketches is None:
+            self._sketches = DistributionSketches.from_trades(self.trade_data)
+        return self._sketches
+
+    def daily_stats(self) -> dict:
+        """compute_daily_stats over all ingested trades, from the aggregates.
+        """
+        return self.aggregates.daily_stats()
+
+    def _rebuild(self) -> pd.DataFrame:
+        """Reprocess the whole export into the store and reset the state.
+        """
+        with open(self.raw_path, 'rb') as f:
+            header = f.readline()
+            data = f.read()
+        consumed = _trade_rows_length(data)
+
+        trade_data = _parse_rows(header + data[:consumed])
+        trade_data.sort_values(by='entry_datetime', kind='stable', inplace=True)
+        trade_data.reset_index(drop=True, inplace=True)
+        trade_data.to_csv(self.store_path, index=False)
+
+        self.state = {'version': STATE_VERSION, 'header': header.decode(), 'offset': len(header) + consumed}
+        self.rebuilt = True
+        self._set_trade_data(trade_data, reset_aggregates=True)
+        self._save_state()
+        return trade_data
+
+    def _set_trade_data(self, trade_data: pd.DataFrame, reset_aggregates: bool = False) -> None:
+        self._trade_data = trade_data
+        if reset_aggregates:
+            self.state['aggregates'] = _empty_aggregates()
+            self._aggregates = self._sketches = self._period_rows = self._curve = None
+            self._update_aggregates(trade_data)
+        self.state['last_entry_datetime'] = str(trade_data['entry_datetime'].max()) if not trade_data.empty else None
+
+    def _update_aggregates(self, new_trades: pd.DataFrame) -> None:
+        """Fold new trades, in store order, into the running aggregates.
+
+        Only the period records the trades touch are changed, and the
+        equity curve is extended by their cumulative PnL.
+        """
+        if new_trades.empty:
+            return
+
+        aggregates = self.state['aggregates']
+        pipeline = MetricsPipeline(new_trades)
+        sums = aggregates['sums']
+        for key, values in pipeline.basic_stat_terms.items():
+            sums[key] += values.sum().item()
+
+        # Add the new trades' period sums to their records, appending unseen periods
+        records = aggregates['periods']
+        if self._period_rows is None:
+            self._period_rows = {tuple(record[:3]): position for position, record in enumerate(records)}
+        for record in TradeAggregates.from_trades(new_trades).to_records():
+            position = self._period_rows.setdefault(tuple(record[:3]), len(records))
+            if position == len(records):
+                records.append(record)
+            else:
+                records[position][3:] = [total + value for total, value in zip(records[position][3:], record[3:])]
+        if self._aggregates is not None:
+            self._aggregates.add(pipeline)
+        if self._sketches is not None:
+            self._sketches.add(pipeline)
+
+        # Largest win and loss, and duration sums of all, winning and losing trades
+        profit_loss = pipeline.profit_loss
+        aggregates['max_win'] = float(np.fmax(aggregates['max_win'], np.fmax.reduce(profit_loss)))
+        aggregates['max_loss'] = float(np.fmin(aggregates['max_loss'], np.fmin.reduce(profit_loss)))
+        duration = pipeline._column('duration_sec', float)
+        has_duration = ~np.isnan(duration)
+        for name, selected in (('all', has_duration), ('win', has_duration & pipeline.is_win),
+                               ('loss', has_duration & pipeline.is_loss)):
+            aggregates['durations'][name][0] += duration[selected].sum().item()
+            aggregates['durations'][name][1] += int(selected.sum())
+
+        # Continue the cumulative PnL curve and its running peak; NaN PnLs stay NaN, as with cumsum
+        cumulative_pnl = aggregates['cumulative_pnl'] + np.nancumsum(profit_loss)
+        cumulative_pnl[np.isnan(profit_loss)] = np.nan
+        peaks = np.fmax.accumulate(np.fmax(cumulative_pnl, aggregates['peak_pnl']))
+        aggregates['max_drawdown'] = float(np.fmin(aggregates['max_drawdown'], np.fmin.reduce(cumulative_pnl - peaks)))
+        aggregates['cumulative_pnl'] = float(aggregates['cumulative_pnl'] + np.nansum(profit_loss))
+        aggregates['peak_pnl'] = float(peaks[-1])
+        if self._curve is not None:
+            self._extend_curve(cumulative_pnl)
+
+    def _extend_curve(self, values: np.ndarray) -> None:
+        """Append to the equity curve, doubling its buffer when full."""
+        size = self._curve_size + len(values)
+        if size > len(self._curve):
+            curve = np.empty(max(size, 2 * len(self._curve)))
+            curve[:self._curve_size] = self._curve[:self._curve_size]
+            self._curve = curve
+        self._curve[self._curve_size:size] = values
+        self._curve_size = size
+
+    def _load_state(self) -> dict:
+        try:
+            state = json.loads(self.state_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+        return state if state.get('version') == STATE_VERSION else {}
+
+    def _save_state(self) -> None:
+        self.state_path.write_text(json.dumps(self.state))
+
+def _trade_rows_length(data: bytes) -> int:
+    """Length of the leading complete lines of `data`, up to the last trade row.
+
+    Trailing partial lines (still being written) and non-trade rows such as
+    the 'Total:' footer are left for the next poll.
+    """
+    consumed = 0
+    position = 0
+    for line in data.splitlines(keepends=True):
+        position += len(line)
+        if not line.endswith(b'\n'):
+            break
+        if line.split(b'\t', 1)[0].strip():
+            consumed = position
+    return consumed
+
+def _parse_rows(raw_rows: bytes) -> pd.DataFrame:
+    """Preprocess raw export rows (header line included) into processed trades.
+    """
+    chunks = list(iter_preprocessed_chunks(io.BytesIO(raw_rows), chunksize=None))
+    if not chunks:
+        return _empty_trades()
+    return pd.concat(chunks, ignore_index=True)
+
+def _empty_trades() -> pd.DataFrame:
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in PROCESSED_DTYPES.items()})
+
+def _empty_aggregates() -> dict:
+    return {
+        'sums': {key: 0 for key in MetricsPipeline(_empty_trades()).basic_stat_terms},
+        'periods': [],
+        'cumulative_pnl': 0.0,
+        'peak_pnl': -np.inf,
+        'max_drawdown': np.nan,
+        'max_win': np.nan,
+        'max_loss': np.nan,
+        'durations': {'all': [0.0, 0], 'win': [0.0, 0], 'loss': [0.0, 0]},
+    }
@@ -1,59 +1,305 @@
+from functools import cached_property, wraps
+
 import pandas as pd
 import numpy as np
+from src.cache import memoize
+from src.profiling import profiled
 
-def add_mfe_mae_columns(trade_data: pd.DataFrame) -> pd.DataFrame:
-    """
-    Add new columns for MFE, MAE, and MFE/MAE ratio to the trade_data DataFrame.
+def _per_trade(method):
+    """cached_property for a per-trade array; subsets gather it from their parent."""
+    @wraps(method)
+    def wrapper(self):
+        if self._parent is not None:
+            return getattr(self._parent, method.__name__)[self.positions]
+        return method(self)
+    return cached_property(wrapper)
+
+class MetricsPipeline:
+    """Shared intermediates for computing every metric over one trade frame.
+
+    Intermediates (direction, MFE/MAE, win/loss masks, cumulative PnL, the
+    running sums behind the rolling stats) are derived from the frame's
+    columns on first use and memoized, so basic, advanced, daily and rolling
+    stats served from the same pipeline never copy the frame or repeat work.
+    The frame itself is never modified.
+
+    A pipeline can also cover only the rows at `positions` (see subset), in
+    which case its per-trade arrays are gathered from the pipeline over the
+    whole frame instead of being derived again.
     """
-    trade_data = trade_data.copy()  # Avoid modifying original df
 
-    is_long = trade_data['trade_type'] == 'Long'
-    is_short = trade_data['trade_type'] == 'Short'
+    def __init__(self, trade_data: pd.DataFrame, positions: np.ndarray = None, parent: 'MetricsPipeline' = None):
+        self.trade_data = trade_data
+        self.positions = positions
+        self._parent = parent
+        self.index = trade_data.index if positions is None else trade_data.index[positions]
+
+    def subset(self, positions: np.ndarray) -> 'MetricsPipeline':
+        """Pipeline over the rows of the frame at `positions` (sorted row positions).
+
+        No filtered copy of the frame is made: the subset gathers this
+        pipeline's memoized per-trade arrays, and any other column it needs,
+        at `positions`.
+        """
+        root = self if self._parent is None else self._parent
+        return MetricsPipeline(self.trade_data, np.asarray(positions, dtype=np.intp), parent=root)
+
+    def _column(self, name: str, dtype=None) -> np.ndarray:
+        values = self.trade_data[name].to_numpy(dtype=dtype)
+        return values if self.positions is None else values[self.positions]
+
+    @_per_trade
+    def profit_loss(self) -> np.ndarray:
+        return self._column('profit_loss', float)
+
+    @_per_trade
+    def direction(self) -> np.ndarray:
+        """Signed trade direction: 1 for Long, -1 for Short, 0 otherwise."""
+        if 'direction' in self.trade_data:
+            # Compact frames carry it precomputed
+            return self._column('direction', np.int8)
+        trade_type = self.trade_data['trade_type']
+        if self.positions is not None:
+            trade_type = trade_type.iloc[self.positions]
+        return np.where(trade_type == 'Long', 1, np.where(trade_type == 'Short', -1, 0)).astype(np.int8)
+
+    @_per_trade
+    def mfe(self) -> np.ndarray:
+        """Max favorable excursion: high - entry for longs, entry - low for shorts."""
+        entry_price = self._column('entry_price', float)
+        return np.select([self.direction > 0, self.direction < 0],
+                         [self._column('price_range_high', float) - entry_price,
+                          entry_price - self._column('price_range_low', float)],
+                         np.nan)
+
+    @_per_trade
+    def mae(self) -> np.ndarray:
+        """Max adverse excursion: entry - low for longs, high - entry for shorts."""
+        entry_price = self._column('entry_price', float)
+        return np.select([self.direction > 0, self.direction < 0],
+                         [entry_price - self._column('price_range_low', float),
+                          self._column('price_range_high', float) - entry_price],
+                         np.nan)
+
+    @_per_trade
+    def mfe_mae_ratio(self) -> np.ndarray:
+        """MFE / MAE, with division by zero and missing excursions mapped to 0."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = self.mfe / self.mae
+        ratio[~np.isfinite(ratio)] = 0
+        return ratio
+
+    @cached_property
+    def is_win(self) -> np.ndarray:
+        return self.profit_loss >= 0
+
+    @cached_property
+    def is_loss(self) -> np.ndarray:
+        return self.profit_loss < 0
+
+    @cached_property
+    def profit_loss_series(self) -> pd.Series:
+        return pd.Series(self.profit_loss, index=self.index, name='profit_loss')
+
+    @cached_property
+    def cumulative_pnl(self) -> pd.Series:
+        return self.profit_loss_series.cumsum()
+
+    @cached_property
+    def basic_stat_terms(self) -> dict:
+        """Per-trade contributions to the additive parts of the basic stats.
+
+        Every term is a running sum (or count), so the stats of any contiguous
+        slice of trades follow from the difference of two cumulative sums.
+        """
+        profit_loss = self.profit_loss
+        return {
+            'num_trades': np.ones(len(profit_loss), dtype=np.int64),
+            'total_profit_loss': np.nan_to_num(profit_loss),
+            'win_count': self.is_win.astype(np.int64),
+            'win_sum': np.where(self.is_win, profit_loss, 0.0),
+            'loss_count': self.is_loss.astype(np.int64),
+            'loss_sum': np.where(self.is_loss, profit_loss, 0.0),
+            'mfe_count': (~np.isnan(self.mfe)).astype(np.int64),
+            'mfe_sum': np.nan_to_num(self.mfe),
+            'mae_count': (~np.isnan(self.mae)).astype(np.int64),
+            'mae_sum': np.nan_to_num(self.mae),
+            'mfe_mae_ratio_sum': self.mfe_mae_ratio,
+        }
+
+    @cached_property
+    def basic_stat_prefix(self) -> dict:
+        return _cumulative_terms(self.basic_stat_terms)
+
+    @profiled()
+    def basic_stats(self) -> dict:
+        """Compute basic statistics from trade data.
+        """
+        num_trades = len(self.profit_loss)
+        total_profit_loss = self.profit_loss_series.sum()
+
+        wins = self.profit_loss[self.is_win]
+        losses = self.profit_loss[self.is_loss]
+
+        win_rate = len(wins) / num_trades if num_trades > 0 else 0
+        avg_win = wins.mean() if wins.size else 0
+        avg_loss = losses.mean() if losses.size else 0
+        avg_win_loss_ratio = avg_win / abs(avg_loss) if avg_loss != 0 else float('inf')
+        expectancy = (win_rate * avg_win) + ((1 - win_rate) * avg_loss)
+        profit_factor = wins.sum() / abs(losses.sum()) if losses.size else float('inf')
+        avg_mfe_mae_ratio = self.mfe_mae_ratio.mean() if num_trades > 0 else 0
+        avg_mfe = _nanmean(self.mfe) if num_trades > 0 else 0
+        avg_mae = _nanmean(self.mae) if num_trades > 0 else 0
+
+        return {
+            'num_trades': num_trades,
+            'total_profit_loss': total_profit_loss,
+            'win_rate': win_rate,
+            'avg_win': avg_win,
+            'avg_loss': avg_loss,
+            'avg_win_loss_ratio': avg_win_loss_ratio,
+            'expectancy': expectancy,
+            'profit_factor': profit_factor,
+            'avg_mfe_mae_ratio': avg_mfe_mae_ratio,
+            'avg_mfe': avg_mfe,
+            'avg_mae': avg_mae
+        }
+
+    @profiled()
+    def advanced_stats(self) -> dict:
+        """Compute advanced statistics from trade data.
+        """
+        profit_loss = self.profit_loss_series
+        total_profit_loss = profit_loss.sum()
+
+        max_win = profit_loss.max()
+        max_loss = profit_loss.min()
+
+        cumulative_pnl = self.cumulative_pnl
+        max_drawdown = cumulative_pnl.sub(cumulative_pnl.cummax()).min()
+        relative_drawdown = abs(max_drawdown / total_profit_loss) if total_profit_loss > 0 else float('inf')
+
+        # Upcast so float32 (compact) durations average in float64
+        duration = pd.Series(self._column('duration_sec', float))
+        avg_duration = duration.mean()
+        avg_duration_win = duration[self.is_win].mean()
+        avg_duration_loss = duration[self.is_loss].mean()
+
+        return {
+            'cumulative_pnl': cumulative_pnl,
+            'max_win': max_win,
+            'max_loss': max_loss,
+            'max_drawdown': max_drawdown,
+            'relative_drawdown': relative_drawdown,
+            'avg_duration': avg_duration,
+            'avg_duration_win': avg_duration_win,
+            'avg_duration_loss': avg_duration_loss
+        }
+
+    @profiled()
+    def daily_stats(self) -> dict:
+        """Compute daily statistics from trade data.
+        """
+        # Group by date once for both the PnL sums and the trade counts
+        date = pd.Series(self._column('date'), index=self.index, name='date')
+        daily = self.profit_loss_series.groupby(date).agg(['sum', 'size'])
+        if isinstance(daily.index, pd.DatetimeIndex):
+            # Compact frames store datetime64 dates; report datetime.date as for the processed schema
+            daily.index = pd.Index(daily.index.date, name='date')
+        daily_pnl = daily['sum'].rename('profit_loss')
+        trades_per_day = daily['size'].rename(None)
 
-    # For Long trades
-    # MFE = price_range_high - entry_price (max favorable excursion)
-    # MAE = entry_price - price_range_low (max adverse excursion)
-    trade_data.loc[is_long, 'mfe'] = trade_data.loc[is_long, 'price_range_high'] - trade_data.loc[is_long, 'entry_price']
-    trade_data.loc[is_long, 'mae'] = trade_data.loc[is_long, 'entry_price'] - trade_data.loc[is_long, 'price_range_low']
-    trade_data.loc[is_long, 'mfe_mae_ratio'] = trade_data.loc[is_long, 'mfe'] / trade_data.loc[is_long, 'mae']
+        # Daily stats
+        avg_day_pnl = daily_pnl.mean()
+        avg_win_day = daily_pnl[daily_pnl > 0].mean()
+        avg_loss_day = daily_pnl[daily_pnl < 0].mean()
+        days_traded = len(daily)
+        avg_trades_per_day = trades_per_day.mean() if not trades_per_day.empty else 0
 
-    # For Short trades
-    # MFE = entry_price - price_range_low
-    # MAE = price_range_high - entry_price
-    trade_data.loc[is_short, 'mfe'] = trade_data.loc[is_short, 'entry_price'] - trade_data.loc[is_short, 'price_range_low']
-    trade_data.loc[is_short, 'mae'] = trade_data.loc[is_short, 'price_range_high'] - trade_data.loc[is_short, 'entry_price']
-    trade_data.loc[is_short, 'mfe_mae_ratio'] = trade_data.loc[is_short, 'mfe'] / trade_data.loc[is_short, 'mae']
+        return {
+            'daily_pnl': daily_pnl,
+            'avg_day_pnl': avg_day_pnl,
+            'avg_win_day': avg_win_day,
+            'avg_loss_day': avg_loss_day,
+            'days_traded': days_traded,
+            'trades_per_day': trades_per_day,
+            'avg_trades_per_day': avg_trades_per_day
+        }
 
-    # Handle division by zero or invalid values by replacing infinities and NaNs with None or 0
-    trade_data['mfe_mae_ratio'].replace([float('inf'), -float('inf')], float('nan'), inplace=True)
-    trade_data['mfe_mae_ratio'].fillna(0, inplace=True)
+    @profiled()
+    def rolling_stats(self, window: int = 30) -> pd.DataFrame:
+        """Expanding and rolling basic stats for one window size.
 
-    return trade_data
+        The expanding sample at trade i is the prefix sum up to i, and the
+        rolling sample (trades i-window..i) adds trade i and evicts trade
+        i-window-1 via the difference of two prefix sums. Rows before the
+        first full window are NaN.
+        """
+        columns = _window_stats_columns(self.basic_stat_prefix, len(self.index), window)
+        return pd.DataFrame(columns, index=self.index)
+
+    @profiled()
+    def multi_window_stats(self, windows: tuple = (10, 30, 100, 500)) -> pd.DataFrame:
+        """Rolling stats for several window sizes, indexed by (window, trade index).
+
+        The prefix sums are shared, so each extra window costs one O(n) pass.
+        """
+        frames = [self.rolling_stats(window) for window in windows]
+        return pd.concat(frames, keys=list(windows), names=['window', self.index.name])
+
+def _nanmean(values: np.ndarray) -> float:
+    """Mean ignoring NaN, NaN if there are no values (like pd.Series.mean)."""
+    count = np.count_nonzero(~np.isnan(values))
+    return np.nansum(values) / count if count else np.nan
+
+def add_mfe_mae_columns(trade_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add new columns for MFE, MAE, and MFE/MAE ratio to the trade_data DataFrame.
+    """
+    pipeline = MetricsPipeline(trade_data)
+
+    # Returns a new frame; the original df is not modified
+    return trade_data.assign(mfe=pipeline.mfe, mae=pipeline.mae, mfe_mae_ratio=pipeline.mfe_mae_ratio)
 
 def compute_basic_stats(trade_data: pd.DataFrame) -> dict:
     """Compute basic statistics from trade data.
     """
-    trade_data = add_mfe_mae_columns(trade_data)
+    return MetricsPipeline(trade_data).basic_stats()
+
+def compute_advanced_stats(trade_data: pd.DataFrame) -> dict:
+    """Compute advanced statistics from trade data.
+    """
+    return MetricsPipeline(trade_data).advanced_stats()
 
-    num_trades = len(trade_data)
-    total_profit_loss = trade_data['profit_loss'].sum()
+def compute_daily_stats(trade_data: pd.DataFrame) -> pd.DataFrame:
+    """Compute daily statistics from trade data.
+    """
+    return MetricsPipeline(trade_data).daily_stats()
 
-    wins = trade_data[trade_data['profit_loss'] >= 0]['profit_loss']
-    losses = trade_data[trade_data['profit_loss'] < 0]['profit_loss']
+def _cumulative_terms(terms: dict) -> dict:
+    """Prefix sums of the per-trade terms, with a leading zero row."""
+    return {key: np.concatenate(([0], np.cumsum(values))) for key, values in terms.items()}
 
-    win_rate = len(wins) / num_trades if num_trades > 0 else 0
-    avg_win = wins.mean() if not wins.empty else 0
-    avg_loss = losses.mean() if not losses.empty else 0
-    avg_win_loss_ratio = avg_win / abs(avg_loss) if avg_loss != 0 else float('inf')
-    expectancy = (win_rate * avg_win) + ((1 - win_rate) * avg_loss)
-    profit_factor = wins.sum() / abs(losses.sum()) if not losses.empty else float('inf')
-    avg_mfe_mae_ratio = trade_data['mfe_mae_ratio'].mean() if not trade_data['mfe_mae_ratio'].empty else 0
-    avg_mfe = trade_data['mfe'].mean() if not trade_data['mfe'].empty else 0
-    avg_mae = trade_data['mae'].mean() if not trade_data['mae'].empty else 0
+def _basic_stats_from_sums(sums: dict) -> dict:
+    """Vectorized equivalent of compute_basic_stats over arrays of summed terms."""
+    num_trades = sums['num_trades']
+    win_count, win_sum = sums['win_count'], sums['win_sum']
+    loss_count, loss_sum = sums['loss_count'], sums['loss_sum']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win_rate = np.where(num_trades > 0, win_count / num_trades, 0.0)
+        avg_win = np.where(win_count > 0, win_sum / win_count, 0.0)
+        avg_loss = np.where(loss_count > 0, loss_sum / loss_count, 0.0)
+        avg_win_loss_ratio = np.where(avg_loss != 0, avg_win / np.abs(avg_loss), np.inf)
+        expectancy = (win_rate * avg_win) + ((1 - win_rate) * avg_loss)
+        profit_factor = np.where(loss_count > 0, win_sum / np.abs(loss_sum), np.inf)
+        avg_mfe_mae_ratio = sums['mfe_mae_ratio_sum'] / num_trades
+        avg_mfe = sums['mfe_sum'] / sums['mfe_count']
+        avg_mae = sums['mae_sum'] / sums['mae_count']
 
     return {
         'num_trades': num_trades,
-        'total_profit_loss': total_profit_loss,
+        'total_profit_loss': sums['total_profit_loss'],
         'win_rate': win_rate,
         'avg_win': avg_win,
         'avg_loss': avg_loss,
@@ -65,74 +311,57 @@ def compute_basic_stats(trade_data: pd.DataFrame) -> dict:
         'avg_mae': avg_mae
     }
 
-def compute_advanced_stats(trade_data: pd.DataFrame) -> dict:
-    """Compute advanced statistics from trade data.
-    """
-    total_profit_loss = trade_data['profit_loss'].sum()
-
-    max_win = trade_data['profit_loss'].max()
-    max_loss = trade_data['profit_loss'].min()
-
-    cumulative_pnl = trade_data['profit_loss'].cumsum()
-    max_drawdown = (pnl := trade_data['profit_loss'].cumsum()).sub(pnl.cummax()).min()
-    relative_drawdown = abs(max_drawdown / total_profit_loss) if total_profit_loss > 0 else float('inf')
+def _window_stats_columns(prefix: dict, num_rows: int, window: int) -> dict:
+    """Expanding and rolling stat columns for one window size from shared prefix sums."""
+    end = np.arange(window, num_rows) + 1
+    expanding = _basic_stats_from_sums({key: values[end] for key, values in prefix.items()})
+    rolling = _basic_stats_from_sums({key: values[end] - values[end - window - 1] for key, values in prefix.items()})
 
-    avg_duration = trade_data['duration_sec'].mean()
-    avg_duration_win = trade_data[trade_data['profit_loss'] >= 0]['duration_sec'].mean()
-    avg_duration_loss = trade_data[trade_data['profit_loss'] < 0]['duration_sec'].mean()
+    columns = {}
+    for key in expanding:
+        for prefix_name, stats in (('expanding', expanding), ('rolling', rolling)):
+            column = np.full(num_rows, np.nan)
+            column[window:] = stats[key]
+            columns[f'{prefix_name}_{key}'] = column
+    return columns
 
-    return {
-        'cumulative_pnl': cumulative_pnl,
-        'max_win': max_win,
-        'max_loss': max_loss,
-        'max_drawdown': max_drawdown,
-        'relative_drawdown': relative_drawdown,
-        'avg_duration': avg_duration,
-        'avg_duration_win': avg_duration_win,
-        'avg_duration_loss': avg_duration_loss
-    }
+def compute_rolling_stats(trade_data: pd.DataFrame, window: int = 30) -> pd.DataFrame:
+    """Compute rolling and expanding statistics from trade data.
 
-def compute_daily_stats(trade_data: pd.DataFrame) -> pd.DataFrame:
-    """Compute daily statistics from trade data.
+    Returns a copy of trade_data with the expanding_*/rolling_* columns
+    added; trade_data itself is left unchanged. See
+    MetricsPipeline.rolling_stats for how they are computed.
     """
-    # Group by date
-    daily_pnl = trade_data.groupby("date")["profit_loss"].sum()
+    return trade_data.assign(**MetricsPipeline(trade_data).rolling_stats(window))
 
-    # Daily stats
-    avg_day_pnl = daily_pnl.mean()
-    avg_win_day = daily_pnl[daily_pnl > 0].mean()
-    avg_loss_day = daily_pnl[daily_pnl < 0].mean()
-    days_traded = trade_data["date"].nunique()
-    trades_per_day = trade_data.groupby("date").size()
-    avg_trades_per_day = trades_per_day.mean() if not trades_per_day.empty else 0
+def compute_multi_window_stats(trade_data: pd.DataFrame, windows: tuple = (10, 30, 100, 500)) -> pd.DataFrame:
+    """Compute rolling and expanding statistics for several window sizes at once.
 
-    return {
-        'daily_pnl': daily_pnl,
-        'avg_day_pnl': avg_day_pnl,
-        'avg_win_day': avg_win_day,
-        'avg_loss_day': avg_loss_day,
-        'days_traded': days_traded,
-        'trades_per_day': trades_per_day,
-        'avg_trades_per_day': avg_trades_per_day
-    }
+    The prefix sums are built once and shared, so each extra window only
+    costs one O(n) difference pass. Returns a long DataFrame indexed by
+    (window, trade index) with the same expanding_*/rolling_* columns as
+    compute_rolling_stats; select one window with result.loc[window].
+    """
+    return MetricsPipeline(trade_data).multi_window_stats(windows)
 
-def compute_rolling_stats(trade_data: pd.DataFrame, window: int = 30) -> pd.DataFrame:
-    """Compute rolling and expanding statistics from trade data."""
-    metrics = compute_basic_stats(trade_data.iloc[:window])  # just to get keys
-    for key in metrics:
-        trade_data[f'expanding_{key}'] = np.nan
-        trade_data[f'rolling_{key}'] = np.nan
+# Memoized variants for callers that rerun with unchanged inputs (the
+# dashboard, notebooks). They share one pipeline per dataset, so a miss on
+# one of them reuses the intermediates derived for the others. Results are
+# shared between calls; do not modify them.
+_shared_pipeline = memoize(maxsize=4)(MetricsPipeline)
 
-    for i in range(window, len(trade_data)):
-        expanding_sample = trade_data.iloc[:i+1]
-        rolling_sample = trade_data.iloc[i-window:i+1]
+@memoize()
+def cached_basic_stats(trade_data: pd.DataFrame) -> dict:
+    return _shared_pipeline(trade_data).basic_stats()
 
-        expanding_stats = compute_basic_stats(expanding_sample)
-        rolling_stats = compute_basic_stats(rolling_sample)
+@memoize()
+def cached_advanced_stats(trade_data: pd.DataFrame) -> dict:
+    return _shared_pipeline(trade_data).advanced_stats()
 
-        for key, value in expanding_stats.items():
-            trade_data.loc[trade_data.index[i], f'expanding_{key}'] = value
-        for key, value in rolling_stats.items():
-            trade_data.loc[trade_data.index[i], f'rolling_{key}'] = value
+@memoize()
+def cached_daily_stats(trade_data: pd.DataFrame) -> dict:
+    return _shared_pipeline(trade_data).daily_stats()
 
-    return trade_data
\ No newline at end of file
+@memoize()
+def cached_multi_window_stats(trade_data: pd.DataFrame, windows: tuple = (10, 30, 100, 500)) -> pd.DataFrame:
+    return _shared_pipeline(trade_data).multi_window_stats(windows)
@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+from src.cache import memoize
+from src.filters import filtered_pipeline
+from src.grouped import available_cpus
+from src.metrics import _shared_pipeline
+from src.profiling import profiled
+
+METHODS = ('iid', 'block', 'permutation')
+PERCENTILES = (5, 25, 50, 75, 95)
+PATH_COLUMNS = ['final_pnl', 'max_drawdown', 'longest_losing_streak']
+
+# Working memory per simulated trade: sampled positions, equity, running peak and streak counter
+BYTES_PER_CELL = 32
+
+@profiled()
+def simulate_equity_curves(profit_loss, num_paths: int = 1000, method: str = 'iid', block_size: int = 20,
+                           seed: int = 0, memory_mb: int = 256, curve_points: int = 200, processes: int = 1) -> dict:
+    """Monte Carlo equity curves resampled from a trade PnL sequence.
+
+    method 'iid' draws every trade independently with replacement, 'block'
+    draws circular blocks of `block_size` consecutive trades (keeping
+    short-range dependence such as streaks), and 'permutation' shuffles the
+    trades, so only their order changes. Paths are simulated in batches,
+    each a 2-D gather and cumsum; with `processes` > 1 the batches are
+    spread over a process pool and `memory_mb` is split between the
+    workers, so the simulation stays within it either way. Every path has
+    its own seed, so results depend on seed but not on memory_mb or the
+    number of processes. Missing PnLs count as 0.
+
+    Returns a dict with:
+      paths: final PnL, max drawdown and longest losing streak of each path
+      bands: percentiles (PERCENTILES) of those, one row per percentile
+      curve_bands: percentiles of the equity at up to `curve_points` trades,
+        indexed like profit_loss (a Series keeps its index)
+      actual: the same three numbers for the trades in their real order
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    index = profit_loss.index if isinstance(profit_loss, pd.Series) else None
+    pnl = np.nan_to_num(np.asarray(profit_loss, dtype=float))
+    num_trades = len(pnl)
+    if not num_trades:
+        raise ValueError("No trades to resample")
+    index = index if index is not None else pd.RangeIndex(num_trades)
+    checkpoints = np.unique(np.linspace(0, num_trades - 1, min(curve_points, num_trades)).round().astype(np.intp))
+
+    # Batches of path seeds, sized so that every worker's batch fits its share of the budget
+    seeds = np.random.SeedSequence(seed).spawn(num_paths)
+    batch_paths = paths_per_batch(num_trades, memory_mb, processes)
+    batches = [seeds[start:start + batch_paths] for start in range(0, num_paths, batch_paths)]
+
+    results = None
+    if processes > 1 and len(batches) > 1:
+        try:
+            results = _simulate_parallel(pnl, batches, method, block_size, checkpoints, processes)
+        except (OSError, BrokenProcessPool):
+            pass
+    if results is None:
+        results = _simulate_batches(pnl, batches, method, block_size, checkpoints)
+    final_pnl, max_drawdown, longest_streak, curves = results
+
+    paths = pd.DataFrame({'final_pnl': final_pnl, 'max_drawdown': max_drawdown, 'longest_losing_streak': longest_streak})
+    actual = _path_stats(pnl[np.newaxis].copy(), checkpoints)
+    return {
+        'paths': paths,
+        'bands': pd.DataFrame(np.percentile(paths, PERCENTILES, axis=0), index=pd.Index(PERCENTILES, name='percentile'),
+                              columns=PATH_COLUMNS),
+        'curve_bands': pd.DataFrame(np.percentile(curves, PERCENTILES, axis=0).T, index=index[checkpoints],
+                                    columns=list(PERCENTILES)),
+        'actual': {column: values[0].item() for column, values in zip(PATH_COLUMNS, actual)},
+    }
+
+def paths_per_batch(num_trades: int, memory_mb: int = 256, processes: int = 1) -> int:
+    """Paths simulated at once by each of `processes` workers sharing `memory_mb`."""
+    return max(1, memory_mb * 2 ** 20 // (max(processes, 1) * num_trades * BYTES_PER_CELL))
+
+def _sample(pnl: np.ndarray, seeds: list, method: str, block_size: int) -> np.ndarray:
+    """len(seeds) x len(pnl) resampled PnL sequences, one row per path seed."""
+    num_trades = len(pnl)
+    rngs = [np.random.default_rng(seed) for seed in seeds]
+    if method == 'permutation':
+        paths = np.tile(pnl, (len(rngs), 1))
+        for row, rng in zip(paths, rngs):
+            rng.shuffle(row)
+        return paths
+
+    positions = np.empty((len(rngs), num_trades), dtype=np.intp)
+    if method == 'iid':
+        for row, rng in zip(positions, rngs):
+            row[:] = rng.integers(0, num_trades, size=num_trades)
+        return pnl[positions]
+
+    # Circular block bootstrap: consecutive runs from random starts, wrapping at the end
+    num_blocks = -(-num_trades // block_size)
+    for row, rng in zip(positions, rngs):
+        row[:] = (rng.integers(0, num_trades, size=(num_blocks, 1)) + np.arange(block_size)).ravel()[:num_trades]
+    positions %= num_trades
+    return pnl[positions]
+
+def _path_stats(pnl: np.ndarray, checkpoints: np.ndarray) -> tuple:
+    """Final PnL, max drawdown, longest losing streak and checkpoint equity of every row.
+
+    Works in place on `pnl`. Drawdowns are measured from the running peak of
+    the equity curve, as in compute_advanced_stats.
+    """
+    losing = pnl < 0
+    equity = np.cumsum(pnl, axis=1, out=pnl)
+    peaks = np.maximum.accumulate(equity, axis=1)
+    max_drawdown = np.subtract(equity, peaks, out=peaks).min(axis=1)
+
+    # Losing streak length at each trade: trades since the last one that was not a loss
+    count = np.arange(1, pnl.shape[1] + 1, dtype=np.int32)
+    last_reset = np.multiply(count, ~losing, dtype=np.int32)
+    np.maximum.accumulate(last_reset, axis=1, out=last_reset)
+    longest_streak = np.subtract(count, last_reset, out=last_reset).max(axis=1).astype(np.int64)
+    return equity[:, -1].copy(), max_drawdown, longest_streak, equity[:, checkpoints]
+
+def _simulate_batches(pnl: np.ndarray, batches: list, method: str, block_size: int, checkpoints: np.ndarray) -> list:
+    results = [_path_stats(_sample(pnl, seeds, method, block_size), checkpoints) for seeds in batches]
+    return [np.concatenate(parts) for parts in zip(*results)]
+
+def _simulate_parallel(pnl: np.ndarray, batches: list, method: str, block_size: int,
+                       checkpoints: np.ndarray, processes: int) -> list:
+    """Simulate contiguous runs of batches in a process pool, keeping batch order."""
+    cuts = np.unique(np.linspace(0, len(batches), processes * 4 + 1).astype(int))
+    tasks = [batches[start:end] for start, end in zip(cuts[:-1], cuts[1:])]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(_simulate_batches, [pnl] * len(tasks), tasks, [method] * len(tasks),
+                                [block_size] * len(tasks), [checkpoints] * len(tasks)))
+    return [np.concatenate(parts) for parts in zip(*results)]
+
+@memoize(maxsize=8)
+def cached_monte_carlo(trade_data: pd.DataFrame, filters: dict = None, num_paths: int = 1000, method: str = 'iid',
+                       block_size: int = 20, seed: int = 0) -> dict:
+    """Memoized simulate_equity_curves over the trades matching `filters` (all if None).
+
+    Uses every available core; curve_bands is indexed like the cumulative
+    PnL of the same trades, so the bands line up with its chart.
+    """
+    pipeline = filtered_pipeline(trade_data, **filters) if filters else _shared_pipeline(trade_data)
+    return simulate_equity_curves(pipeline.profit_loss_series, num_paths, method, block_size, seed,
+                                  processes=available_cpus())
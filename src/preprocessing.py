@@ -1,73 +1,205 @@
+import re
+
+import numpy as np
 import pandas as pd
 from src.config import RAW_DATA_DIR
+from src.profiling import profiled
+
+# Raw Sierra Chart columns kept for processing, with their processed names
+RAW_COLUMNS = {'Symbol': 'symbol',
+               'Trade Type': 'trade_type',
+               'Entry DateTime': 'entry_datetime',
+               'Exit DateTime': 'exit_datetime',
+               'Entry Price': 'entry_price',
+               'Exit Price': 'exit_price',
+               'Trade Quantity': 'quantity',
+               'Profit/Loss (C)': 'profit_loss',
+               'Commission (C)': 'commission',
+               'High Price While Open': 'price_range_high',
+               'Low Price While Open': 'price_range_low',
+               'Duration': 'duration',
+               'Account': 'Account'}
+
+# Columns of a processed trades frame and their types
+PROCESSED_DTYPES = {'symbol': 'object',
+                    'trade_type': 'object',
+                    'entry_datetime': 'datetime64[ns]',
+                    'exit_datetime': 'datetime64[ns]',
+                    'entry_price': 'float64',
+                    'exit_price': 'float64',
+                    'quantity': 'float64',
+                    'profit_loss': 'float64',
+                    'commission': 'float64',
+                    'price_range_high': 'float64',
+                    'price_range_low': 'float64',
+                    'Account': 'object',
+                    'duration_sec': 'float64',
+                    'date': 'object'}
+
+# Compact schema (see compact_trades): low-cardinality text columns become
+# categoricals, and these float columns are narrowed to float32 when every
+# value survives the round trip exactly (quarter-tick index prices, whole
+# quantities and durations). PnL stays float64 because it is summed over the
+# whole history.
+CATEGORICAL_COLUMNS = ['symbol', 'trade_type', 'Account']
+FLOAT32_COLUMNS = ['entry_price', 'exit_price', 'quantity', 'commission',
+                   'price_range_high', 'price_range_low', 'duration_sec']
+
+# Columns that are always parsed from text; the rest get pd.read_csv type inference
+TEXT_COLUMNS = ['Symbol', 'Trade Type', 'Entry DateTime', 'Exit DateTime', 'Duration']
+INFERRED_COLUMNS = [column for column in RAW_COLUMNS if column not in TEXT_COLUMNS]
 
-def preprocess_raw_data(file_name: str = "TradesList.txt") -> pd.DataFrame:
+# Text after the last ']' up to the first '-' or space, capped at three characters
+SYMBOL_PATTERN = re.compile(r'(?:.*\])?\s*([^\s-]{0,3})')
+
+# Sierra Chart writes '2025-05-21  14:33:36.209 BP'; normalized to ISO for the fast parser,
+# which also accepts times without milliseconds
+DATETIME_FORMAT = 'ISO8601'
+
+@profiled()
+def preprocess_raw_data(file_name: str = "TradesList.txt", chunksize: int = None,
+                        compact: bool = False) -> pd.DataFrame:
     """Load and preprocess raw data from a CSV file.
+
+    With `chunksize` set, the export is streamed in chunks of that many rows,
+    so only the projected columns of one raw chunk are in memory at a time.
+    Column types are reconciled across chunks, so the result is identical to
+    reading the file in one go. With `compact`, the result is converted with
+    compact_trades.
     """
-    # Load the raw data
-    raw_data = pd.read_csv(RAW_DATA_DIR / f"{file_name}", sep='\t')
-
-    # Drop unnecessary columns
-    raw_data.drop(columns=['Max Open Quantity',
-                         'Max Closed Quantity',
-                         'Cumulative Profit/Loss (C)',
-                         'FlatToFlat Profit/Loss (C)',
-                         'FlatToFlat Max Open Profit (C)',
-                         'FlatToFlat Max Open Loss (C)',
-                         'Max Open Profit (C)',
-                         'Max Open Loss (C)',
-                         'Entry Efficiency',
-                         'Exit Efficiency',
-                         'Total Efficiency',
-                         'Note',
-                         'Open Position Quantity',
-                         'Close Position Quantity'],
-                         inplace=True)
-    
-    # Drop empty rows
-    raw_data.dropna(axis=0, inplace=True)
-
-    # Rename columns
-    raw_data.rename(columns={'Symbol': 'symbol',
-                                'Trade Type': 'trade_type',
-                                'Entry DateTime': 'entry_datetime',
-                                'Exit DateTime': 'exit_datetime',
-                                'Entry Price': 'entry_price',
-                                'Exit Price': 'exit_price',
-                                'Trade Quantity': 'quantity',
-                                'Profit/Loss (C)': 'profit_loss',
-                                'Commission (C)': 'commission',
-                                'High Price While Open': 'price_range_high',
-                                'Low Price While Open': 'price_range_low',
-                                'Duration': 'duration'}, inplace=True)
-    
-    # Clean the symbol string
-    raw_data['symbol'] = raw_data['symbol'].apply(
-        lambda x: x.split(']')[-1].split('-')[0].strip().split(' ')[0][0:3]
-    )
+    chunks = []
+    row_masks = []
+    chunk_dtypes = {column: [] for column in INFERRED_COLUMNS}
 
-    # Convert datetime columns to datetime type
-    raw_data['entry_datetime'] = pd.to_datetime(
-        raw_data['entry_datetime'].str.replace(' BP', '', regex=False)
-    )
-    raw_data['exit_datetime'] = pd.to_datetime(
-        raw_data['exit_datetime'].str.replace(' EP', '', regex=False)
-    )
+    for chunk in _read_raw_chunks(file_name, chunksize):
+        for column in INFERRED_COLUMNS:
+            chunk_dtypes[column].append(chunk[RAW_COLUMNS[column]].dtype)
 
-    # Convert duration column to timedelta type
-    raw_data['duration_sec'] = pd.to_timedelta(raw_data['duration']).dt.total_seconds()
-    raw_data.drop(columns=['duration'], inplace=True)
+        # Drop empty rows
+        keep = chunk.notna().all(axis=1).to_numpy()
+        row_masks.append(keep)
+        if chunks and not keep.any():
+            continue
+        chunks.append(_clean_chunk(chunk[keep]))
 
-    # Add simple date column for convenience of stats computation
-    raw_data['date'] = raw_data['entry_datetime'].dt.date
+    clean_data = pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+    # Give each column the type a single pd.read_csv pass would have inferred
+    for column in INFERRED_COLUMNS:
+        dtypes = set(chunk_dtypes[column])
+        if len(dtypes) == 1:
+            continue
+        if dtypes <= {np.dtype('int64'), np.dtype('float64')}:
+            clean_data[RAW_COLUMNS[column]] = clean_data[RAW_COLUMNS[column]].astype('float64')
+        else:
+            # Numbers mixed with text (e.g. the 'Total:' footer) stay text, as
+            # in a single pass, so the column is read again as strings
+            text_chunks = _read_raw_chunks(file_name, chunksize, usecols=[column])
+            clean_data[RAW_COLUMNS[column]] = np.concatenate(
+                [text[RAW_COLUMNS[column]].to_numpy()[keep] for text, keep in zip(text_chunks, row_masks)]
+            )
 
     # Order by entry datetime
-    raw_data.sort_values(by='entry_datetime', inplace=True)
+    clean_data.sort_values(by='entry_datetime', inplace=True)
 
     # Reset index after sorting
-    raw_data.reset_index(drop=True, inplace=True)
+    clean_data.reset_index(drop=True, inplace=True)
+
+    return compact_trades(clean_data) if compact else clean_data
+
+@profiled()
+def compact_trades(trade_data: pd.DataFrame) -> pd.DataFrame:
+    """Convert processed trades to the compact in-memory schema.
+
+    symbol, trade_type and Account become categoricals, date becomes
+    datetime64, a `direction` column (1 Long, -1 Short, 0 other, int8) is
+    added after trade_type, and price-like columns are stored as float32
+    where that is lossless. All metric functions accept the result.
+    """
+    compact = {}
+    for column, values in trade_data.items():
+        if column in CATEGORICAL_COLUMNS:
+            compact[column] = values.astype('category')
+        elif column == 'date':
+            compact[column] = pd.to_datetime(values)
+        elif column in PROCESSED_DTYPES and PROCESSED_DTYPES[column] == 'float64':
+            values = pd.to_numeric(values).astype('float64')
+            if column in FLOAT32_COLUMNS and _fits_float32(values.to_numpy()):
+                values = values.astype('float32')
+            compact[column] = values
+        else:
+            compact[column] = values
+
+        if column == 'trade_type':
+            compact['direction'] = pd.Series(
+                np.select([values == 'Long', values == 'Short'], [1, -1], 0).astype('int8'),
+                index=trade_data.index)
+
+    return pd.DataFrame(compact, index=trade_data.index)
+
+def _fits_float32(values: np.ndarray) -> bool:
+    with np.errstate(over='ignore'):
+        return np.array_equal(values.astype('float32'), values, equal_nan=True)
+
+def iter_preprocessed_chunks(file_name: str = "TradesList.txt", chunksize: int = 100_000):
+    """Yield preprocessed chunks of a raw export in file order.
+
+    Unlike preprocess_raw_data, every chunk is typed on its own: numeric
+    columns are always float64 (text such as the 'Total:' footer becomes
+    NaN) so chunks can be appended to a store without seeing the whole file.
+    """
+    for chunk in _read_raw_chunks(file_name, chunksize):
+        for column in INFERRED_COLUMNS:
+            if column != 'Account':
+                chunk[RAW_COLUMNS[column]] = pd.to_numeric(chunk[RAW_COLUMNS[column]], errors='coerce').astype('float64')
+
+        # Drop empty rows
+        chunk = chunk.dropna(axis=0)
+        if not chunk.empty:
+            yield _clean_chunk(chunk)
+
+def _read_raw_chunks(file_name, chunksize: int = None, usecols: list = None):
+    """Read the projected raw columns, renamed to their processed names.
+
+    `file_name` is relative to RAW_DATA_DIR; paths and file objects are
+    read as given. Text columns are read as strings, all others with
+    pd.read_csv type inference (or as strings when explicitly projected).
+    Each read infers a column's type from all its rows (low_memory=False),
+    so a column mixing numbers and text is all text, never a mix of both.
+    """
+    source = RAW_DATA_DIR / f"{file_name}" if isinstance(file_name, str) else file_name
+    if usecols is None:
+        usecols, dtype = list(RAW_COLUMNS), {column: str for column in TEXT_COLUMNS}
+    else:
+        dtype = str
+    reader = pd.read_csv(source, sep='\t', usecols=usecols, dtype=dtype, chunksize=chunksize, low_memory=False)
+    if chunksize is None:
+        reader = [reader]
+
+    for chunk in reader:
+        yield chunk.rename(columns=RAW_COLUMNS)
+
+def _clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Clean symbols and parse datetime and duration columns of one chunk.
+    """
+    chunk = chunk.copy()
+
+    # Clean the symbol string
+    chunk['symbol'] = chunk['symbol'].str.extract(SYMBOL_PATTERN, expand=False)
+
+    # Convert datetime columns to datetime type
+    chunk['entry_datetime'] = _parse_sierra_datetime(chunk['entry_datetime'], ' BP')
+    chunk['exit_datetime'] = _parse_sierra_datetime(chunk['exit_datetime'], ' EP')
+
+    # Convert duration column to timedelta type
+    chunk['duration_sec'] = pd.to_timedelta(chunk['duration']).dt.total_seconds()
+    chunk.drop(columns=['duration'], inplace=True)
+
+    # Add simple date column for convenience of stats computation
+    chunk['date'] = chunk['entry_datetime'].dt.date
 
-    # Create a clean copy of the data
-    clean_data = raw_data.copy()
+    return chunk
 
-    return clean_data
\ No newline at end of file
+def _parse_sierra_datetime(values: pd.Series, suffix: str) -> pd.Series:
+    values = values.str.replace('  ', ' ', regex=False).str.removesuffix(suffix)
+    return pd.to_datetime(values, format=DATETIME_FORMAT)
@@ -0,0 +1,158 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+# Set to 1 to collect timings; when unset every hook returns immediately
+PROFILE_ENV = 'TRADING_DASHBOARD_PROFILE'
+RECORD_COLUMNS = ['stage', 'start_sec', 'wall_sec', 'rows', 'peak_mb']
+
+_enabled = os.environ.get(PROFILE_ENV, '') not in ('', '0')
+_lock = threading.Lock()
+_records = []
+_local = threading.local()
+_run_start = time.perf_counter()
+_last_checkpoint = _run_start
+
+def enabled() -> bool:
+    return _enabled
+
+def set_enabled(value: bool = True) -> None:
+    """Turn collection on or off at runtime (PROFILE_ENV sets the initial state)."""
+    global _enabled
+    _enabled = value
+    if not value and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def clear() -> None:
+    """Drop all records and restart the run clock used by checkpoint()."""
+    global _run_start, _last_checkpoint
+    with _lock:
+        _records.clear()
+        _run_start = _last_checkpoint = time.perf_counter()
+
+@contextmanager
+def stage(name: str, rows: int = None):
+    """Record the wall time and peak traced memory of a block as one stage.
+
+    Yields a dict; set its 'rows' to record how many rows the stage handled.
+    Stages nest: an outer stage's peak includes its inner stages. Peak
+    memory is what the block allocated on top of what was in use when it
+    started, as seen by tracemalloc (numpy and pandas buffers included);
+    tracemalloc is only started once collection is on. Its peak is process
+    wide, so stages running in other threads at the same time blur it.
+    """
+    info = {'rows': rows}
+    if not _enabled:
+        yield info
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    # Each open stage keeps [memory at start, peak so far]; the global peak is reset per stage
+    stack = _open_stages()
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    stack.append([current, current])
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        wall_sec = time.perf_counter() - start
+        start_memory, peak = stack.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        _record(name, start, wall_sec, info['rows'], peak - start_memory)
+
+def profiled(name: str = None):
+    """Decorator recording every call of a function as a stage.
+
+    The row count is the length of the first DataFrame, Series or pipeline
+    argument, or else of a DataFrame result. When collection is off the
+    wrapper only checks a flag before calling through.
+    """
+    def decorator(func):
+        stage_name = name or f"{func.__module__.removeprefix('src.')}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with stage(stage_name) as info:
+                result = func(*args, **kwargs)
+                info['rows'] = _row_count(args, result)
+            return result
+        return wrapper
+    return decorator
+
+def checkpoint(name: str) -> None:
+    """Record the time since the previous checkpoint (or clear()) as a stage.
+
+    For straight-line scripts such as the dashboard, where wrapping every
+    section in a `with` block would be noisy.
+    """
+    global _last_checkpoint
+    if not _enabled:
+        return
+    now = time.perf_counter()
+    with _lock:
+        start, _last_checkpoint = _last_checkpoint, now
+    _record(name, start, now - start, None, None)
+
+def records() -> pd.DataFrame:
+    """All records in the order the stages finished."""
+    with _lock:
+        return pd.DataFrame(list(_records), columns=RECORD_COLUMNS)
+
+def summary() -> pd.DataFrame:
+    """Calls, total and mean wall time, rows and largest peak per stage, slowest first."""
+    stats = records().groupby('stage').agg(
+        calls=('wall_sec', 'size'),
+        total_sec=('wall_sec', 'sum'),
+        mean_sec=('wall_sec', 'mean'),
+        rows=('rows', 'max'),
+        peak_mb=('peak_mb', 'max'),
+    )
+    return stats.sort_values('total_sec', ascending=False)
+
+def to_json() -> str:
+    """The records with the time they were exported, for comparing runs."""
+    return json.dumps({
+        'exported_at': pd.Timestamp.now().isoformat(),
+        'records': json.loads(records().to_json(orient='records')),
+    }, indent=2)
+
+def to_csv() -> str:
+    return records().assign(exported_at=pd.Timestamp.now().isoformat()).to_csv(index=False)
+
+def export(path) -> None:
+    """Write the records to a .json or .csv file."""
+    path = Path(path)
+    path.write_text(to_json() if path.suffix == '.json' else to_csv())
+
+def _open_stages() -> list:
+    if not hasattr(_local, 'stages'):
+        _local.stages = []
+    return _local.stages
+
+def _record(name: str, start: float, wall_sec: float, rows, peak_bytes) -> None:
+    with _lock:
+        _records.append([name, start - _run_start, wall_sec, rows,
+                         None if peak_bytes is None else peak_bytes / 2 ** 20])
+
+def _row_count(args: tuple, result):
+    for value in (*args, result):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return len(value)
+        if isinstance(getattr(value, 'index', None), pd.Index):
+            return len(value.index)
+    return None
@@ -0,0 +1,276 @@
+import argparse
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+from src.aggregates import AGGREGATE_KEYS, TradeAggregates
+from src.cache import memoize
+from src.config import PROCESSED_DATA_DIR
+from src.data_loader import iter_trade_csv
+from src.filters import FILTER_COLUMNS
+from src.metrics import MetricsPipeline, _basic_stats_from_sums
+from src.preprocessing import PROCESSED_DTYPES
+from src.profiling import profiled
+
+STORE_VERSION = 1
+INSERT_CHUNK_SIZE = 200_000
+
+# Datetimes are stored as nanoseconds since the epoch, so range filters compare integers
+DATETIME_COLUMNS = ['entry_datetime', 'exit_datetime']
+SQL_TYPES = {'object': 'TEXT', 'float64': 'REAL', 'datetime64[ns]': 'INTEGER'}
+
+# Per-trade excursions, derived once at insert time as in MetricsPipeline
+DERIVED_COLUMNS = ['mfe', 'mae', 'mfe_mae_ratio']
+
+# Filter columns, and the aggregate keys so GROUP BY scans an index instead of sorting
+INDEXES = {
+    'trades_entry_datetime': ['entry_datetime'],
+    'trades_symbol': ['symbol'],
+    'trades_account': ['Account'],
+    'trades_periods': AGGREGATE_KEYS,
+}
+
+# SQL for the sum of each MetricsPipeline.basic_stat_terms term; a NULL PnL
+# counts as neither a win nor a loss, as NaN does
+TERM_SQL = {
+    'num_trades': "COUNT(*)",
+    'total_profit_loss': "TOTAL(profit_loss)",
+    'win_count': "COALESCE(SUM(profit_loss >= 0), 0)",
+    'win_sum': "TOTAL(CASE WHEN profit_loss >= 0 THEN profit_loss END)",
+    'loss_count': "COALESCE(SUM(profit_loss < 0), 0)",
+    'loss_sum': "TOTAL(CASE WHEN profit_loss < 0 THEN profit_loss END)",
+    'mfe_count': "COUNT(mfe)",
+    'mfe_sum': "TOTAL(mfe)",
+    'mae_count': "COUNT(mae)",
+    'mae_sum': "TOTAL(mae)",
+    'mfe_mae_ratio_sum': "TOTAL(mfe_mae_ratio)",
+}
+COUNT_TERMS = ['num_trades', 'win_count', 'loss_count', 'mfe_count', 'mae_count']
+
+class TradeStore:
+    """Processed trades in an indexed SQLite file, queried without loading the table.
+
+    Trades keep the processed CSV schema plus their MFE, MAE and MFE/MAE
+    ratio, and are indexed on entry_datetime, symbol, Account and (date,
+    symbol, Account). Queries take the dashboard's filter keywords
+    (symbols, accounts, sides, and an entry_datetime range [start, end))
+    as a WHERE clause, and the additive terms of compute_basic_stats are
+    summed by SQLite, overall or per (date, symbol, account), so only
+    result-sized data reaches pandas. Rows are returned in insertion
+    order, which is entry order for a
+    store migrated from a processed CSV.
+    """
+
+    def __init__(self, store_file: str = "trades.sqlite"):
+        self.path = PROCESSED_DATA_DIR / store_file
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the store, creating it if the file is new.
+
+        Raises ValueError if the file is a store of another version (or not
+        a trade store); migrate the CSV again to rebuild it.
+        """
+        connection = sqlite3.connect(self.path)
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == STORE_VERSION:
+            return connection
+        if version == 0 and not connection.execute("SELECT 1 FROM sqlite_master").fetchone():
+            # A new, empty database: the version is set once, with the table
+            with connection:
+                connection.execute(f"CREATE TABLE trades ({', '.join(_column_definitions())})")
+                connection.execute(f"PRAGMA user_version = {STORE_VERSION}")
+            return connection
+        connection.close()
+        raise ValueError(f"{self.path.name} is not a version {STORE_VERSION} trade store (found version {version}); "
+                         f"rebuild it with python -m src.store")
+
+    @profiled()
+    def append(self, trade_data: pd.DataFrame, index: bool = True) -> None:
+        """Insert trades (processed or compact schema) after the existing ones.
+
+        With index=False the indexes are not created, which makes bulk
+        loads faster; call create_indexes() once they are done.
+        """
+        columns = list(PROCESSED_DTYPES) + DERIVED_COLUMNS
+        sql = f"INSERT INTO trades ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        with closing(self.connect()) as connection, connection:
+            for start in range(0, len(trade_data), INSERT_CHUNK_SIZE):
+                connection.executemany(sql, zip(*_sql_values(trade_data.iloc[start:start + INSERT_CHUNK_SIZE]).values()))
+        if index:
+            self.create_indexes()
+
+    def create_indexes(self) -> None:
+        with closing(self.connect()) as connection:
+            for name, columns in INDEXES.items():
+                connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON trades ({', '.join(columns)})")
+
+    def __len__(self) -> int:
+        with closing(self.connect()) as connection:
+            return connection.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    @profiled()
+    def trades(self, symbols=None, accounts=None, sides=None, start=None, end=None) -> pd.DataFrame:
+        """The matching trades as a frame like read_trade_csv returns."""
+        where, params = _where(symbols, accounts, sides, start, end)
+        with closing(self.connect()) as connection:
+            trade_data = pd.read_sql_query(f"SELECT {', '.join(PROCESSED_DTYPES)} FROM trades {where} ORDER BY rowid",
+                                           connection, params=params)
+        for column in DATETIME_COLUMNS:
+            trade_data[column] = pd.to_datetime(trade_data[column].astype('Int64'), unit='ns')
+        trade_data['date'] = pd.to_datetime(trade_data['date'], format='%Y-%m-%d').dt.date
+        return trade_data.astype({column: 'float64' for column, dtype in PROCESSED_DTYPES.items() if dtype == 'float64'})
+
+    @profiled()
+    def basic_stat_sums(self, symbols=None, accounts=None, sides=None, start=None, end=None) -> dict:
+        """Sums of the basic stat terms over the matching trades."""
+        where, params = _where(symbols, accounts, sides, start, end)
+        with closing(self.connect()) as connection:
+            row = connection.execute(f"SELECT {', '.join(TERM_SQL.values())} FROM trades {where}", params).fetchone()
+        return dict(zip(TERM_SQL, row))
+
+    def basic_stats(self, symbols=None, accounts=None, sides=None, start=None, end=None) -> dict:
+        """compute_basic_stats over the matching trades, summed in SQLite."""
+        sums = {key: np.asarray(value) for key, value in self.basic_stat_sums(symbols, accounts, sides, start, end).items()}
+        return {key: value.item() for key, value in _basic_stats_from_sums(sums).items()}
+
+    @profiled()
+    def aggregates(self, symbols=None, accounts=None, sides=None, start=None, end=None) -> TradeAggregates:
+        """TradeAggregates of the matching trades, grouped by (date, symbol, account) in SQLite."""
+        where, params = _where(symbols, accounts, sides, start, end)
+        keys = ', '.join(AGGREGATE_KEYS)
+        terms = ', '.join(f"{sql} AS {key}" for key, sql in TERM_SQL.items())
+        with closing(self.connect()) as connection:
+            sums = pd.read_sql_query(f"SELECT {keys}, {terms} FROM trades {where} GROUP BY {keys}", connection, params=params)
+        sums['date'] = pd.to_datetime(sums['date'], format='%Y-%m-%d')
+        sums = sums.astype({key: 'int64' for key in COUNT_TERMS})
+        sums = sums.astype({key: 'float64' for key in TERM_SQL if key not in COUNT_TERMS})
+        return TradeAggregates(sums.set_index(AGGREGATE_KEYS))
+
+    def daily_stats(self, symbols=None, accounts=None, sides=None, start=None, end=None) -> dict:
+        """compute_daily_stats over the matching trades, from per-date sums."""
+        return self.aggregates(symbols, accounts, sides, start, end).daily_stats()
+
+    def entry_range(self) -> tuple:
+        """First and last entry_datetime (NaT for an empty store)."""
+        with closing(self.connect()) as connection:
+            first, last = connection.execute("SELECT MIN(entry_datetime), MAX(entry_datetime) FROM trades").fetchone()
+        return pd.Timestamp(first) if first is not None else pd.NaT, pd.Timestamp(last) if last is not None else pd.NaT
+
+    def modified(self) -> int:
+        """Modification time of the file in nanoseconds, for keying memoized queries."""
+        return self.path.stat().st_mtime_ns
+
+    def values(self, column: str) -> list:
+        """Distinct values of a filter column, sorted."""
+        if column not in FILTER_COLUMNS.values():
+            raise ValueError(f"Unknown filter column {column!r}, expected one of {list(FILTER_COLUMNS.values())}")
+        with closing(self.connect()) as connection:
+            rows = connection.execute(f"SELECT DISTINCT {column} FROM trades WHERE {column} IS NOT NULL ORDER BY {column}")
+            return [value for (value,) in rows]
+
+def _column_definitions() -> list:
+    definitions = [f"{column} {SQL_TYPES[dtype]}" for column, dtype in PROCESSED_DTYPES.items()]
+    return definitions + [f"{column} REAL" for column in DERIVED_COLUMNS]
+
+def _sql_values(trade_data: pd.DataFrame) -> dict:
+    """Python values of every stored column, with None for missing ones."""
+    pipeline = MetricsPipeline(trade_data)
+    values = {}
+    for column, dtype in PROCESSED_DTYPES.items():
+        if column in DATETIME_COLUMNS:
+            datetimes = trade_data[column].to_numpy(dtype='datetime64[ns]')
+            values[column] = _nullable(datetimes.view('int64'), np.isnat(datetimes))
+        elif column == 'date':
+            dates = pd.to_datetime(trade_data[column]).dt.strftime('%Y-%m-%d').to_numpy(dtype=object)
+            values[column] = _nullable(dates, pd.isna(dates))
+        elif dtype == 'float64':
+            numbers = trade_data[column].to_numpy(dtype=float)
+            values[column] = _nullable(numbers, np.isnan(numbers))
+        else:
+            text = trade_data[column].to_numpy(dtype=object)
+            values[column] = _nullable(text, pd.isna(text))
+    for column in DERIVED_COLUMNS:
+        derived = getattr(pipeline, column)
+        values[column] = _nullable(derived, np.isnan(derived))
+    return values
+
+def _nullable(values: np.ndarray, missing: np.ndarray) -> list:
+    values = values.astype(object)
+    values[missing] = None
+    return values.tolist()
+
+def _where(symbols=None, accounts=None, sides=None, start=None, end=None) -> tuple:
+    """WHERE clause and parameters for the filter keywords (None accepts all)."""
+    clauses, params = [], []
+    for column, selected in ((FILTER_COLUMNS['symbols'], symbols), (FILTER_COLUMNS['accounts'], accounts),
+                             (FILTER_COLUMNS['sides'], sides)):
+        if selected is not None:
+            selected = list(selected)
+            clauses.append(f"{column} IN ({', '.join('?' * len(selected))})")
+            params.extend(selected)
+    if start is not None:
+        clauses.append("entry_datetime >= ?")
+        params.append(pd.Timestamp(start).value)
+    if end is not None:
+        clauses.append("entry_datetime < ?")
+        params.append(pd.Timestamp(end).value)
+    return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+# Memoized queries for the dashboard, keyed on the store's modification
+# time so a store that was appended to is queried again.
+
+@memoize()
+def cached_store_filter_options(store_file: str, modified: int = None) -> dict:
+    """Distinct values of every filter column, and the entry_datetime range."""
+    store = TradeStore(store_file)
+    options = {column: store.values(column) for column in FILTER_COLUMNS.values()}
+    options['entry_datetime'] = store.entry_range()
+    return options
+
+@memoize()
+def cached_store_basic_stats(store_file: str, filters: dict = None, modified: int = None) -> dict:
+    return TradeStore(store_file).basic_stats(**(filters or {}))
+
+@memoize()
+def cached_store_aggregates(store_file: str, filters: dict = None, modified: int = None) -> TradeAggregates:
+    return TradeStore(store_file).aggregates(**(filters or {}))
+
+@memoize(maxsize=2)
+def cached_store_trades(store_file: str, modified: int = None) -> pd.DataFrame:
+    return TradeStore(store_file).trades()
+
+@profiled()
+def migrate_csv(csv_file: str = "trades.csv", store_file: str = None, chunksize: int = 500_000) -> TradeStore:
+    """Copy a processed trades CSV into a new TradeStore, reading it in chunks.
+
+    The store defaults to the CSV's name with a .sqlite suffix and is
+    replaced if it exists. Trades keep the CSV's row order.
+    """
+    csv_path = PROCESSED_DATA_DIR / csv_file
+    store = TradeStore(store_file or csv_path.with_suffix('.sqlite').name)
+    store.path.unlink(missing_ok=True)
+    # Indexing once after the load is faster than maintaining the indexes per insert
+    for chunk in iter_trade_csv(csv_path, chunksize):
+        store.append(chunk, index=False)
+    store.create_indexes()
+    return store
+
+def main(argv: list = None) -> None:
+    """Command line entry point to migrate processed CSVs into SQLite stores.
+    """
+    parser = argparse.ArgumentParser(prog='python -m src.store',
+                                     description='Migrate processed trades CSVs into indexed SQLite stores.')
+    parser.add_argument('files', nargs='*',
+                        help='File names in the processed data directory (default: all CSV files).')
+    args = parser.parse_args(argv)
+
+    names = args.files or sorted(path.name for path in PROCESSED_DATA_DIR.glob('*.csv'))
+    for name in names:
+        start = time.perf_counter()
+        store = migrate_csv(name)
+        print(f"Migrated {name} to {store.path.name}: {len(store)} rows in {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+from src.config import CONTRACT_SPECS
+
+# Reference prices for the synthetic random walks
+BASE_PRICES = {'MNQ': 19500.0, 'MES': 5600.0, 'MCL': 62.0, 'MGC': 3300.0}
+
+# Columns of a Sierra Chart TradesList export, in order
+TRADES_LIST_COLUMNS = ['Symbol', 'Trade Type', 'Entry DateTime', 'Exit DateTime', 'Entry Price', 'Exit Price',
+                       'Trade Quantity', 'Max Open Quantity', 'Max Closed Quantity', 'Profit/Loss (C)',
+                       'Cumulative Profit/Loss (C)', 'FlatToFlat Profit/Loss (C)', 'FlatToFlat Max Open Profit (C)',
+                       'FlatToFlat Max Open Loss (C)', 'Max Open Profit (C)', 'Max Open Loss (C)',
+                       'Entry Efficiency', 'Exit Efficiency', 'Total Efficiency', 'Commission (C)',
+                       'High Price While Open', 'Low Price While Open', 'Note', 'Open Position Quantity',
+                       'Close Position Quantity', 'Duration', 'Account']
+
+def generate_trades(num_trades: int, seed: int = 0, symbols: list = None, accounts: list = None,
+                    start: str = "2023-01-02") -> pd.DataFrame:
+    """Generate a reproducible table of trades in the processed schema.
+
+    Trades are spread over weekday sessions (13:30-20:00) across several
+    symbols and accounts, with longs and shorts, tick-rounded prices,
+    excursions consistent with the exit, and commission-net PnL from
+    CONTRACT_SPECS. The same seed always gives the same table.
+    """
+    rng = np.random.default_rng(seed)
+    symbols = symbols or list(CONTRACT_SPECS)
+    accounts = accounts or ['Sim1', 'Sim2', 'Live1']
+
+    symbol_codes = rng.integers(0, len(symbols), num_trades)
+    account_codes = rng.integers(0, len(accounts), num_trades)
+    direction = np.where(rng.random(num_trades) < 0.5, 1, -1)
+    quantity = rng.integers(1, 11, num_trades).astype('float64')
+
+    # About 40 trades per session (more beyond ten years of sessions), ordered by entry time
+    days = pd.bdate_range(start, periods=min(max(num_trades // 40, 1), 2600) + 1)
+    day_index = np.sort(rng.integers(0, len(days) - 1, num_trades))
+    session_ms = rng.integers(0, int(6.5 * 3600 * 1000), num_trades)
+    entry_datetime = (days.values[day_index] + np.timedelta64(13 * 3600 + 1800, 's')
+                      + session_ms.astype('timedelta64[ms]'))
+    order = np.lexsort((session_ms, day_index))
+    entry_datetime = entry_datetime[order]
+    duration_sec = np.maximum(np.round(rng.lognormal(5.0, 1.2, num_trades)), 1.0)
+    exit_datetime = entry_datetime + (duration_sec * 1000).astype('timedelta64[ms]')
+
+    tick_size = np.array([CONTRACT_SPECS[symbol]['tick_size'] for symbol in symbols])[symbol_codes]
+    tick_value = np.array([CONTRACT_SPECS[symbol]['tick_value'] for symbol in symbols])[symbol_codes]
+    commission_rate = np.array([CONTRACT_SPECS[symbol]['commission'] for symbol in symbols])[symbol_codes]
+    base_price = np.array([BASE_PRICES.get(symbol, 100.0) for symbol in symbols])[symbol_codes]
+
+    # Entry prices drift slowly; moves and excursions are whole ticks
+    drift = np.cumsum(rng.normal(0, 2, num_trades)) * tick_size
+    entry_price = np.round((base_price + drift) / tick_size) * tick_size
+    move_ticks = np.round(rng.normal(0.5, 12, num_trades))
+    favorable_ticks = np.maximum(move_ticks * direction, 0) + np.round(rng.exponential(6, num_trades))
+    adverse_ticks = np.maximum(-move_ticks * direction, 0) + np.round(rng.exponential(6, num_trades))
+    exit_price = entry_price + move_ticks * tick_size
+    price_range_high = entry_price + np.where(direction > 0, favorable_ticks, adverse_ticks) * tick_size
+    price_range_low = entry_price - np.where(direction > 0, adverse_ticks, favorable_ticks) * tick_size
+
+    commission = np.round(commission_rate * quantity, 2)
+    profit_loss = np.round(direction * move_ticks * tick_value * quantity - commission, 2)
+
+    trade_data = pd.DataFrame({
+        'symbol': np.array(symbols, dtype=object)[symbol_codes],
+        'trade_type': np.where(direction > 0, 'Long', 'Short').astype(object),
+        'entry_datetime': entry_datetime,
+        'exit_datetime': exit_datetime,
+        'entry_price': np.round(entry_price, 6),
+        'exit_price': np.round(exit_price, 6),
+        'quantity': quantity,
+        'profit_loss': profit_loss,
+        'commission': commission,
+        'price_range_high': np.round(price_range_high, 6),
+        'price_range_low': np.round(price_range_low, 6),
+        'Account': np.array(accounts, dtype=object)[account_codes],
+        'duration_sec': duration_sec,
+    })
+    trade_data['date'] = trade_data['entry_datetime'].dt.date
+    return trade_data
+
+def write_trades_list(trade_data: pd.DataFrame, path, chunksize: int = 500_000) -> None:
+    """Write processed trades as a Sierra Chart TradesList export.
+
+    Rows are grouped by symbol with a blank separator row, like the real
+    export, and the file ends with the 'Total:' footer row.
+    """
+    empty_row = '\t' * (len(TRADES_LIST_COLUMNS) - 1) + '\n'
+    cumulative_pnl = 0.0
+
+    with open(path, 'w', newline='') as f:
+        f.write('\t'.join(TRADES_LIST_COLUMNS) + '\n')
+        for group_number, (_, group) in enumerate(trade_data.groupby('symbol', sort=True)):
+            if group_number:
+                f.write(empty_row)
+            for start in range(0, len(group), chunksize):
+                raw_rows = _to_trades_list_rows(group.iloc[start:start + chunksize], cumulative_pnl)
+                cumulative_pnl = float(raw_rows['Cumulative Profit/Loss (C)'].iloc[-1])
+                raw_rows.to_csv(f, sep='\t', header=False, index=False)
+        # The total sits in the Profit/Loss column, as in the real export
+        total_column = TRADES_LIST_COLUMNS.index('Profit/Loss (C)')
+        f.write('\t' * total_column + f"Total: {cumulative_pnl:.2f}" + '\t' * (len(TRADES_LIST_COLUMNS) - total_column - 1) + '\n')
+
+def _to_trades_list_rows(trade_data: pd.DataFrame, cumulative_start: float) -> pd.DataFrame:
+    """Format processed trades as TradesList columns."""
+    symbol = trade_data['symbol']
+    exchange = symbol.map({name: spec['exchange'] for name, spec in CONTRACT_SPECS.items()}).fillna('CME')
+    quantity = trade_data['quantity'].astype('int64')
+    profit_loss = trade_data['profit_loss'].round(2)
+    seconds = trade_data['duration_sec'].astype('int64')
+
+    return pd.DataFrame({
+        'Symbol': '[Sim]' + symbol + 'M25-' + exchange,
+        'Trade Type': trade_data['trade_type'],
+        'Entry DateTime': _format_sierra_datetime(trade_data['entry_datetime']) + ' BP',
+        'Exit DateTime': _format_sierra_datetime(trade_data['exit_datetime']) + ' EP',
+        'Entry Price': trade_data['entry_price'],
+        'Exit Price': trade_data['exit_price'],
+        'Trade Quantity': quantity,
+        'Max Open Quantity': quantity,
+        'Max Closed Quantity': quantity,
+        'Profit/Loss (C)': profit_loss,
+        'Cumulative Profit/Loss (C)': (cumulative_start + profit_loss.cumsum()).round(2),
+        'FlatToFlat Profit/Loss (C)': profit_loss.astype(str) + ' F',
+        'FlatToFlat Max Open Profit (C)': 0.0,
+        'FlatToFlat Max Open Loss (C)': 0.0,
+        'Max Open Profit (C)': 0.0,
+        'Max Open Loss (C)': 0.0,
+        'Entry Efficiency': '100.0%',
+        'Exit Efficiency': '50.0%',
+        'Total Efficiency': '50.0%',
+        'Commission (C)': trade_data['commission'],
+        'High Price While Open': trade_data['price_range_high'],
+        'Low Price While Open': trade_data['price_range_low'],
+        'Note': 'SimpleBracket.twconfig',
+        'Open Position Quantity': quantity,
+        'Close Position Quantity': 0,
+        'Duration': (_zero_pad(seconds // 3600) + ':' + _zero_pad(seconds // 60 % 60)
+                     + ':' + _zero_pad(seconds % 60)),
+        'Account': trade_data['Account'],
+    })
+
+def _format_sierra_datetime(values: pd.Series) -> pd.Series:
+    """'2025-05-21  14:33:36.209', the double-spaced millisecond format of the export."""
+    iso = np.datetime_as_string(values.to_numpy().astype('datetime64[ms]'), unit='ms')
+    return pd.Series(iso, index=values.index).str.replace('T', '  ', regex=False)
+
+def _zero_pad(values: pd.Series) -> pd.Series:
+    return values.astype(str).str.zfill(2)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from src.cache import memoize
+from src.config import CONTRACT_SPECS
+from src.filters import filtered_pipeline
+from src.metrics import MetricsPipeline, _shared_pipeline
+from src.profiling import profiled
+
+# Level units: 'ticks', or multiples of the symbol's median MAE (in ticks)
+UNITS = ('ticks', 'mae')
+SURFACES = ['expectancy', 'profit_factor', 'win_rate', 'total_pnl']
+
+# Working memory per trade and grid level, for the mask and PnL matrices of a chunk
+BYTES_PER_CELL = 64
+
+@profiled()
+def exit_surfaces(pipeline: MetricsPipeline, stop_levels, target_levels, unit: str = 'ticks',
+                  memory_mb: int = 256) -> dict:
+    """Expectancy, profit factor and win rate of every stop-loss x take-profit exit.
+
+    Each trade is replayed against every (stop, target) pair from its
+    excursions: a stop at s ticks is hit when the MAE reaches s, a target
+    at t ticks when the MFE reaches t, and when neither is hit the trade
+    keeps its actual exit. A trade whose excursions reach both is counted
+    as stopped, since the bar data cannot tell which came first. PnL is
+    ticks x tick value x quantity minus the symbol's round-turn commission
+    from CONTRACT_SPECS; use np.inf for no stop or no target.
+
+    The outcome of a trade depends on the stop only through "stopped or
+    not" and on the target only through "target reached or not", so each
+    surface is a sum of trade x stop and trade x target matrices. The
+    trade x stop x target cube is never built: trades are processed in
+    chunks sized to `memory_mb` and every chunk costs one matrix product.
+
+    Returns a dict of stop x target DataFrames (SURFACES), plus num_trades
+    and the number of trades skipped for an unknown symbol or missing
+    excursions.
+    """
+    if unit not in UNITS:
+        raise ValueError(f"Unknown unit {unit!r}, expected one of {UNITS}")
+    stop_levels = np.asarray(stop_levels, dtype=float)
+    target_levels = np.asarray(target_levels, dtype=float)
+
+    # Per-trade excursions and actual move in ticks, dollars per tick and commission
+    symbol = pd.Series(pipeline._column('symbol'), dtype=object)
+    specs = pd.DataFrame(CONTRACT_SPECS).T
+    tick_size, tick_value, commission_rate = (symbol.map(specs[key]).to_numpy(dtype=float)
+                                              for key in ('tick_size', 'tick_value', 'commission'))
+    quantity = pipeline._column('quantity', float)
+    move = pipeline.direction * (pipeline._column('exit_price', float) - pipeline._column('entry_price', float))
+    mfe, mae, move = pipeline.mfe / tick_size, pipeline.mae / tick_size, move / tick_size
+
+    valid = np.isfinite(mfe) & np.isfinite(mae) & np.isfinite(move) & np.isfinite(quantity)
+    mfe, mae, move, symbol = mfe[valid], mae[valid], move[valid], symbol[valid].to_numpy()
+    dollars_per_tick = (tick_value * quantity)[valid]
+    commission = (commission_rate * quantity)[valid]
+
+    # Levels in ticks per trade; MAE multiples scale with the symbol's median MAE
+    if unit == 'mae':
+        scale = pd.Series(mae).groupby(symbol).transform('median').to_numpy()
+    else:
+        scale = np.ones(len(mae))
+
+    num_stops, num_targets = len(stop_levels), len(target_levels)
+    stop_sums = np.zeros((4, num_stops))
+    kept_sums = np.zeros((num_stops, 4 * num_targets))
+    chunksize = max(1, memory_mb * 2 ** 20 // ((num_stops + 4 * num_targets) * BYTES_PER_CELL))
+    for start in range(0, len(mae), chunksize):
+        rows = slice(start, start + chunksize)
+        with np.errstate(invalid='ignore'):  # a zero MAE scale times an infinite level is never hit
+            stop_ticks = scale[rows, np.newaxis] * stop_levels
+            target_ticks = scale[rows, np.newaxis] * target_levels
+
+        # Stopped trades: PnL only depends on the stop
+        stopped = mae[rows, np.newaxis] >= stop_ticks
+        stop_pnl = np.where(stopped, -stop_ticks * dollars_per_tick[rows, np.newaxis] - commission[rows, np.newaxis], 0)
+        stop_sums += [stop_pnl.sum(axis=0), np.maximum(stop_pnl, 0).sum(axis=0),
+                      np.minimum(stop_pnl, 0).sum(axis=0), (stopped & (stop_pnl >= 0)).sum(axis=0)]
+
+        # Trades not stopped exit at the target if it is reached, else at their actual exit
+        reached = mfe[rows, np.newaxis] >= target_ticks
+        pnl = np.where(reached, target_ticks, move[rows, np.newaxis]) * dollars_per_tick[rows, np.newaxis] - commission[rows, np.newaxis]
+        terms = np.hstack([pnl, np.maximum(pnl, 0), np.minimum(pnl, 0), pnl >= 0])
+        kept_sums += (~stopped).T.astype(float) @ terms
+
+    total, gross_profit, gross_loss, wins = (stop_sums[term][:, np.newaxis] + kept_sums[:, term * num_targets:(term + 1) * num_targets]
+                                             for term in range(4))
+    num_trades = len(mae)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        surfaces = {
+            'expectancy': total / num_trades,
+            'profit_factor': np.where(gross_loss < 0, gross_profit / -gross_loss, np.inf),
+            'win_rate': wins / num_trades,
+            'total_pnl': total,
+        }
+
+    index = pd.Index(stop_levels, name='stop')
+    columns = pd.Index(target_levels, name='target')
+    result = {key: pd.DataFrame(values, index=index, columns=columns) for key, values in surfaces.items()}
+    result['num_trades'] = num_trades
+    result['skipped'] = int(np.count_nonzero(~valid))
+    return result
+
+def simulate_exits(trade_data: pd.DataFrame, stop_levels, target_levels, unit: str = 'ticks',
+                   memory_mb: int = 256) -> dict:
+    """Exit what-if surfaces of a trade frame, see exit_surfaces.
+    """
+    return exit_surfaces(MetricsPipeline(trade_data), stop_levels, target_levels, unit, memory_mb)
+
+@memoize(maxsize=8)
+def cached_exit_surfaces(trade_data: pd.DataFrame, filters: dict = None, stop_levels: tuple = (),
+                         target_levels: tuple = (), unit: str = 'ticks') -> dict:
+    """Memoized exit_surfaces over the trades matching `filters` (all if None)."""
+    pipeline = filtered_pipeline(trade_data, **filters) if filters else _shared_pipeline(trade_data)
+    return exit_surfaces(pipeline, stop_levels, target_levels, unit)
@@ -1,27 +1,154 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
-
-from src.data_loader import load_trade_data
-from src.metrics import *
+import pandas as pd
+
+from src import profiling
+from src.aggregates import cached_trade_aggregates
+from src.alerts import AlertMonitor, read_alerts
+from src.batch_ingest import UPLOAD_STORE, ingest_files
+from src.cache import prefetch
+from src.config import PROCESSED_DATA_DIR
+from src.data_loader import cached_load_trade_data
+from src.distributions import cached_distribution_sketches
+from src.downsampling import chart_points, downsample_frame, drawdown_indices, minmax_indices
+from src.episodes import cached_episode_stats
+from src.filters import cached_filtered_aggregates, cached_filtered_multi_window_stats, cached_filtered_stats, cached_trade_index
+from src.heatmap import cached_time_of_day_stats
+from src.ingest import IncrementalIngester
+from src.metrics import cached_advanced_stats, cached_basic_stats, cached_multi_window_stats
+from src.montecarlo import METHODS, PATH_COLUMNS, cached_monte_carlo
+from src.store import (TradeStore, cached_store_aggregates, cached_store_basic_stats, cached_store_filter_options,
+                       cached_store_trades)
+from src.whatif import cached_exit_surfaces
 
 # --- Page Setup ---
 st.set_page_config(page_title="Trading Dashboard", layout="wide")
+profiling.clear()  # the Performance panel shows this run only
+
+ROLLING_WINDOWS = (10, 30, 100, 500)
+PERIOD_LABELS = {'D': ('Daily', 'Day'), 'W': ('Weekly', 'Week'), 'M': ('Monthly', 'Month')}
+SESSIONS = {"Full day": ("00:00", "00:00"), "RTH 09:30-16:00": ("09:30", "16:00"), "Globex 18:00-17:00": ("18:00", "17:00")}
+STREAK_SCOPES = {"All trades": None, "Per symbol": 'symbol', "Per day": 'date'}
+MONTE_CARLO_PATHS = (500, 1000, 5000, 10000)
+EXIT_METRICS = {'expectancy': "Expectancy ($)", 'profit_factor': "Profit Factor", 'win_rate': "Win Rate"}
+EXIT_UNITS = {'ticks': "Ticks", 'mae': "× median MAE"}
+DISTRIBUTION_COLUMNS = {'profit_loss': "PnL ($)", 'mfe': "MFE (points)", 'mae': "MAE (points)", 'duration_sec': "Duration (s)"}
+DISTRIBUTION_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+HEATMAP_METRICS = {'win_rate': "Win Rate", 'expectancy': "Expectancy ($)", 'avg_mfe': "Avg MFE", 'avg_mae': "Avg MAE", 'num_trades': "Trades"}
+
+
+@st.cache_resource
+def get_ingester():
+    """One ingester per server process, so its offset and aggregates survive reruns."""
+    return IncrementalIngester()
+
+@st.cache_resource
+def get_alert_monitor():
+    """One alert monitor per server process, fed by the ingester's polls."""
+    return AlertMonitor()
+
+# Points per line of the charts in the 3:1 chart and stats columns
+CHART_POINTS = chart_points(3 / 4)
+
+def zoom_range(label, num_points, key):
+    """Positions [start, end) to plot; longer series get a range slider to zoom in."""
+    if num_points <= CHART_POINTS:
+        return 0, num_points
+    start, end = st.slider(label, 0, num_points - 1, (0, num_points - 1), key=key,
+                           help=f"Charts show at most {CHART_POINTS} points per line, keeping every peak and trough. Narrow the range to see every trade.")
+    return start, end + 1
+
+# --- Page Title ---
+# Painted before anything is loaded or computed
+st.title("📈 Trading Performance Dashboard")
 
 # --- Load Data ---
-df = load_trade_data('trades_synthetic.csv')
+live_session = st.sidebar.toggle("Live session", help="Follow data/raw/TradesList.txt while Sierra Chart appends trades to it.")
+store = None  # TradeStore when a SQLite dataset is selected
+
+if live_session:
+    ingester = get_ingester()
+    st.sidebar.button("Check for new trades")
+    new_trades = ingester.poll()  # only parses rows appended since the last rerun
+    df = ingester.trade_data
+    st.sidebar.caption(f"{len(new_trades)} new trades ingested")
+
+    # Alerts are checked trade by trade on the new trades only
+    monitor = get_alert_monitor()
+    with st.sidebar.expander("Alerts"):
+        for rule, label, step in (('daily_loss', "Daily loss limit ($)", 50.0), ('drawdown', "Drawdown limit ($)", 100.0),
+                                  ('loss_streak', "Losing streak", 1)):
+            off = type(step)(0)  # int or float, like the step
+            value = st.number_input(label, min_value=off, value=monitor.rules[rule] or off, step=step, key=f"alert_{rule}",
+                                    help="0 turns the rule off.")
+            monitor.rules[rule] = value or None
+        for alert in monitor.follow(ingester, new_trades):
+            st.toast(alert['message'], icon="🚨")
+        snapshot = monitor.snapshot()
+        st.caption(f"Today ${snapshot['daily_pnl']:,.2f} · drawdown ${snapshot['drawdown']:,.2f} · "
+                   f"losing streak {snapshot['loss_streak']} · recent win rate {snapshot['ewma_win_rate']:.0%}")
+        st.dataframe(read_alerts(last=20)[['time', 'message']].iloc[::-1], hide_index=True)
+else:
+    # Uploaded exports are parsed in parallel, deduplicated and merged into one store
+    with st.sidebar.expander("Upload exports"):
+        uploads = st.file_uploader("Sierra Chart TradesList files", type=['txt', 'csv'], accept_multiple_files=True)
+        if uploads and st.button("Ingest"):
+            st.session_state['ingest_report'] = ingest_files([(upload.name, upload.getvalue()) for upload in uploads], UPLOAD_STORE)
+        if 'ingest_report' in st.session_state:
+            st.dataframe(st.session_state['ingest_report'], hide_index=True)
+
+    # SQLite stores (python -m src.store) answer the header and period stats without loading the trades
+    datasets = sorted(path.name for path in PROCESSED_DATA_DIR.glob('*.csv')) + sorted(path.name for path in PROCESSED_DATA_DIR.glob('*.sqlite'))
+    dataset = st.sidebar.selectbox("Dataset", datasets, index=datasets.index('trades_synthetic.csv') if 'trades_synthetic.csv' in datasets else 0)
+    if dataset.endswith('.sqlite'):
+        store = TradeStore(dataset)
+        store_modified = store.modified()
+    else:
+        df = cached_load_trade_data(dataset)
+profiling.checkpoint('dashboard.load')
+
+# --- Filters ---
+if store is None:
+    # The filter index is built once per dataset; filter changes only select row positions
+    filter_values = cached_trade_index(df).values
+    entry_range = (df['entry_datetime'].min(), df['entry_datetime'].max())
+else:
+    filter_options = cached_store_filter_options(dataset, store_modified)
+    filter_values, entry_range = filter_options.get, filter_options['entry_datetime']
+st.sidebar.subheader("Filters")
+filters = {}
+for keyword, column, label in (('symbols', 'symbol', "Symbol"), ('accounts', 'Account', "Account"), ('sides', 'trade_type', "Side")):
+    selected = st.sidebar.multiselect(label, filter_values(column), placeholder="All")
+    if selected:
+        filters[keyword] = tuple(selected)
+
+if not pd.isna(entry_range[0]):
+    first_day, last_day = entry_range[0].date(), entry_range[1].date()
+    date_range = st.sidebar.date_input("Entry date", value=(first_day, last_day), min_value=first_day, max_value=last_day)
+    if len(date_range) == 2 and tuple(date_range) != (first_day, last_day):
+        filters['start'] = pd.Timestamp(date_range[0])
+        filters['end'] = pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+profiling.checkpoint('dashboard.filters')
 
 # --- Compute Stats ---
-df = add_mfe_mae_columns(df)
-basic_stats = compute_basic_stats(df)
-advanced_stats = compute_advanced_stats(df)
-daily_stats = compute_daily_stats(df)
-df = compute_rolling_stats(df)
-
-# --- Page Title ---
-st.title("📈 Trading Performance Dashboard")
+# Memoized on the data fingerprint, so reruns with unchanged data only re-render charts.
+# Only what the header needs is computed here; heavier sections compute their own data when opened.
+# A live session reads the header and equity curve from the ingester's running aggregates instead,
+# and a SQLite store sums the header stats in SQLite.
+if store is not None:
+    basic_stats = cached_store_basic_stats(dataset, filters or None, store_modified)
+    advanced_stats = None
+elif filters:
+    filtered_stats = cached_filtered_stats(df, filters)
+    basic_stats = filtered_stats['basic_stats']
+    advanced_stats = filtered_stats['advanced_stats']
+else:
+    basic_stats = ingester.basic_stats() if live_session else cached_basic_stats(df)
+    advanced_stats = ingester.advanced_stats() if live_session else None
+if filters and basic_stats['num_trades'] == 0:
+    st.warning("No trades match the selected filters.")
+    st.stop()
+profiling.checkpoint('dashboard.stats')
 
 # --- Key Stats: Single Row ---
 st.subheader("Key Statistics")
@@ -30,6 +157,111 @@ k1.metric("Total Trades", basic_stats["num_trades"])
 k2.metric("Win Rate", f"{basic_stats['win_rate']:.1%}")
 k3.metric("Avg Win/Loss", f"{basic_stats['avg_win_loss_ratio']:.2f}", help="Average win / average loss")
 k4.metric("Expectancy", f"${basic_stats['expectancy']:.2f}", help="Expected PnL per trade")
+profiling.checkpoint('dashboard.key_stats')
+
+# Plotly is the slowest import left; loading it after the header lets the header paint first
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# Defined ahead of its section, since a store without loaded trades shows it right after the header
+@st.fragment
+def period_section(aggregates):
+    """Period PnL bars and stats; the Period radio reruns only this section."""
+    # Every period view is merged from the per-(day, symbol, account) aggregates
+    period = st.radio("Period", list(PERIOD_LABELS), format_func=lambda freq: PERIOD_LABELS[freq][0], horizontal=True)
+    period_label, period_unit = PERIOD_LABELS[period]
+    period_stats = aggregates.period_summary(period)
+    st.subheader(f"📅 {period_label} PnL Overview")
+
+    # Layout: Left = Bar Plot, Right = Stats
+    left, right = st.columns([3, 1])
+
+    with left:
+        fig = make_subplots(
+            rows=2, cols=1,
+            shared_xaxes=True,
+            vertical_spacing=0.1,
+            row_heights=[0.75, 0.25],  # smaller height for trades plot
+            subplot_titles=(f"{period_label} PnL ($)", "Number of Trades")
+        )
+
+        # Period PnL bars
+        fig.add_trace(
+            go.Bar(
+                x=period_stats['pnl'].index,
+                y=period_stats['pnl'].values,
+                marker_color=['green' if v >= 0 else 'red' for v in period_stats['pnl'].values],
+                name=f'{period_label} PnL',
+            ),
+            row=1, col=1
+        )
+
+        # Number of trades bars
+        fig.add_trace(
+            go.Bar(
+                x=period_stats['trades'].index,
+                y=period_stats['trades'].values,
+                marker_color='gray',
+                name=f'Trades per {period_unit}',
+            ),
+            row=2, col=1
+        )
+
+        fig.update_layout(
+            height=500,  # slightly less height overall
+            showlegend=False,
+            margin=dict(l=0, r=0, t=40, b=30),
+            template='plotly_dark',
+            bargap=0.6,
+            bargroupgap=0.1,
+        )
+
+        fig.update_xaxes(title_text="Date", row=2, col=1)
+        fig.update_yaxes(title_text="PnL ($)", row=1, col=1)
+        fig.update_yaxes(title_text="Trades", row=2, col=1)
+
+        st.plotly_chart(fig, use_container_width=True)
+
+    # Stats to the side, matching PnL style
+    with right:
+        st.markdown("<div style='margin-top: 50px;'>", unsafe_allow_html=True)
+        st.markdown("<div style='margin-bottom:1rem'></div>", unsafe_allow_html=True)  # Spacer
+
+        st.markdown(f"<div style='text-align:center; font-size:20px; font-weight:bold; color:#eee;'>{period_stats['periods_traded']}</div>", unsafe_allow_html=True)
+        st.markdown(f"<div style='text-align:center; font-size:14px; color:#aaa;'>{period_unit}s Traded</div>", unsafe_allow_html=True)
+
+        st.markdown("<div style='margin-bottom:1.5rem'></div>", unsafe_allow_html=True)  # Spacer
+
+        st.markdown(f"<div style='text-align:center; font-size:20px; font-weight:bold; color:#eee;'>{period_stats['avg_trades']:.1f}</div>", unsafe_allow_html=True)
+        st.markdown(f"<div style='text-align:center; font-size:14px; color:#aaa;'>Average Trades Per {period_unit}</div>", unsafe_allow_html=True)
+
+        st.markdown("<div style='margin-bottom:1.5rem'></div>", unsafe_allow_html=True)  # Spacer
+
+        st.markdown(f"<div style='text-align:center; font-size:20px; font-weight:bold; color:#eee;'>${period_stats['avg_pnl']:.2f}</div>", unsafe_allow_html=True)
+        st.markdown(f"<div style='text-align:center; font-size:14px; color:#aaa;'>Average {period_unit} PnL</div>", unsafe_allow_html=True)
+
+        st.markdown("<div style='margin-bottom:1.5rem'></div>", unsafe_allow_html=True)
+
+        st.markdown(f"<div style='text-align:center; font-size:20px; font-weight:bold; color:#eee;'>${period_stats['avg_win']:.2f}</div>", unsafe_allow_html=True)
+        st.markdown(f"<div style='text-align:center; font-size:14px; color:#aaa;'>Average Winning {period_unit}</div>", unsafe_allow_html=True)
+
+        st.markdown("<div style='margin-bottom:1.5rem'></div>", unsafe_allow_html=True)
+
+        st.markdown(f"<div style='text-align:center; font-size:20px; font-weight:bold; color:#eee;'>${period_stats['avg_loss']:.2f}</div>", unsafe_allow_html=True)
+        st.markdown(f"<div style='text-align:center; font-size:14px; color:#aaa;'>Average Losing {period_unit}</div>", unsafe_allow_html=True)
+
+if store is not None:
+    # The other sections need the trades in memory, which a store only loads on request
+    if not st.toggle("Load trades", help="Load the store's trades for the equity curve and the other sections. Without them, only the stats summed in SQLite are shown."):
+        st.markdown("---")
+        period_section(cached_store_aggregates(dataset, filters or None, store_modified))
+        st.stop()
+    df = cached_store_trades(dataset, store_modified)
+    if filters:
+        advanced_stats = cached_filtered_stats(df, filters)['advanced_stats']
+advanced_stats = advanced_stats or cached_advanced_stats(df)
+deferred = []  # (memoized function, args) of closed sections, prefetched once the page is done
 
 
 # --- PnL Section ---
@@ -38,12 +270,33 @@ st.subheader("Performance Overview")
 left, right = st.columns([3, 1])
 
 # Left: Cumulative PnL Plot
+cumulative_pnl = advanced_stats["cumulative_pnl"]
+start, end = zoom_range("Trade range", len(cumulative_pnl), key='pnl_range')
+cumulative_pnl = cumulative_pnl.iloc[start:end]
+cumulative_pnl = cumulative_pnl.iloc[minmax_indices(cumulative_pnl, CHART_POINTS, keep=drawdown_indices(cumulative_pnl))]
 fig = px.line(
-    x=df.index,
-    y=advanced_stats["cumulative_pnl"],
+    x=cumulative_pnl.index,
+    y=cumulative_pnl.values,
     labels={"x": "Trade Index", "y": "PnL ($)"},
     title="Cumulative PnL"
 )
+
+# Monte Carlo bands: percentiles of resampled equity curves behind the actual one
+with left:
+    show_bands = st.toggle("Monte Carlo bands", help="5-95% and 25-75% bands of equity curves resampled from these trades' PnL.")
+    if show_bands:
+        c1, c2 = st.columns(2)
+        mc_method = c1.selectbox("Resampling", METHODS, format_func=lambda method: {'iid': "IID bootstrap", 'block': "Block bootstrap", 'permutation': "Permutation"}[method])
+        mc_paths = c2.selectbox("Paths", MONTE_CARLO_PATHS, index=1)
+        monte_carlo = cached_monte_carlo(df, filters or None, mc_paths, mc_method)
+        bands = monte_carlo['curve_bands']
+        bands = bands[(bands.index >= cumulative_pnl.index[0]) & (bands.index <= cumulative_pnl.index[-1])]
+        for low, high, opacity in ((5, 95, 0.15), (25, 75, 0.3)):
+            fig.add_trace(go.Scatter(x=bands.index, y=bands[low], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+            fig.add_trace(go.Scatter(x=bands.index, y=bands[high], mode='lines', line=dict(width=0), fill='tonexty',
+                                     fillcolor=f'rgba(100, 149, 237, {opacity})', name=f"{low}-{high}%"))
+        fig.data = fig.data[1:] + fig.data[:1]  # draw the actual curve on top
+
 fig.update_layout(
     margin=dict(l=0, r=0, t=30, b=0),
     shapes=[dict(
@@ -58,6 +311,11 @@ fig.update_layout(
     height=400,
 )
 left.plotly_chart(fig, use_container_width=True)
+if show_bands:
+    mc_table = monte_carlo['bands'].T.set_axis(["Final PnL", "Max Drawdown", "Longest Losing Streak"])
+    mc_table.columns = [f"P{percentile}" for percentile in mc_table.columns]
+    mc_table["Actual"] = [monte_carlo['actual'][column] for column in PATH_COLUMNS]
+    left.dataframe(mc_table.style.format("{:.2f}"), use_container_width=True)
 
 # Right: Total PnL and Avg Win/Loss
 total_pnl = basic_stats["total_profit_loss"]
@@ -103,209 +361,376 @@ with right:
     row3[0].markdown("<div style='text-align:center; font-size:14px; color:#aaa;'>Max Drawdown</div>", unsafe_allow_html=True)
 
     st.markdown("</div>", unsafe_allow_html=True)
+profiling.checkpoint('dashboard.performance_overview')
 
 
 # --- Daily PnL Section ---
 st.markdown("---")
-st.subheader("📅 Daily PnL Overview")
-
 
-# Layout: Left = Bar Plot, Right = Stats
-left, right = st.columns([3, 1])
+if store is not None:
+    aggregates_source = (cached_store_aggregates, (dataset, filters or None, store_modified))
+elif filters:
+    aggregates_source = (cached_filtered_aggregates, (df, filters))
+else:
+    aggregates_source = (cached_trade_aggregates, (df,)) if not live_session else None
+if st.toggle("📅 Period PnL overview", help="Daily, weekly and monthly PnL. Computed when opened."):
+    period_section(ingester.aggregates if aggregates_source is None else aggregates_source[0](*aggregates_source[1]))
+elif aggregates_source is not None:
+    deferred.append(aggregates_source)
+profiling.checkpoint('dashboard.period_pnl')
 
-with left:
-    fig = make_subplots(
-        rows=2, cols=1,
-        shared_xaxes=True,
-        vertical_spacing=0.1,
-        row_heights=[0.75, 0.25],  # smaller height for trades plot
-        subplot_titles=("Daily PnL ($)", "Number of Trades")
-    )
 
-    # Daily PnL bars
-    fig.add_trace(
-        go.Bar(
-            x=daily_stats['daily_pnl'].index,
-            y=daily_stats['daily_pnl'].values,
-            marker_color=['green' if v >= 0 else 'red' for v in daily_stats['daily_pnl'].values],
-            name='Daily PnL',
-        ),
-        row=1, col=1
-    )
+# --- Time of Day x Weekday ---
+st.markdown("---")
 
-    # Number of trades bars
-    fig.add_trace(
-        go.Bar(
-            x=daily_stats['trades_per_day'].index,
-            y=daily_stats['trades_per_day'].values,
-            marker_color='gray',
-            name='Trades per Day',
-        ),
-        row=2, col=1
+@st.fragment
+def time_of_day_section(trade_data):
+    """Weekday x entry-time heatmap; the bucket, session and metric choices rerun only this section."""
+    st.subheader("🕒 Time of Day × Weekday", help="Stats per weekday and entry-time bucket. Overnight sessions count towards the weekday they end on.")
+
+    c1, c2, c3 = st.columns(3)
+    bucket_minutes = c1.select_slider("Bucket (minutes)", options=(5, 15, 30, 60), value=30)
+    session = c2.selectbox("Session", list(SESSIONS))
+    heatmap_metric = c3.selectbox("Metric", list(HEATMAP_METRICS), format_func=HEATMAP_METRICS.get)
+
+    time_stats = cached_time_of_day_stats(trade_data, filters, bucket_minutes, *SESSIONS[session])
+    traded = time_stats['num_trades'].sum(axis=1) > 0  # hide weekdays without trades
+    matrix = time_stats[heatmap_metric][traded]
+
+    fig = px.imshow(
+        matrix,
+        aspect='auto',
+        color_continuous_scale='RdYlGn_r' if heatmap_metric == 'avg_mae' else 'RdYlGn',
+        color_continuous_midpoint={'win_rate': 0.5, 'expectancy': 0}.get(heatmap_metric),
+        labels=dict(x="Entry Time", y="Weekday", color=HEATMAP_METRICS[heatmap_metric]),
     )
-
     fig.update_layout(
-        height=500,  # slightly less height overall
-        showlegend=False,
-        margin=dict(l=0, r=0, t=40, b=30),
+        height=350,
+        margin=dict(l=0, r=0, t=30, b=0),
         template='plotly_dark',
-        bargap=0.6,
-        bargroupgap=0.1,
     )
-
-    fig.update_xaxes(title_text="Date", row=2, col=1)
-    fig.update_yaxes(title_text="PnL ($)", row=1, col=1)
-    fig.update_yaxes(title_text="Trades", row=2, col=1)
-
     st.plotly_chart(fig, use_container_width=True)
 
-# Stats to the side, matching PnL style
-with right:
-    st.markdown("<div style='margin-top: 50px;'>", unsafe_allow_html=True)
-    st.markdown("<div style='margin-bottom:1rem'></div>", unsafe_allow_html=True)  # Spacer
-
-    st.markdown(f"<div style='text-align:center; font-size:20px; font-weight:bold; color:#eee;'>{daily_stats['days_traded']}</div>", unsafe_allow_html=True)
-    st.markdown("<div style='text-align:center; font-size:14px; color:#aaa;'>Days Traded</div>", unsafe_allow_html=True)
-
-    st.markdown("<div style='margin-bottom:1.5rem'></div>", unsafe_allow_html=True)  # Spacer
-
-    st.markdown(f"<div style='text-align:center; font-size:20px; font-weight:bold; color:#eee;'>{daily_stats['avg_trades_per_day']:.1f}</div>", unsafe_allow_html=True)
-    st.markdown("<div style='text-align:center; font-size:14px; color:#aaa;'>Average Trades Per Day</div>", unsafe_allow_html=True)
-
-    st.markdown("<div style='margin-bottom:1.5rem'></div>", unsafe_allow_html=True)  # Spacer
-
-    st.markdown(f"<div style='text-align:center; font-size:20px; font-weight:bold; color:#eee;'>${daily_stats['avg_day_pnl']:.2f}</div>", unsafe_allow_html=True)
-    st.markdown("<div style='text-align:center; font-size:14px; color:#aaa;'>Average Day PnL</div>", unsafe_allow_html=True)
+if st.toggle("🕒 Time of day × weekday", help="Heatmap of stats per weekday and entry time. Computed when opened."):
+    time_of_day_section(df)
+else:
+    deferred.append((cached_time_of_day_stats, (df, filters, 30, *SESSIONS[next(iter(SESSIONS))])))
+profiling.checkpoint('dashboard.time_of_day')
 
-    st.markdown("<div style='margin-bottom:1.5rem'></div>", unsafe_allow_html=True)
 
-    st.markdown(f"<div style='text-align:center; font-size:20px; font-weight:bold; color:#eee;'>${daily_stats['avg_win_day']:.2f}</div>", unsafe_allow_html=True)
-    st.markdown("<div style='text-align:center; font-size:14px; color:#aaa;'>Average Winning Day</div>", unsafe_allow_html=True)
-
-    st.markdown("<div style='margin-bottom:1.5rem'></div>", unsafe_allow_html=True)
-
-    st.markdown(f"<div style='text-align:center; font-size:20px; font-weight:bold; color:#eee;'>${daily_stats['avg_loss_day']:.2f}</div>", unsafe_allow_html=True)
-    st.markdown("<div style='text-align:center; font-size:14px; color:#aaa;'>Average Losing Day</div>", unsafe_allow_html=True)
-
-
-# --- Rolling vs Expanding Metrics ---
+# --- Streaks & Drawdowns ---
 st.markdown("---")
-st.subheader("Rolling vs Expanding Metrics", help="Rolling metrics are calculated over a fixed window (30 trades), while expanding metrics evolve with the whole sample.")
 
-# Layout: Left = Multi-line Plot, Right = Stat Deltas
-left, right = st.columns([3, 1])
-
-df = df.copy().iloc[50:]  # Skip early unstable rows
-metrics = ['win_rate', 'avg_win_loss_ratio', 'avg_mfe', 'avg_mae']
+@st.fragment
+def streak_section(trade_data):
+    """Streak and drawdown stats; the scope choice reruns only this section."""
+    st.subheader("🔁 Streaks & Drawdowns", help="A drawdown runs from a cumulative PnL peak to the first trade back at or above it.")
+    streak_scope = st.radio("Streaks", list(STREAK_SCOPES), horizontal=True)
+    episode_stats = cached_episode_stats(trade_data, filters, STREAK_SCOPES[streak_scope])
+    streak_stats = episode_stats['streak_summary']
+    drawdown_stats = episode_stats['drawdown_summary']
+
+    e1, e2, e3, e4 = st.columns(4)
+    e1.metric("Longest Win Streak", streak_stats['longest_win_streak'], help=f"Mean {streak_stats['mean_win_streak']:.1f} trades")
+    e2.metric("Longest Loss Streak", streak_stats['longest_loss_streak'], help=f"Mean {streak_stats['mean_loss_streak']:.1f} trades")
+    e3.metric("Drawdowns", drawdown_stats['num_drawdowns'], help=f"Mean depth ${drawdown_stats['mean_depth']:.2f}")
+    e4.metric("Longest Drawdown", f"{drawdown_stats['longest_trades']} trades", help=f"Current drawdown ${drawdown_stats['current_depth']:.2f}")
+
+    left, right = st.columns([3, 2])
+
+    with left:
+        fig = go.Figure()
+        for outcome, color in (('win', 'green'), ('loss', 'red')):
+            histogram = streak_stats[f'{outcome}_streak_histogram']
+            fig.add_trace(go.Bar(x=histogram.index, y=histogram.values, name=f"{outcome.title()} streaks", marker_color=color))
+        fig.update_layout(
+            title="Streak Lengths",
+            xaxis_title="Trades in a row",
+            yaxis_title="Streaks",
+            barmode='group',
+            height=350,
+            margin=dict(l=0, r=0, t=30, b=0),
+            template='plotly_dark',
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    with right:
+        st.markdown("**Deepest Drawdowns**")
+        deepest = episode_stats['drawdowns'].nsmallest(5, 'depth')
+        st.dataframe(
+            deepest[['depth', 'duration_trades', 'peak_time', 'recovery_time']].rename(columns={
+                'depth': 'Depth ($)', 'duration_trades': 'Trades', 'peak_time': 'From', 'recovery_time': 'Recovered'}),
+            hide_index=True,
+            use_container_width=True,
+        )
 
-with left:
-    fig = make_subplots(
-        rows=4, cols=1,
-        shared_xaxes=True,
-        vertical_spacing=0.1,
-        subplot_titles=["Win Rate", "Avg Win/Loss Ratio", "MFE ($)", "MAE ($)"]
-    )
+if st.toggle("🔁 Streaks & drawdowns", help="Win/loss streaks and drawdown episodes. Computed when opened."):
+    streak_section(df)
+else:
+    deferred.append((cached_episode_stats, (df, filters, STREAK_SCOPES[next(iter(STREAK_SCOPES))])))
+profiling.checkpoint('dashboard.streaks')
 
-    for i, metric in enumerate(metrics, start=1):
-        roll_series = df[f'rolling_{metric}']
-        std_series = roll_series.rolling(window=10).std()  # or another window size
 
-        upper_band = roll_series + std_series
-        lower_band = roll_series - std_series
+# --- Distributions ---
+st.markdown("---")
 
-        # Expanding line
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=df[f'expanding_{metric}'],
-                mode='lines',
-                name='Expanding' if i == 1 else None,
-                line=dict(color='gray')
-            ),
-            row=i, col=1
+@st.fragment
+def distribution_section(sketches):
+    """Histogram and percentiles of one trade column; the column choice reruns only this section."""
+    st.subheader("📊 Distributions", help="Merged from per-(day, symbol, account, side) sketches. Percentiles are within 1% of the exact values.")
+    column = st.radio("Column", list(DISTRIBUTION_COLUMNS), format_func=DISTRIBUTION_COLUMNS.get, horizontal=True)
+    summary = sketches.summary(column, **filters)
+    if not summary['count']:
+        st.caption("No trades with this value.")
+        return
+
+    # Layout: Left = Histogram, Right = Percentiles
+    left, right = st.columns([3, 1])
+
+    with left:
+        histogram = sketches.histogram(column, 40, **filters)
+        fig = go.Figure(go.Bar(
+            x=(histogram['left'] + histogram['right']) / 2,
+            y=histogram['count'],
+            width=histogram['right'] - histogram['left'],
+            marker_color='steelblue',
+        ))
+        fig.update_layout(
+            xaxis_title=DISTRIBUTION_COLUMNS[column],
+            yaxis_title="Trades",
+            height=350,
+            margin=dict(l=0, r=0, t=30, b=0),
+            template='plotly_dark',
         )
-
-        # Upper std band (invisible line for fill)
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=upper_band,
-                mode='lines',
-                line=dict(width=0),
-                showlegend=False,
-                hoverinfo='skip'
-            ),
-            row=i, col=1
+        st.plotly_chart(fig, use_container_width=True)
+
+    with right:
+        percentiles = sketches.quantiles(column, np.array(DISTRIBUTION_PERCENTILES) / 100, **filters)
+        st.dataframe(
+            pd.DataFrame({'Percentile': [f"{p}%" for p in DISTRIBUTION_PERCENTILES], 'Value': percentiles}),
+            hide_index=True,
+            use_container_width=True,
         )
+        st.caption(f"Mean {summary['mean']:,.2f} · min {summary['min']:,.2f} · max {summary['max']:,.2f}")
 
-        # Lower std band with fill
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=lower_band,
-                mode='lines',
-                fill='tonexty',
-                fillcolor='rgba(255, 165, 0, 0.2)',  # semi-transparent orange
-                line=dict(width=0),
-                showlegend=False,
-                hoverinfo='skip'
-            ),
-            row=i, col=1
-        )
+if st.toggle("📊 Distributions", help="PnL, MFE, MAE and duration histograms and percentiles. Computed when opened."):
+    distribution_section(ingester.sketches if live_session else cached_distribution_sketches(df))
+elif not live_session:
+    deferred.append((cached_distribution_sketches, (df,)))
+profiling.checkpoint('dashboard.distributions')
 
-        # Rolling line
-        fig.add_trace(
-            go.Scatter(
-                x=df.index,
-                y=roll_series,
-                mode='lines',
-                name='Rolling' if i == 1 else None,
-                line=dict(color='orange')
-            ),
-            row=i, col=1
-        )
 
-        # Format Win Rate as percentage
-        if metric == 'win_rate':
-            fig.update_yaxes(tickformat=".0%", row=i, col=1)
+# --- Exit What-If ---
+st.markdown("---")
 
+def exit_levels(unit, max_level):
+    """Stop and target grid up to max_level, plus np.inf for no stop / no target."""
+    if unit == 'ticks':
+        levels = np.unique(np.linspace(1, max_level, 20).round())
+    else:
+        levels = np.linspace(max_level / 20, max_level, 20).round(2)
+    return tuple(np.r_[levels, np.inf])
+
+@st.fragment
+def exit_section(trade_data):
+    """Stop-loss x take-profit surface; the unit, surface and level choices rerun only this section."""
+    st.subheader("🎯 Exit What-If", help="Every trade replayed against each stop-loss and take-profit from its MFE/MAE. When both would be hit, the stop is assumed first.")
+
+    c1, c2, c3 = st.columns(3)
+    exit_unit = c1.radio("Levels in", list(EXIT_UNITS), format_func=EXIT_UNITS.get, horizontal=True)
+    exit_metric = c2.selectbox("Surface", list(EXIT_METRICS), format_func=EXIT_METRICS.get)
+    if exit_unit == 'ticks':
+        max_level = c3.slider("Largest level (ticks)", 10, 200, 60, step=10)
+    else:
+        max_level = c3.slider("Largest level (× median MAE)", 1.0, 10.0, 4.0, step=0.5)
+    levels = exit_levels(exit_unit, max_level)
+
+    exit_stats = cached_exit_surfaces(trade_data, filters, levels, levels, exit_unit)
+    level_labels = [f"{level:g}" if np.isfinite(level) else "None" for level in levels]
+    surface = exit_stats[exit_metric].set_axis(level_labels, axis=0).set_axis(level_labels, axis=1)
+    if exit_metric == 'profit_factor':
+        surface = surface.clip(upper=5)  # a surface without losses would be infinite
+
+    fig = px.imshow(
+        surface,
+        aspect='auto',
+        origin='lower',
+        color_continuous_scale='RdYlGn',
+        color_continuous_midpoint={'expectancy': 0, 'profit_factor': 1, 'win_rate': 0.5}[exit_metric],
+        labels=dict(x="Take Profit", y="Stop Loss", color=EXIT_METRICS[exit_metric]),
+    )
     fig.update_layout(
-        height=900,
+        height=450,
+        margin=dict(l=0, r=0, t=30, b=0),
         template='plotly_dark',
-        showlegend=False,  # legend removed entirely
-        margin=dict(t=60, b=40, l=40, r=40),
     )
-
     st.plotly_chart(fig, use_container_width=True)
+    if exit_stats['skipped']:
+        st.caption(f"{exit_stats['skipped']} trades without contract specs or excursions were left out.")
 
-# --- Right side % changes ---
-with right:
-    spacing_per_metric = ["4rem", "9rem", "9rem", "9rem"]
-    titles = ['Win Rate', 'Avg Win/Loss Ratio', 'MFE', 'MAE']
+if st.toggle("🎯 Exit what-if", help="Stop-loss and take-profit surfaces replayed from MFE/MAE. Computed when opened."):
+    exit_section(df)
+else:
+    deferred.append((cached_exit_surfaces, (df, filters, exit_levels('ticks', 60), exit_levels('ticks', 60), 'ticks')))
+profiling.checkpoint('dashboard.exit_whatif')
 
-    for idx, (metric, title) in enumerate(zip(metrics, titles)):
-        exp_val = df[f'expanding_{metric}'].iloc[-1]
-        roll_val = df[f'rolling_{metric}'].iloc[-1]
 
-        if abs(exp_val) > 1e-6:
-            pct_change = (roll_val - exp_val) / abs(exp_val)
-        else:
-            pct_change = 0.0
+# --- Rolling vs Expanding Metrics ---
+st.markdown("---")
 
-        # Logic for color
-        if metric == 'avg_mae':  # Higher MAE is worse
-            color = 'lime' if pct_change < 0 else 'tomato'
-        else:
-            color = 'lime' if pct_change >= 0 else 'tomato'
+@st.fragment
+def rolling_section(multi_window_stats):
+    """Rolling vs expanding charts; the window and range sliders rerun only this section."""
+    st.subheader("Rolling vs Expanding Metrics", help="Rolling metrics are calculated over a fixed window of trades, while expanding metrics evolve with the whole sample.")
 
-        display_val = f"{pct_change:.2%}"
+    # All windows are precomputed, so switching only re-slices the cached result
+    window = st.select_slider("Rolling window (trades)", options=ROLLING_WINDOWS, value=30)
 
-        st.markdown(f"<div style='margin-top:{spacing_per_metric[idx]};'></div>", unsafe_allow_html=True)
+    # Layout: Left = Multi-line Plot, Right = Stat Deltas
+    left, right = st.columns([3, 1])
+
+    df = multi_window_stats.loc[window].iloc[50:]  # Skip early unstable rows
+    metrics = ['win_rate', 'avg_win_loss_ratio', 'avg_mfe', 'avg_mae']
+    start, end = zoom_range("Trade range", len(df), key='rolling_range')
+
+    with left:
+        fig = make_subplots(
+            rows=4, cols=1,
+            shared_xaxes=True,
+            vertical_spacing=0.1,
+            subplot_titles=["Win Rate", "Avg Win/Loss Ratio", "MFE ($)", "MAE ($)"]
+        )
+
+        for i, metric in enumerate(metrics, start=1):
+            roll_series = df[f'rolling_{metric}']
+            std_series = roll_series.rolling(window=10).std()  # or another window size
+
+            # Downsample the lines and bands together so the fill stays aligned
+            lines = pd.DataFrame({
+                'expanding': df[f'expanding_{metric}'],
+                'upper': roll_series + std_series,
+                'lower': roll_series - std_series,
+                'rolling': roll_series,
+            }).iloc[start:end]
+            lines = downsample_frame(lines, CHART_POINTS)
+
+            # Expanding line
+            fig.add_trace(
+                go.Scatter(
+                    x=lines.index,
+                    y=lines['expanding'],
+                    mode='lines',
+                    name='Expanding' if i == 1 else None,
+                    line=dict(color='gray')
+                ),
+                row=i, col=1
+            )
+
+            # Upper std band (invisible line for fill)
+            fig.add_trace(
+                go.Scatter(
+                    x=lines.index,
+                    y=lines['upper'],
+                    mode='lines',
+                    line=dict(width=0),
+                    showlegend=False,
+                    hoverinfo='skip'
+                ),
+                row=i, col=1
+            )
+
+            # Lower std band with fill
+            fig.add_trace(
+                go.Scatter(
+                    x=lines.index,
+                    y=lines['lower'],
+                    mode='lines',
+                    fill='tonexty',
+                    fillcolor='rgba(255, 165, 0, 0.2)',  # semi-transparent orange
+                    line=dict(width=0),
+                    showlegend=False,
+                    hoverinfo='skip'
+                ),
+                row=i, col=1
+            )
+
+            # Rolling line
+            fig.add_trace(
+                go.Scatter(
+                    x=lines.index,
+                    y=lines['rolling'],
+                    mode='lines',
+                    name='Rolling' if i == 1 else None,
+                    line=dict(color='orange')
+                ),
+                row=i, col=1
+            )
+
+            # Format Win Rate as percentage
+            if metric == 'win_rate':
+                fig.update_yaxes(tickformat=".0%", row=i, col=1)
+
+        fig.update_layout(
+            height=900,
+            template='plotly_dark',
+            showlegend=False,  # legend removed entirely
+            margin=dict(t=60, b=40, l=40, r=40),
+        )
 
-        st.markdown(f"""
-            <div style='text-align:center; font-size:30px; font-weight:bold; color:{color};'>{display_val}</div>
-            <div style='text-align:center; font-size:20px; color:#aaa;'>{title} % Change</div>
-        """, unsafe_allow_html=True)
+        st.plotly_chart(fig, use_container_width=True)
+
+    # --- Right side % changes ---
+    with right:
+        spacing_per_metric = ["4rem", "9rem", "9rem", "9rem"]
+        titles = ['Win Rate', 'Avg Win/Loss Ratio', 'MFE', 'MAE']
+
+        for idx, (metric, title) in enumerate(zip(metrics, titles)):
+            exp_val = df[f'expanding_{metric}'].iloc[-1] if not df.empty else np.nan
+            roll_val = df[f'rolling_{metric}'].iloc[-1] if not df.empty else np.nan
+
+            if abs(exp_val) > 1e-6:
+                pct_change = (roll_val - exp_val) / abs(exp_val)
+            else:
+                pct_change = 0.0
+
+            # Logic for color
+            if metric == 'avg_mae':  # Higher MAE is worse
+                color = 'lime' if pct_change < 0 else 'tomato'
+            else:
+                color = 'lime' if pct_change >= 0 else 'tomato'
+
+            display_val = f"{pct_change:.2%}"
+
+            st.markdown(f"<div style='margin-top:{spacing_per_metric[idx]};'></div>", unsafe_allow_html=True)
+
+            st.markdown(f"""
+                <div style='text-align:center; font-size:30px; font-weight:bold; color:{color};'>{display_val}</div>
+                <div style='text-align:center; font-size:20px; color:#aaa;'>{title} % Change</div>
+            """, unsafe_allow_html=True)
+
+rolling_source = (cached_filtered_multi_window_stats, (df, filters, ROLLING_WINDOWS)) if filters else (cached_multi_window_stats, (df, ROLLING_WINDOWS))
+if st.toggle("📈 Rolling vs expanding metrics", help="Computed when opened."):
+    rolling_section(rolling_source[0](*rolling_source[1]))
+else:
+    deferred.append(rolling_source)
+profiling.checkpoint('dashboard.rolling')
+
+
+# --- Performance ---
+# Only shown when timings are collected (set TRADING_DASHBOARD_PROFILE=1)
+if profiling.enabled():
+    with st.expander("Performance"):
+        st.markdown("**Per stage**")
+        st.dataframe(profiling.summary(), use_container_width=True)
+        st.markdown("**Timeline**")
+        st.dataframe(profiling.records(), hide_index=True, use_container_width=True)
+        c1, c2 = st.columns(2)
+        c1.download_button("Export JSON", profiling.to_json(), file_name="profile.json", mime='application/json')
+        c2.download_button("Export CSV", profiling.to_csv(), file_name="profile.csv", mime='text/csv')
+
+# Warm the caches of closed sections in the background, so opening one is instant
+for func, args in deferred:
+    prefetch(func, *args)
 
 
 
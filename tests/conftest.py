@@ -0,0 +1,18 @@
+import pytest
+import src.alerts as alerts
+import src.ingest as ingest
+from src.synthetic import TRADES_LIST_COLUMNS, _to_trades_list_rows
+
+@pytest.fixture
+def export(tmp_path, monkeypatch):
+    """Raw and processed directories in tmp_path, and a function appending trades to the raw export."""
+    monkeypatch.setattr(ingest, 'RAW_DATA_DIR', tmp_path)
+    monkeypatch.setattr(ingest, 'PROCESSED_DATA_DIR', tmp_path)
+    monkeypatch.setattr(alerts, 'PROCESSED_DATA_DIR', tmp_path)
+    path = tmp_path / 'TradesList.txt'
+    path.write_text('\t'.join(TRADES_LIST_COLUMNS) + '\n')
+
+    def append(trades):
+        with open(path, 'a', newline='') as f:
+            _to_trades_list_rows(trades, 0.0).to_csv(f, sep='\t', header=False, index=False)
+    return append
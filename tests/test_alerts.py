@@ -0,0 +1,40 @@
+from src.alerts import AlertMonitor
+from src.ingest import IncrementalIngester
+from src.synthetic import generate_trades
+
+RULES = {'trade_milestone': 10}
+
+def test_new_monitor_on_an_empty_store_alerts_from_the_first_batch(export):
+    trades = generate_trades(25, seed=2)
+    ingester, monitor = IncrementalIngester(), AlertMonitor(rules=RULES)
+    monitor.follow(ingester, ingester.poll())
+
+    export(trades.iloc[:12])
+    fired = monitor.follow(ingester, ingester.poll())
+    assert [alert['trade_number'] for alert in fired if alert['rule'] == 'trade_milestone'] == [10]
+
+    export(trades.iloc[12:])
+    fired = monitor.follow(ingester, ingester.poll())
+    assert [alert['trade_number'] for alert in fired if alert['rule'] == 'trade_milestone'] == [20]
+
+def test_new_monitor_on_an_existing_store_replays_history_quietly(export):
+    trades = generate_trades(25, seed=2)
+    export(trades.iloc[:12])
+    ingester = IncrementalIngester()
+    ingester.poll()
+
+    monitor = AlertMonitor(rules=RULES)
+    export(trades.iloc[12:])
+    fired = monitor.follow(ingester, ingester.poll())
+    assert [alert['trade_number'] for alert in fired if alert['rule'] == 'trade_milestone'] == [20]
+    assert monitor.state['rows'] == 25
+
+def test_rebuilt_store_is_replayed_quietly(export):
+    export(generate_trades(25, seed=2))
+    ingester, monitor = IncrementalIngester(), AlertMonitor(rules=RULES)
+    assert monitor.follow(ingester, ingester.poll()) == []
+    assert monitor.state['rows'] == 25
+
+    export(generate_trades(10, seed=3))
+    fired = monitor.follow(ingester, ingester.poll())
+    assert [alert['trade_number'] for alert in fired if alert['rule'] == 'trade_milestone'] == [30]
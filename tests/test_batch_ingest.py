@@ -0,0 +1,20 @@
+import os
+
+import src.batch_ingest as batch_ingest
+from src.batch_ingest import ingest_files
+from src.synthetic import generate_trades, write_trades_list
+
+def test_batches_go_to_the_upload_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_ingest, 'PROCESSED_DATA_DIR', tmp_path)
+    # Windows and macOS have no sched_getaffinity
+    monkeypatch.delattr(os, 'sched_getaffinity', raising=False)
+    trades = generate_trades(100, seed=6)
+    first, second = tmp_path / 'first.txt', tmp_path / 'second.txt'
+    write_trades_list(trades.iloc[:60], first)
+    write_trades_list(trades.iloc[40:], second)
+
+    report = ingest_files([first, second])
+    assert report['added'].tolist() == [60, 40]
+    assert report['duplicates'].tolist() == [0, 20]
+    assert (tmp_path / 'trades_uploaded.csv').exists()
+    assert not (tmp_path / 'trades.csv').exists()
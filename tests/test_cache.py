@@ -0,0 +1,61 @@
+import os
+import stat
+import threading
+
+import pandas as pd
+import pytest
+import src.cache as cache
+from src.cache import data_fingerprint, load_cached
+from src.metrics import cached_basic_stats
+from src.synthetic import generate_trades
+
+def read_csv(path):
+    return pd.read_csv(path)
+
+def test_same_named_sources_in_different_folders_do_not_collide(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path / 'cache')
+    first, second = tmp_path / 'a' / 'trades.csv', tmp_path / 'b' / 'trades.csv'
+    for path, value in ((first, 1), (second, 2)):
+        path.parent.mkdir()
+        pd.DataFrame({'x': [value]}).to_csv(path, index=False)
+
+    assert load_cached(first, read_csv)['x'].tolist() == [1]
+    assert load_cached(second, read_csv)['x'].tolist() == [2]
+    assert load_cached(first, read_csv)['x'].tolist() == [1]
+
+def test_cache_files_get_the_umask_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path / 'cache')
+    source = tmp_path / 'trades.csv'
+    pd.DataFrame({'x': [1]}).to_csv(source, index=False)
+    load_cached(source, read_csv)
+
+    umask = os.umask(0)
+    os.umask(umask)
+    for path in (tmp_path / 'cache').iterdir():
+        assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~umask, path.name
+
+def test_concurrent_refreshes_leave_no_staging_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path / 'cache')
+    source = tmp_path / 'trades.csv'
+    pd.DataFrame({'x': range(1000)}).to_csv(source, index=False)
+
+    threads = [threading.Thread(target=cache.refresh_cache, args=(source, read_csv)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not list((tmp_path / 'cache').glob('*.tmp'))
+    assert load_cached(source, read_csv)['x'].tolist() == list(range(1000))
+
+def test_fingerprint_follows_column_assignment_and_inplace_sorts():
+    trade_data = generate_trades(200, seed=3)
+    total = cached_basic_stats(trade_data)['total_profit_loss']
+
+    trade_data['profit_loss'] *= 2
+    assert cached_basic_stats(trade_data)['total_profit_loss'] == pytest.approx(2 * total)
+
+    fingerprint = data_fingerprint(trade_data)
+    trade_data.sort_values('profit_loss', inplace=True)
+    assert data_fingerprint(trade_data) != fingerprint
+    assert data_fingerprint(trade_data) == data_fingerprint(trade_data.copy())
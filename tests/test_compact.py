@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal, assert_series_equal
+from src.aggregates import TradeAggregates
+from src.episodes import compute_drawdown_episodes, compute_streaks
+from src.grouped import compute_grouped_stats
+from src.heatmap import compute_time_of_day_stats
+from src.metrics import (add_mfe_mae_columns, compute_advanced_stats, compute_basic_stats, compute_daily_stats,
+                         compute_multi_window_stats, compute_rolling_stats)
+from src.preprocessing import compact_trades
+from src.synthetic import generate_trades
+from src.whatif import simulate_exits
+
+@pytest.fixture(scope='module')
+def schemas():
+    trade_data = generate_trades(500, seed=9)
+    trade_data.loc[::23, 'profit_loss'] = float('nan')
+    return trade_data, compact_trades(trade_data)
+
+def test_basic_stats(schemas):
+    regular, compact = schemas
+    assert compute_basic_stats(compact) == pytest.approx(compute_basic_stats(regular), nan_ok=True)
+
+def test_advanced_stats(schemas):
+    regular, compact = schemas
+    expected, actual = compute_advanced_stats(regular), compute_advanced_stats(compact)
+    assert_series_equal(actual.pop('cumulative_pnl'), expected.pop('cumulative_pnl'))
+    assert actual == pytest.approx(expected, nan_ok=True)
+
+def test_daily_stats(schemas):
+    regular, compact = schemas
+    expected, actual = compute_daily_stats(regular), compute_daily_stats(compact)
+    for key in ('daily_pnl', 'trades_per_day'):
+        assert_series_equal(actual.pop(key), expected.pop(key))
+    assert actual == pytest.approx(expected, nan_ok=True)
+
+def test_rolling_stats(schemas):
+    regular, compact = schemas
+    expected = compute_rolling_stats(regular, 20)
+    columns = [column for column in expected if column.startswith(('rolling_', 'expanding_'))]
+    assert_frame_equal(compute_rolling_stats(compact, 20)[columns], expected[columns])
+
+def test_multi_window_stats(schemas):
+    regular, compact = schemas
+    assert_frame_equal(compute_multi_window_stats(compact, (5, 50)), compute_multi_window_stats(regular, (5, 50)))
+
+def test_mfe_mae_columns(schemas):
+    regular, compact = schemas
+    columns = ['mfe', 'mae', 'mfe_mae_ratio']
+    assert_frame_equal(add_mfe_mae_columns(compact)[columns], add_mfe_mae_columns(regular)[columns])
+
+def test_grouped_stats(schemas):
+    regular, compact = schemas
+    expected = compute_grouped_stats(regular, processes=1)
+    actual = compute_grouped_stats(compact, processes=1)
+    assert_frame_equal(actual.reset_index(), expected.reset_index(), check_dtype=False, check_categorical=False)
+
+def test_episodes(schemas):
+    regular, compact = schemas
+    assert_frame_equal(compute_streaks(compact, 'symbol'), compute_streaks(regular, 'symbol'), check_dtype=False, check_categorical=False)
+    assert_frame_equal(compute_drawdown_episodes(compact), compute_drawdown_episodes(regular), check_dtype=False)
+
+def test_time_of_day_stats(schemas):
+    regular, compact = schemas
+    expected, actual = compute_time_of_day_stats(regular, 60), compute_time_of_day_stats(compact, 60)
+    for key, frame in expected.items():
+        assert_frame_equal(actual[key], frame)
+
+def test_exit_surfaces(schemas):
+    regular, compact = schemas
+    levels = (2.0, 8.0, float('inf'))
+    expected, actual = simulate_exits(regular, levels, levels), simulate_exits(compact, levels, levels)
+    for key, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            assert_frame_equal(actual[key], value)
+        else:
+            assert actual[key] == value
+
+def test_aggregates(schemas):
+    regular, compact = schemas
+    assert_frame_equal(TradeAggregates.from_trades(compact).period_stats('W'), TradeAggregates.from_trades(regular).period_stats('W'))
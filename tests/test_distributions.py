@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.distributions import RELATIVE_ACCURACY, SKETCH_COLUMNS, DistributionSketches
+from src.filters import filtered_pipeline
+from src.metrics import MetricsPipeline
+from src.synthetic import generate_trades
+
+QUANTILES = np.array([0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1])
+
+@pytest.fixture(scope='module')
+def trades():
+    trades = generate_trades(3000, seed=11)
+    # Missing PnLs, exact zeros and values below the smallest bucket
+    trades.loc[::97, 'profit_loss'] = np.nan
+    trades.loc[5::89, 'profit_loss'] = 0.0
+    trades.loc[7::83, 'profit_loss'] = 1e-9
+    trades.loc[9::79, 'profit_loss'] = -3e-7
+    return trades
+
+def filter_sets(trades):
+    last = trades['entry_datetime'].max().normalize()
+    return [{},
+            {'symbols': ('MES',)},
+            {'symbols': ('MNQ', 'MCL'), 'accounts': ('Sim1',), 'sides': ('Long',)},
+            {'start': last - pd.Timedelta(days=60), 'end': last + pd.Timedelta(days=1)}]
+
+def column_values(trades, filters, column):
+    pipeline = filtered_pipeline(trades, **filters) if filters else MetricsPipeline(trades)
+    values = getattr(pipeline, column) if hasattr(MetricsPipeline, column) else pipeline._column(column, float)
+    return values[~np.isnan(values)]
+
+def test_quantiles_are_within_the_relative_accuracy(trades):
+    sketches = DistributionSketches.from_trades(trades)
+    for filters in filter_sets(trades):
+        for column in SKETCH_COLUMNS:
+            values = column_values(trades, filters, column)
+            exact = np.quantile(values, QUANTILES, method='lower')
+            estimate = sketches.quantiles(column, QUANTILES, **filters)
+            # Near-zero values share the zero bucket, so they are off by at most its width
+            assert np.all(np.abs(estimate - exact) <= RELATIVE_ACCURACY * np.abs(exact) + 1e-6), (filters, column)
+
+            summary = sketches.summary(column, **filters)
+            assert summary['count'] == len(values)
+            assert summary['mean'] == pytest.approx(values.mean())
+            assert (summary['min'], summary['max']) == (values.min(), values.max())
+            assert sketches.histogram(column, 20, **filters)['count'].sum() == len(values)
+
+def test_no_matching_trades_give_nan(trades):
+    sketches = DistributionSketches.from_trades(trades)
+    assert np.isnan(sketches.quantiles('profit_loss', QUANTILES, symbols=('XYZ',))).all()
+    assert sketches.summary('profit_loss', symbols=('XYZ',))['count'] == 0
+    assert sketches.histogram('profit_loss', symbols=('XYZ',)).empty
+
+def test_updates_match_a_single_build(trades):
+    batch = DistributionSketches.from_trades(trades)
+    updated = DistributionSketches.from_trades(trades.iloc[:1000])
+    updated.update(trades.iloc[1000:1001])
+    updated.update(trades.iloc[1001:])
+    assert len(updated.bucket_keys) == len(batch.bucket_keys)
+    for filters in filter_sets(trades):
+        for column in SKETCH_COLUMNS:
+            buckets, counts, summary = updated.merge(column, **filters)
+            expected_buckets, expected_counts, expected_summary = batch.merge(column, **filters)
+            np.testing.assert_array_equal(buckets, expected_buckets)
+            np.testing.assert_array_equal(counts, expected_counts)
+            assert summary == pytest.approx(expected_summary, nan_ok=True)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from src.downsampling import MAX_CHART_POINTS, chart_points, downsample_frame, drawdown_indices, minmax_indices
+
+def random_walk(num_points, seed=0):
+    return np.cumsum(np.random.default_rng(seed).normal(size=num_points))
+
+def test_extremes_and_drawdown_survive_downsampling():
+    for num_points in (MAX_CHART_POINTS + 1, 10_007, 250_000):
+        values = random_walk(num_points, seed=num_points)
+        keep = drawdown_indices(values)
+        indices = minmax_indices(values, keep=keep)
+        assert len(indices) <= MAX_CHART_POINTS
+        assert np.all(np.diff(indices) > 0)
+        assert {0, num_points - 1, int(np.argmin(values)), int(np.argmax(values)), *keep} <= set(indices)
+
+        # The drawdown of the plotted points is the full series' drawdown
+        sampled = values[indices]
+        assert np.min(sampled - np.maximum.accumulate(sampled)) == np.min(values - np.maximum.accumulate(values))
+
+def test_short_series_are_returned_whole():
+    np.testing.assert_array_equal(minmax_indices(np.arange(10.0)), np.arange(10))
+
+def test_drawdown_ignores_missing_values():
+    values = np.array([0.0, 5.0, np.nan, 2.0, 8.0, 1.0, np.nan, 3.0])
+    assert drawdown_indices(values) == (4, 5)
+    assert drawdown_indices(np.full(3, np.nan)) == ()
+
+    walk = random_walk(50_000, seed=3)
+    walk[::97] = np.nan
+    peak, trough = drawdown_indices(walk)
+    indices = minmax_indices(walk, keep=(peak, trough))
+    assert len(indices) <= MAX_CHART_POINTS
+    assert not np.isnan(walk[[peak, trough]]).any()
+    assert walk[trough] - walk[peak] == np.nanmin(walk - np.fmax.accumulate(walk))
+
+def test_frames_stay_within_the_budget_and_keep_every_column_extreme():
+    rng = np.random.default_rng(4)
+    frame = pd.DataFrame({'a': random_walk(30_000, 1), 'b': rng.normal(size=30_000), 'c': random_walk(30_000, 2)})
+    sampled = downsample_frame(frame, chart_points(0.75))
+    assert len(sampled) <= chart_points(0.75)
+    for column in frame:
+        assert sampled[column].min() == frame[column].min() and sampled[column].max() == frame[column].max()
+
+def test_chart_points_scale_with_width():
+    assert chart_points(0.5) * 2 == chart_points(1.0) == MAX_CHART_POINTS
+    assert chart_points(1.0, page_width_px=800) == 1600
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from src.episodes import DrawdownTracker, StreakTracker, compute_drawdown_episodes, compute_streaks
+from src.synthetic import generate_trades
+
+@pytest.fixture(scope='module')
+def trades():
+    trades = generate_trades(400, seed=21)
+    trades.loc[::37, 'profit_loss'] = np.nan
+    trades.loc[5::41, 'profit_loss'] = 0.0
+    return trades.reset_index(drop=True)
+
+def chunks(trades, seed):
+    """The trades in random chunk sizes, or one at a time for seed 'single'."""
+    if seed == 'single':
+        return [trades.iloc[position:position + 1] for position in range(len(trades))]
+    rng = np.random.default_rng(seed)
+    cuts = np.unique(np.r_[0, rng.integers(1, len(trades), size=40), len(trades)])
+    return [trades.iloc[start:end] for start, end in zip(cuts[:-1], cuts[1:])]
+
+def reference_streaks(trades, by=None):
+    """Streaks found trade by trade."""
+    streaks, open_streak = [], {}
+    groups = trades[by] if by else [None] * len(trades)
+    for position, (profit_loss, group) in enumerate(zip(trades['profit_loss'], groups)):
+        outcome = 'none' if np.isnan(profit_loss) else 'win' if profit_loss >= 0 else 'loss'
+        streak = open_streak.get(group)
+        if streak is None or streak['outcome'] != outcome:
+            streak = open_streak[group] = {'group': group, 'start': position, 'end': position, 'length': 0,
+                                           'outcome': outcome, 'profit_loss': 0.0}
+            streaks.append(streak)
+        streak['end'] = position
+        streak['length'] += 1
+        streak['profit_loss'] += np.nan_to_num(profit_loss)
+    return pd.DataFrame(streaks)
+
+def reference_drawdowns(trades):
+    """Drawdown episodes found trade by trade."""
+    episodes, episode = [], None
+    cumulative_pnl, peak = 0.0, -np.inf
+    times = list(trades['exit_datetime'])
+    for position, profit_loss in enumerate(trades['profit_loss']):
+        cumulative_pnl += np.nan_to_num(profit_loss)
+        if cumulative_pnl < peak:
+            if episode is None:
+                episode = {'peak': position - 1, 'start': position, 'trough': position, 'recovery': -1,
+                           'depth': cumulative_pnl - peak, 'peak_time': times[position - 1],
+                           'trough_time': times[position], 'recovery_time': pd.NaT}
+                episodes.append(episode)
+            elif cumulative_pnl - peak < episode['depth']:
+                episode.update(trough=position, depth=cumulative_pnl - peak, trough_time=times[position])
+        elif episode is not None:
+            episode.update(recovery=position, recovery_time=times[position])
+            episode = None
+        peak = max(peak, cumulative_pnl)
+    return episodes
+
+@pytest.mark.parametrize('by', [None, 'symbol'])
+@pytest.mark.parametrize('seed', [0, 1, 'single'])
+def test_streak_updates_match_a_full_recompute(trades, by, seed):
+    tracker = StreakTracker(by)
+    for chunk in chunks(trades, seed):
+        tracker.update(chunk)
+    streaks = tracker.streaks
+    assert_frame_equal(streaks, compute_streaks(trades, by), check_dtype=False)
+
+    expected = reference_streaks(trades, by)
+    assert streaks[['start', 'end', 'length', 'outcome']].astype(object).values.tolist() == \
+        expected[['start', 'end', 'length', 'outcome']].astype(object).values.tolist()
+    np.testing.assert_allclose(streaks['profit_loss'].astype(float), expected['profit_loss'])
+    assert list(streaks['group']) == list(expected['group'])
+
+@pytest.mark.parametrize('seed', [0, 1, 'single'])
+def test_drawdown_updates_match_a_full_recompute(trades, seed):
+    tracker = DrawdownTracker()
+    for chunk in chunks(trades, seed):
+        tracker.update(chunk)
+    drawdowns = tracker.drawdowns
+    assert_frame_equal(drawdowns, compute_drawdown_episodes(trades), check_dtype=False)
+
+    expected = reference_drawdowns(trades)
+    assert len(drawdowns) == len(expected) > 1
+    for row, episode in zip(drawdowns.to_dict('records'), expected):
+        for column in ('peak', 'start', 'trough', 'recovery'):
+            assert row[column] == episode[column], column
+        assert row['depth'] == pytest.approx(episode['depth'])
+        for column in ('peak_time', 'trough_time', 'recovery_time'):
+            assert pd.isna(row[column]) == pd.isna(episode[column]), column
+            assert pd.isna(episode[column]) or pd.Timestamp(row[column]) == episode[column], column
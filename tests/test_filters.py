@@ -0,0 +1,58 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.filters import TradeIndex, filtered_pipeline
+from src.metrics import compute_advanced_stats, compute_basic_stats
+from src.synthetic import generate_trades
+
+def mask_filter(trade_data, symbols=None, accounts=None, sides=None, start=None, end=None):
+    """Boolean mask of the trades matching the filters, built on the frame."""
+    mask = np.ones(len(trade_data), dtype=bool)
+    for column, accepted in (('symbol', symbols), ('Account', accounts), ('trade_type', sides)):
+        if accepted is not None:
+            mask &= trade_data[column].isin(accepted).to_numpy()
+    if start is not None:
+        mask &= (trade_data['entry_datetime'] >= start).to_numpy()
+    if end is not None:
+        mask &= (trade_data['entry_datetime'] < end).to_numpy()
+    return mask
+
+def filter_combinations(trade_data):
+    first, last = trade_data['entry_datetime'].min(), trade_data['entry_datetime'].max()
+    middle = first + (last - first) / 2
+    options = {
+        'symbols': [None, ('MES',), ('MNQ', 'MCL'), ('XYZ',)],
+        'accounts': [None, ('Sim1',)],
+        'sides': [None, ('Short',)],
+        'dates': [(None, None), (middle.normalize(), None), (None, middle), (first, first + pd.Timedelta(days=3))],
+    }
+    for symbols, accounts, sides, (start, end) in itertools.product(*options.values()):
+        filters = {'symbols': symbols, 'accounts': accounts, 'sides': sides, 'start': start, 'end': end}
+        yield {key: value for key, value in filters.items() if value is not None}
+
+@pytest.fixture(params=['sorted', 'unsorted'])
+def trade_data(request):
+    trade_data = generate_trades(1500, seed=17, accounts=['Sim1', 'Sim2'])
+    if request.param == 'unsorted':
+        trade_data = trade_data.sample(frac=1, random_state=3).reset_index(drop=True)
+        trade_data.loc[::211, 'entry_datetime'] = pd.NaT
+    return trade_data
+
+def test_bitmap_filters_match_boolean_masks(trade_data):
+    index = TradeIndex(trade_data)
+    assert (index.entry_order is None) == trade_data['entry_datetime'].is_monotonic_increasing
+
+    for filters in filter_combinations(trade_data):
+        mask = mask_filter(trade_data, **filters)
+        np.testing.assert_array_equal(index.select(**filters), np.flatnonzero(mask), err_msg=str(filters))
+
+        subset = trade_data[mask]
+        pipeline = filtered_pipeline(trade_data, **filters)
+        assert pipeline.basic_stats() == pytest.approx(compute_basic_stats(subset), nan_ok=True), filters
+        if len(subset):
+            expected = compute_advanced_stats(subset)
+            actual = pipeline.advanced_stats()
+            np.testing.assert_allclose(actual.pop('cumulative_pnl').to_numpy(), expected.pop('cumulative_pnl').to_numpy())
+            assert actual == pytest.approx(expected, nan_ok=True), filters
@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+import pytest
+import src.grouped as grouped
+from src.grouped import GROUP_COLUMNS, available_cpus, compute_grouped_stats
+from src.metrics import compute_advanced_stats, compute_basic_stats, compute_daily_stats
+from src.synthetic import generate_trades
+
+def reference_stats(trade_data):
+    """The compute_* functions run on every group's slice."""
+    rows = {}
+    for key, group in trade_data.groupby(list(GROUP_COLUMNS)):
+        advanced = compute_advanced_stats(group)
+        del advanced['cumulative_pnl']
+        daily = compute_daily_stats(group)
+        rows[key] = {**compute_basic_stats(group), **advanced,
+                     **{name: value for name, value in daily.items() if name not in ('daily_pnl', 'trades_per_day')}}
+    return rows
+
+def test_parallel_and_serial_match_per_group_stats(monkeypatch):
+    trade_data = generate_trades(3000, seed=12, accounts=['Sim1', 'Sim2', 'Sim3'])
+    trade_data.loc[::53, 'profit_loss'] = float('nan')
+    # Shuffled, so groups are interleaved and partitioning has to keep each group's trade order
+    trade_data = trade_data.sample(frac=1, random_state=0)
+    monkeypatch.setattr(grouped, 'PARALLEL_MIN_TRADES', 10)
+    pool_results = []
+    evaluate_parallel = grouped._evaluate_parallel
+    monkeypatch.setattr(grouped, '_evaluate_parallel', lambda *args: pool_results.extend(evaluate_parallel(*args)) or pool_results)
+
+    serial = compute_grouped_stats(trade_data, processes=1)
+    parallel = compute_grouped_stats(trade_data, processes=2)
+    assert len(pool_results) == len(serial)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+    expected = reference_stats(trade_data)
+    assert list(serial.index) == list(expected)
+    for key, row in serial.iterrows():
+        assert row.to_dict() == pytest.approx(expected[key], nan_ok=True), key
+
+def test_available_cpus_without_sched_getaffinity(monkeypatch):
+    # Windows and macOS have no sched_getaffinity
+    monkeypatch.delattr(os, 'sched_getaffinity', raising=False)
+    assert available_cpus() == (os.cpu_count() or 1)
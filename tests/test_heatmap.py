@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.heatmap import WEEKDAYS, bucket_labels, compute_time_of_day_stats
+from src.metrics import compute_basic_stats
+from src.synthetic import generate_trades
+
+SESSIONS = [("00:00", "00:00"), ("18:00", "17:00"), ("09:30", "16:00"), ("22:00", "02:00")]
+
+@pytest.fixture(scope='module')
+def trades():
+    # Entry times spread over every minute of three weeks, so sessions cross midnight and weekends
+    trades = generate_trades(3000, seed=5)
+    rng = np.random.default_rng(5)
+    seconds = rng.integers(0, 21 * 24 * 3600, size=len(trades))
+    trades['entry_datetime'] = pd.Timestamp('2025-03-02') + pd.to_timedelta(seconds, unit='s')
+    trades.loc[::151, 'entry_datetime'] = pd.NaT
+    return trades
+
+def reference_cells(trades, bucket_minutes, session_start, session_end):
+    """(weekday, bucket label) of every trade, from its session's start datetime."""
+    start = pd.Timedelta(f"{session_start}:00")
+    length = (pd.Timedelta(f"{session_end}:00") - start) % pd.Timedelta(days=1) or pd.Timedelta(days=1)
+    labels = bucket_labels(bucket_minutes, session_start, session_end)
+    cells = []
+    for entry in trades['entry_datetime']:
+        if pd.isna(entry):
+            cells.append(None)
+            continue
+        session = entry.floor('D') + start
+        if session > entry:
+            session -= pd.Timedelta(days=1)
+        elapsed = entry.floor('min') - session
+        if elapsed >= length:
+            cells.append(None)
+            continue
+        # A session belongs to the weekday it ends on
+        weekday = (session + length - pd.Timedelta(minutes=1)).weekday()
+        cells.append((WEEKDAYS[weekday], labels[elapsed // pd.Timedelta(minutes=bucket_minutes)]))
+    return cells
+
+@pytest.mark.parametrize('session_start, session_end', SESSIONS)
+@pytest.mark.parametrize('bucket_minutes', [30, 45])
+def test_cells_match_a_groupby_reference(trades, bucket_minutes, session_start, session_end):
+    stats = compute_time_of_day_stats(trades, bucket_minutes, session_start, session_end)
+    cells = pd.Series(reference_cells(trades, bucket_minutes, session_start, session_end), index=trades.index)
+
+    expected_counts = pd.DataFrame(0, index=WEEKDAYS, columns=stats['num_trades'].columns)
+    for (weekday, label), group in trades.groupby(cells.dropna()):
+        expected = compute_basic_stats(group)
+        expected_counts.loc[weekday, label] = expected['num_trades']
+        for key, value in expected.items():
+            assert stats[key].loc[weekday, label] == pytest.approx(value, nan_ok=True), (key, weekday, label)
+    pd.testing.assert_frame_equal(stats['num_trades'], expected_counts, check_dtype=False)
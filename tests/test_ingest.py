@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from pandas.testing import assert_frame_equal, assert_series_equal
+from src.aggregates import TradeAggregates
+from src.data_loader import read_trade_csv
+from src.distributions import SKETCH_COLUMNS, DistributionSketches
+from src.ingest import IncrementalIngester
+from src.metrics import MetricsPipeline
+from src.synthetic import generate_trades
+
+def test_polls_match_a_full_recompute(export, tmp_path):
+    trades = generate_trades(600, seed=4)
+    ingester = IncrementalIngester()
+    for start, end in ((0, 250), (250, 251), (251, 400), (400, 600)):
+        export(trades.iloc[start:end])
+        ingester.poll()
+        # Built after the first poll, then extended by the later ones
+        ingester.cumulative_pnl, ingester.aggregates, ingester.sketches
+
+    pipeline = MetricsPipeline(ingester.trade_data)
+    assert len(ingester.trade_data) == 600
+    assert ingester.basic_stats() == pytest.approx(pipeline.basic_stats(), nan_ok=True)
+
+    expected = pipeline.advanced_stats()
+    actual = ingester.advanced_stats()
+    assert_series_equal(actual.pop('cumulative_pnl'), expected.pop('cumulative_pnl'), check_index_type=False)
+    assert actual == pytest.approx(expected, nan_ok=True)
+
+    expected_sums = TradeAggregates.from_trades(ingester.trade_data).sums
+    assert_frame_equal(ingester.aggregates.sums.sort_index(), expected_sums, check_exact=False)
+
+    sketches = DistributionSketches.from_trades(ingester.trade_data)
+    for column in SKETCH_COLUMNS:
+        np.testing.assert_array_equal(ingester.sketches.quantiles(column, [0.05, 0.5, 0.95]),
+                                      sketches.quantiles(column, [0.05, 0.5, 0.95]))
+
+    daily = pipeline.daily_stats()
+    assert_series_equal(ingester.daily_stats()['daily_pnl'], daily['daily_pnl'], check_names=False)
+
+    # A restarted ingester carries on from the saved state
+    restarted = IncrementalIngester()
+    assert restarted.advanced_stats()['max_drawdown'] == pytest.approx(expected['max_drawdown'])
+    assert len(restarted.aggregates.sums) == len(ingester.aggregates.sums)
+
+def test_live_store_is_separate_from_the_processed_trades(export, tmp_path):
+    export(generate_trades(20, seed=1))
+    IncrementalIngester().poll()
+    assert (tmp_path / 'trades_live.csv').exists()
+    assert not (tmp_path / 'trades.csv').exists()
+
+def test_deleted_store_is_rebuilt_with_its_header(export, tmp_path):
+    trades = generate_trades(30, seed=5)
+    export(trades.iloc[:20])
+    IncrementalIngester().poll()
+    (tmp_path / 'trades_live.csv').unlink()
+
+    export(trades.iloc[20:])
+    ingester = IncrementalIngester()
+    assert len(ingester.poll()) == 30
+    assert ingester.rebuilt
+    assert len(read_trade_csv(tmp_path / 'trades_live.csv')) == 30
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.config import PROCESSED_DATA_DIR
+from src.data_loader import read_trade_csv
+from src.metrics import compute_multi_window_stats, compute_rolling_stats
+from src.synthetic import generate_trades
+
+def reference_add_mfe_mae_columns(trade_data: pd.DataFrame) -> pd.DataFrame:
+    """The original add_mfe_mae_columns."""
+    trade_data = trade_data.copy()
+
+    is_long = trade_data['trade_type'] == 'Long'
+    is_short = trade_data['trade_type'] == 'Short'
+
+    trade_data.loc[is_long, 'mfe'] = trade_data.loc[is_long, 'price_range_high'] - trade_data.loc[is_long, 'entry_price']
+    trade_data.loc[is_long, 'mae'] = trade_data.loc[is_long, 'entry_price'] - trade_data.loc[is_long, 'price_range_low']
+    trade_data.loc[is_long, 'mfe_mae_ratio'] = trade_data.loc[is_long, 'mfe'] / trade_data.loc[is_long, 'mae']
+
+    trade_data.loc[is_short, 'mfe'] = trade_data.loc[is_short, 'entry_price'] - trade_data.loc[is_short, 'price_range_low']
+    trade_data.loc[is_short, 'mae'] = trade_data.loc[is_short, 'price_range_high'] - trade_data.loc[is_short, 'entry_price']
+    trade_data.loc[is_short, 'mfe_mae_ratio'] = trade_data.loc[is_short, 'mfe'] / trade_data.loc[is_short, 'mae']
+
+    # The original replaced in place on the column; assigned back here, with the same result
+    trade_data['mfe_mae_ratio'] = trade_data['mfe_mae_ratio'].replace([float('inf'), -float('inf')], float('nan')).fillna(0)
+
+    return trade_data
+
+def reference_basic_stats(trade_data: pd.DataFrame) -> dict:
+    """The original compute_basic_stats, a pandas pass over the whole slice."""
+    trade_data = reference_add_mfe_mae_columns(trade_data)
+
+    num_trades = len(trade_data)
+    total_profit_loss = trade_data['profit_loss'].sum()
+
+    wins = trade_data[trade_data['profit_loss'] >= 0]['profit_loss']
+    losses = trade_data[trade_data['profit_loss'] < 0]['profit_loss']
+
+    win_rate = len(wins) / num_trades if num_trades > 0 else 0
+    avg_win = wins.mean() if not wins.empty else 0
+    avg_loss = losses.mean() if not losses.empty else 0
+    avg_win_loss_ratio = avg_win / abs(avg_loss) if avg_loss != 0 else float('inf')
+    expectancy = (win_rate * avg_win) + ((1 - win_rate) * avg_loss)
+    profit_factor = wins.sum() / abs(losses.sum()) if not losses.empty else float('inf')
+    avg_mfe_mae_ratio = trade_data['mfe_mae_ratio'].mean() if not trade_data['mfe_mae_ratio'].empty else 0
+    avg_mfe = trade_data['mfe'].mean() if not trade_data['mfe'].empty else 0
+    avg_mae = trade_data['mae'].mean() if not trade_data['mae'].empty else 0
+
+    return {
+        'num_trades': num_trades,
+        'total_profit_loss': total_profit_loss,
+        'win_rate': win_rate,
+        'avg_win': avg_win,
+        'avg_loss': avg_loss,
+        'avg_win_loss_ratio': avg_win_loss_ratio,
+        'expectancy': expectancy,
+        'profit_factor': profit_factor,
+        'avg_mfe_mae_ratio': avg_mfe_mae_ratio,
+        'avg_mfe': avg_mfe,
+        'avg_mae': avg_mae
+    }
+
+def reference_rolling_stats(trade_data: pd.DataFrame, window: int = 30) -> pd.DataFrame:
+    """The original quadratic loop: the original compute_basic_stats over every expanding and rolling slice."""
+    metrics = reference_basic_stats(trade_data.iloc[:window])  # just to get keys
+    for key in metrics:
+        trade_data[f'expanding_{key}'] = np.nan
+        trade_data[f'rolling_{key}'] = np.nan
+
+    for i in range(window, len(trade_data)):
+        expanding_sample = trade_data.iloc[:i+1]
+        rolling_sample = trade_data.iloc[i-window:i+1]
+
+        expanding_stats = reference_basic_stats(expanding_sample)
+        rolling_stats = reference_basic_stats(rolling_sample)
+
+        for key, value in expanding_stats.items():
+            trade_data.loc[trade_data.index[i], f'expanding_{key}'] = value
+        for key, value in rolling_stats.items():
+            trade_data.loc[trade_data.index[i], f'rolling_{key}'] = value
+
+    return trade_data
+
+@pytest.fixture(scope='module')
+def trades_csv() -> pd.DataFrame:
+    return read_trade_csv(PROCESSED_DATA_DIR / "trades.csv")
+
+@pytest.fixture(scope='module')
+def edge_trades() -> pd.DataFrame:
+    """Synthetic trades with missing PnLs and breakeven trades mixed in."""
+    trade_data = generate_trades(300, seed=11)
+    trade_data.loc[::17, 'profit_loss'] = np.nan
+    trade_data.loc[5::13, 'profit_loss'] = 0.0
+    return trade_data
+
+def assert_matches_reference(trade_data: pd.DataFrame, window: int) -> None:
+    expected = reference_rolling_stats(trade_data.copy(), window)
+    result = compute_rolling_stats(trade_data.copy(), window)
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, rtol=1e-9)
+
+@pytest.mark.parametrize('window', [1, 5, 30, 500])
+def test_rolling_stats_match_reference_on_trades_csv(trades_csv, window):
+    assert_matches_reference(trades_csv, window)
+
+@pytest.mark.parametrize('window', [1, 10, 30])
+def test_rolling_stats_match_reference_with_nan_and_breakeven(edge_trades, window):
+    assert_matches_reference(edge_trades, window)
+
+def test_rolling_stats_window_larger_than_sample(trades_csv):
+    result = compute_rolling_stats(trades_csv.copy(), len(trades_csv) + 5)
+    assert_matches_reference(trades_csv, len(trades_csv) + 5)
+    assert result.filter(regex='^(expanding|rolling)_').isna().all().all()
+
+def test_multi_window_stats_match_single_windows(edge_trades):
+    windows = (1, 10, 30, 400)
+    result = compute_multi_window_stats(edge_trades, windows)
+    assert list(result.index.get_level_values(0).unique()) == list(windows)
+    for window in windows:
+        expected = reference_rolling_stats(edge_trades.copy(), window).filter(regex='^(expanding|rolling)_')
+        pd.testing.assert_frame_equal(result.loc[window], expected, check_dtype=False, check_names=False, rtol=1e-9)
+
+def test_rolling_stats_leave_the_input_unchanged(trades_csv):
+    columns = list(trades_csv.columns)
+    compute_rolling_stats(trades_csv, 5)
+    assert list(trades_csv.columns) == columns
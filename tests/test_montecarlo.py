@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+import src.montecarlo as montecarlo
+from src.montecarlo import BYTES_PER_CELL, METHODS, cached_monte_carlo, paths_per_batch, simulate_equity_curves
+from src.synthetic import generate_trades
+
+def reference_path(pnl, seed, method, block_size):
+    """One resampled path, drawn and measured trade by trade."""
+    rng = np.random.default_rng(seed)
+    n = len(pnl)
+    if method == 'permutation':
+        sample = rng.permutation(pnl)
+    elif method == 'iid':
+        sample = pnl[rng.integers(0, n, size=n)]
+    else:
+        starts = rng.integers(0, n, size=(-(-n // block_size), 1))
+        sample = pnl[[(start + offset) % n for start in starts[:, 0] for offset in range(block_size)][:n]]
+
+    equity = peak = max_drawdown = 0.0
+    streak = longest = 0
+    for i, value in enumerate(sample):
+        equity += value
+        peak = equity if i == 0 else max(peak, equity)
+        max_drawdown = min(max_drawdown, equity - peak)
+        streak = streak + 1 if value < 0 else 0
+        longest = max(longest, streak)
+    return equity, max_drawdown, longest
+
+@pytest.mark.parametrize('method', METHODS)
+def test_paths_match_a_seeded_reference(method):
+    pnl = generate_trades(120, seed=3)['profit_loss'].to_numpy()
+    result = simulate_equity_curves(pnl, num_paths=40, method=method, block_size=7, seed=5, memory_mb=0)
+    seeds = np.random.SeedSequence(5).spawn(40)
+    expected = np.array([reference_path(pnl, seed, method, 7) for seed in seeds])
+    np.testing.assert_allclose(result['paths'].to_numpy(), expected)
+    if method == 'permutation':
+        np.testing.assert_allclose(result['paths']['final_pnl'], pnl.sum())
+
+def test_results_do_not_depend_on_batches_or_processes():
+    pnl = generate_trades(500, seed=6)['profit_loss']
+    serial = simulate_equity_curves(pnl, num_paths=60, method='block', seed=2)
+    batched = simulate_equity_curves(pnl, num_paths=60, method='block', seed=2, memory_mb=0)
+    parallel = simulate_equity_curves(pnl, num_paths=60, method='block', seed=2, memory_mb=0, processes=2)
+    for result in (batched, parallel):
+        np.testing.assert_array_equal(result['paths'].to_numpy(), serial['paths'].to_numpy())
+        np.testing.assert_array_equal(result['curve_bands'].to_numpy(), serial['curve_bands'].to_numpy())
+
+def test_batches_share_the_memory_budget(monkeypatch):
+    assert paths_per_batch(1000, memory_mb=64) == 64 * 2 ** 20 // (1000 * BYTES_PER_CELL)
+    assert paths_per_batch(1000, memory_mb=64, processes=4) == 64 * 2 ** 20 // (4 * 1000 * BYTES_PER_CELL)
+    assert paths_per_batch(10 ** 9, memory_mb=1) == 1
+
+    # Every batch simulated stays within its worker's share
+    sizes = []
+    simulate_parallel = montecarlo._simulate_parallel
+    def record(pnl, batches, *args):
+        sizes.extend(len(seeds) for seeds in batches)
+        return simulate_parallel(pnl, batches, *args)
+    monkeypatch.setattr(montecarlo, '_simulate_parallel', record)
+    pnl = np.ones(2 ** 15)
+    simulate_equity_curves(pnl, num_paths=100, memory_mb=16, processes=4)
+    assert max(sizes) == paths_per_batch(2 ** 15, 16, 4) == 4 and sum(sizes) == 100
+
+def test_runs_without_sched_getaffinity(monkeypatch):
+    # Windows and macOS have no sched_getaffinity
+    monkeypatch.delattr(os, 'sched_getaffinity', raising=False)
+    result = cached_monte_carlo(generate_trades(300, seed=8), num_paths=50, seed=1)
+    assert np.isfinite(result['bands'].to_numpy()).all()
@@ -0,0 +1,62 @@
+import re
+import warnings
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from src.config import RAW_DATA_DIR
+from src.preprocessing import preprocess_raw_data
+from src.synthetic import generate_trades, write_trades_list
+
+def reference_preprocess(path) -> pd.DataFrame:
+    """preprocess_raw_data as it was before chunked reading."""
+    raw_data = pd.read_csv(path, sep='\t')
+    raw_data.drop(columns=['Max Open Quantity', 'Max Closed Quantity', 'Cumulative Profit/Loss (C)',
+                           'FlatToFlat Profit/Loss (C)', 'FlatToFlat Max Open Profit (C)',
+                           'FlatToFlat Max Open Loss (C)', 'Max Open Profit (C)', 'Max Open Loss (C)',
+                           'Entry Efficiency', 'Exit Efficiency', 'Total Efficiency', 'Note',
+                           'Open Position Quantity', 'Close Position Quantity'], inplace=True)
+    raw_data.dropna(axis=0, inplace=True)
+    raw_data.rename(columns={'Symbol': 'symbol', 'Trade Type': 'trade_type', 'Entry DateTime': 'entry_datetime',
+                             'Exit DateTime': 'exit_datetime', 'Entry Price': 'entry_price', 'Exit Price': 'exit_price',
+                             'Trade Quantity': 'quantity', 'Profit/Loss (C)': 'profit_loss',
+                             'Commission (C)': 'commission', 'High Price While Open': 'price_range_high',
+                             'Low Price While Open': 'price_range_low', 'Duration': 'duration'}, inplace=True)
+    raw_data['symbol'] = raw_data['symbol'].apply(lambda x: x.split(']')[-1].split('-')[0].strip().split(' ')[0][0:3])
+    raw_data['entry_datetime'] = pd.to_datetime(raw_data['entry_datetime'].str.replace(' BP', '', regex=False))
+    raw_data['exit_datetime'] = pd.to_datetime(raw_data['exit_datetime'].str.replace(' EP', '', regex=False))
+    raw_data['duration_sec'] = pd.to_timedelta(raw_data['duration']).dt.total_seconds()
+    raw_data.drop(columns=['duration'], inplace=True)
+    raw_data['date'] = raw_data['entry_datetime'].dt.date
+    raw_data.sort_values(by='entry_datetime', inplace=True)
+    raw_data.reset_index(drop=True, inplace=True)
+    return raw_data.copy()
+
+@pytest.fixture(params=['sample', 'synthetic', 'no_milliseconds'])
+def export(request, tmp_path):
+    if request.param == 'sample':
+        return RAW_DATA_DIR / 'TradesList.txt'
+    path = tmp_path / 'TradesList.txt'
+    write_trades_list(generate_trades(300, seed=9), path)
+    if request.param == 'no_milliseconds':
+        path.write_text(re.sub(r'(\d\d:\d\d:\d\d)\.\d+', r'\1', path.read_text()))
+    return path
+
+@pytest.mark.parametrize('chunksize', [1, 3, 1000, None])
+def test_chunked_output_matches_the_original(export, chunksize):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', pd.errors.DtypeWarning)
+        result = preprocess_raw_data(export, chunksize=chunksize)
+    assert_frame_equal(result, reference_preprocess(export))
+
+def test_timestamps_with_and_without_milliseconds(tmp_path):
+    path = tmp_path / 'TradesList.txt'
+    trades = generate_trades(20, seed=9)
+    write_trades_list(trades, path)
+    lines = path.read_text().splitlines(keepends=True)
+    lines[1::2] = [re.sub(r'(\d\d:\d\d:\d\d)\.\d+', r'\1', line) for line in lines[1::2]]
+    path.write_text(''.join(lines))
+
+    entry_times = preprocess_raw_data(path)['entry_datetime']
+    assert (entry_times.dt.microsecond == 0).any() and (entry_times.dt.microsecond != 0).any()
+    assert entry_times.dt.floor('s').tolist() == sorted(trades['entry_datetime'].dt.floor('s'))
@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from src import profiling
+
+@pytest.fixture
+def collecting():
+    """Collection switched on with no records, restored afterwards."""
+    was_enabled = profiling.enabled()
+    profiling.set_enabled(True)
+    profiling.clear()
+    yield
+    profiling.set_enabled(was_enabled)
+    profiling.clear()
+
+@profiling.profiled('test.double')
+def double(frame):
+    return frame * 2
+
+def test_nothing_is_recorded_unless_the_variable_is_set():
+    script = ("from src import profiling\n"
+              "@profiling.profiled('f')\n"
+              "def f(): pass\n"
+              "f()\n"
+              "with profiling.stage('s'): pass\n"
+              "profiling.checkpoint('c')\n"
+              "print(profiling.enabled(), len(profiling.records()))")
+    for value, expected in (('', 'False 0'), ('0', 'False 0'), ('1', 'True 3')):
+        env = {**os.environ, profiling.PROFILE_ENV: value}
+        output = subprocess.run([sys.executable, '-c', script], env=env, cwd=Path(__file__).parents[1],
+                                capture_output=True, text=True, check=True)
+        assert output.stdout.strip() == expected, value
+
+def test_disabled_hooks_record_nothing():
+    was_enabled = profiling.enabled()
+    profiling.set_enabled(False)
+    profiling.clear()
+    try:
+        double(pd.DataFrame({'a': [1]}))
+        with profiling.stage('off'):
+            pass
+        profiling.checkpoint('off')
+        assert profiling.records().empty
+    finally:
+        profiling.set_enabled(was_enabled)
+
+def test_stages_are_recorded_with_time_memory_and_rows(collecting):
+    frame = pd.DataFrame({'a': np.arange(1000.0)})
+    with profiling.stage('outer') as info:
+        double(frame)
+        values = np.ones(2 ** 20)  # 8 MB
+        info['rows'] = len(values)
+    profiling.checkpoint('after')
+
+    records = profiling.records()
+    assert list(records.columns) == profiling.RECORD_COLUMNS
+    assert list(records['stage']) == ['test.double', 'outer', 'after']
+    assert list(records['rows'].iloc[:2]) == [1000, 2 ** 20]
+    assert (records['wall_sec'] >= 0).all() and (records['start_sec'] >= 0).all()
+    assert records['peak_mb'].iat[1] >= 8 >= records['peak_mb'].iat[0]
+    assert pd.isna(records['peak_mb'].iat[2])
+
+    summary = profiling.summary()
+    assert set(summary.index) == {'test.double', 'outer', 'after'}
+    assert list(summary.columns) == ['calls', 'total_sec', 'mean_sec', 'rows', 'peak_mb']
+    assert summary.loc['outer', 'calls'] == 1 and summary.loc['outer', 'peak_mb'] >= 8
+
+def test_exports_contain_the_recorded_stages(collecting, tmp_path):
+    double(pd.DataFrame({'a': [1.0, 2.0]}))
+    with profiling.stage('block', rows=5):
+        pass
+
+    exported = json.loads(profiling.to_json())
+    assert 'exported_at' in exported
+    assert [record['stage'] for record in exported['records']] == ['test.double', 'block']
+    assert {'wall_sec', 'peak_mb', 'rows', 'start_sec'} <= set(exported['records'][0])
+
+    for suffix in ('.json', '.csv'):
+        path = tmp_path / f"profile{suffix}"
+        profiling.export(path)
+        if suffix == '.csv':
+            rows = pd.read_csv(path)
+            assert list(rows['stage']) == ['test.double', 'block']
+            assert list(rows.columns) == profiling.RECORD_COLUMNS + ['exported_at']
+            assert list(rows['rows']) == [2, 5]
+        else:
+            assert json.loads(path.read_text())['records'] == exported['records']
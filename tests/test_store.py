@@ -0,0 +1,42 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+import src.store as store_module
+from pandas.testing import assert_series_equal
+from src.filters import filtered_pipeline
+from src.metrics import MetricsPipeline
+from src.store import STORE_VERSION, TradeStore
+from src.synthetic import generate_trades
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, 'PROCESSED_DATA_DIR', tmp_path)
+    trade_data = generate_trades(400, seed=12)
+    trade_data.loc[::31, 'profit_loss'] = float('nan')
+    store = TradeStore()
+    store.append(trade_data)
+    return store, trade_data
+
+def test_stats_match_the_pipeline(store):
+    store, trade_data = store
+    filters = {'symbols': ('MES', 'MNQ'), 'accounts': ('Sim1',), 'start': trade_data['entry_datetime'].iloc[100]}
+    for selected in ({}, filters):
+        pipeline = filtered_pipeline(trade_data, **selected) if selected else MetricsPipeline(trade_data)
+        assert store.basic_stats(**selected) == pytest.approx(pipeline.basic_stats(), nan_ok=True)
+        assert_series_equal(store.daily_stats(**selected)['daily_pnl'], pipeline.daily_stats()['daily_pnl'], check_names=False)
+
+def test_version_is_set_on_creation_and_checked_on_open(store):
+    store, _ = store
+    with closing(sqlite3.connect(store.path)) as connection:
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == STORE_VERSION
+        connection.execute(f"PRAGMA user_version = {STORE_VERSION + 1}")
+    with pytest.raises(ValueError, match="version"):
+        len(store)
+
+def test_other_databases_are_not_taken_for_a_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_module, 'PROCESSED_DATA_DIR', tmp_path)
+    with closing(sqlite3.connect(tmp_path / 'other.sqlite')) as connection:
+        connection.execute("CREATE TABLE notes (text TEXT)")
+    with pytest.raises(ValueError):
+        len(TradeStore('other.sqlite'))
@@ -0,0 +1,21 @@
+from src.config import RAW_DATA_DIR
+from src.preprocessing import preprocess_raw_data
+from src.synthetic import TRADES_LIST_COLUMNS, generate_trades, write_trades_list
+
+def test_footer_matches_the_real_export(tmp_path):
+    path = tmp_path / 'TradesList.txt'
+    trades = generate_trades(50, seed=2)
+    write_trades_list(trades, path)
+
+    footer = path.read_text().splitlines()[-1].split('\t')
+    real_footer = (RAW_DATA_DIR / 'TradesList.txt').read_text().splitlines()[-1].split('\t')
+    assert len(footer) == len(real_footer) == len(TRADES_LIST_COLUMNS)
+    filled = [position for position, field in enumerate(footer) if field]
+    assert filled == [position for position, field in enumerate(real_footer) if field] == [TRADES_LIST_COLUMNS.index('Profit/Loss (C)')]
+    assert footer[TRADES_LIST_COLUMNS.index('Profit/Loss (C)')] == f"Total: {trades['profit_loss'].sum():.2f}"
+
+def test_written_export_preprocesses_to_the_same_trades(tmp_path):
+    path = tmp_path / 'TradesList.txt'
+    trades = generate_trades(50, seed=2)
+    write_trades_list(trades, path)
+    assert len(preprocess_raw_data(path)) == len(trades)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.config import CONTRACT_SPECS
+from src.whatif import SURFACES, simulate_exits
+from src.synthetic import generate_trades
+
+STOPS = [4, 10, 25, np.inf]
+TARGETS = [2, 8, 30, np.inf]
+
+@pytest.fixture(scope='module')
+def trades():
+    trades = generate_trades(400, seed=31)
+    trades.loc[::53, 'price_range_high'] = np.nan  # missing excursions are skipped
+    trades.loc[7::97, 'symbol'] = 'XYZ'            # so are unknown symbols
+    return trades
+
+def replay(trade, stop, target, scale=1.0):
+    """PnL of one trade under a stop and target, in the exit_surfaces rules."""
+    spec = CONTRACT_SPECS[trade['symbol']]
+    direction = 1 if trade['trade_type'] == 'Long' else -1
+    high, low, entry = trade['price_range_high'], trade['price_range_low'], trade['entry_price']
+    mfe = ((high - entry) if direction > 0 else (entry - low)) / spec['tick_size']
+    mae = ((entry - low) if direction > 0 else (high - entry)) / spec['tick_size']
+    move = direction * (trade['exit_price'] - entry) / spec['tick_size']
+    stop_ticks, target_ticks = scale * stop, scale * target
+    if mae >= stop_ticks:
+        ticks = -stop_ticks
+    elif mfe >= target_ticks:
+        ticks = target_ticks
+    else:
+        ticks = move
+    return ticks * spec['tick_value'] * trade['quantity'] - spec['commission'] * trade['quantity']
+
+def reference_surfaces(trades, unit):
+    valid = trades[trades['symbol'].isin(list(CONTRACT_SPECS)) & trades[['price_range_high', 'price_range_low']].notna().all(axis=1)]
+    scales = pd.Series(1.0, index=valid.index)
+    if unit == 'mae':
+        tick_size = valid['symbol'].map({symbol: spec['tick_size'] for symbol, spec in CONTRACT_SPECS.items()})
+        mae = np.where(valid['trade_type'] == 'Long', valid['entry_price'] - valid['price_range_low'],
+                       valid['price_range_high'] - valid['entry_price']) / tick_size
+        scales = mae.groupby(valid['symbol']).transform('median')
+
+    surfaces = {key: pd.DataFrame(np.nan, index=STOPS, columns=TARGETS) for key in SURFACES}
+    for stop in STOPS:
+        for target in TARGETS:
+            pnl = np.array([replay(trade, stop, target, scales[label]) for label, trade in valid.iterrows()])
+            losses = -pnl[pnl < 0].sum()
+            surfaces['expectancy'].loc[stop, target] = pnl.mean()
+            surfaces['profit_factor'].loc[stop, target] = pnl[pnl > 0].sum() / losses if losses else np.inf
+            surfaces['win_rate'].loc[stop, target] = (pnl >= 0).mean()
+            surfaces['total_pnl'].loc[stop, target] = pnl.sum()
+    return surfaces, len(valid)
+
+@pytest.mark.parametrize('unit', ['ticks', 'mae'])
+def test_surfaces_match_a_per_trade_replay(trades, unit):
+    result = simulate_exits(trades, STOPS, TARGETS, unit)
+    expected, num_trades = reference_surfaces(trades, unit)
+    assert result['num_trades'] == num_trades
+    assert result['skipped'] == len(trades) - num_trades
+    for key in SURFACES:
+        np.testing.assert_allclose(result[key].to_numpy(), expected[key].to_numpy(), rtol=1e-9, err_msg=key)
+
+@pytest.mark.parametrize('unit', ['ticks', 'mae'])
+def test_chunked_and_unchunked_results_are_identical(trades, unit):
+    whole = simulate_exits(trades, STOPS, TARGETS, unit)
+    # A zero budget processes one trade per chunk
+    chunked = simulate_exits(trades, STOPS, TARGETS, unit, memory_mb=0)
+    for key in SURFACES:
+        np.testing.assert_array_equal(chunked[key].to_numpy(), whole[key].to_numpy(), err_msg=key)
+    assert (chunked['num_trades'], chunked['skipped']) == (whole['num_trades'], whole['skipped'])